@@ -158,6 +158,7 @@ class LoginHistoryViewSet(viewsets.ReadOnlyModelViewSet):
     """
     serializer_class = LoginHistorySerializer
     permission_classes = [IsAuthenticated]
+    pagination_count_mode = 'capped'
 
     def get_queryset(self):
         """
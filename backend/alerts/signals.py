@@ -0,0 +1,12 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from crime_analysis.conditional import ALERTS_SCOPE, bump_data_version
+from .models import Alert
+
+
+@receiver(post_save, sender=Alert)
+@receiver(post_delete, sender=Alert)
+@receiver(m2m_changed, sender=Alert.crime_types.through)
+def bump_alert_data_version(sender, **kwargs):
+    """Invalidate the conditional GET validators of the alert match endpoints"""
+    bump_data_version(ALERTS_SCOPE)
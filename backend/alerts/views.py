@@ -3,9 +3,11 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.contrib.gis.measure import D
 from django.contrib.gis.db.models.functions import Distance
+from crime_analysis.conditional import ALERTS_SCOPE, CRIMES_SCOPE, conditional_get
 
 from .models import Alert, AlertNotification
 from .serializers import AlertSerializer, AlertNotificationSerializer
+from crimes.dimensions import dimensions
 from crimes.models import Crime
 
 class AlertViewSet(viewsets.ModelViewSet):
@@ -25,6 +27,7 @@ class AlertViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
     
     @action(detail=True, methods=['GET'])
+    @conditional_get(CRIMES_SCOPE, ALERTS_SCOPE)
     def recent_matches(self, request, pk=None):
         """
         Retrieve recent crimes that match this alert's criteria
@@ -39,18 +42,22 @@ class AlertViewSet(viewsets.ModelViewSet):
             distance=Distance('location', alert.location)
         ).order_by('distance')
         
+        matches = []
+        for crime in matching_crimes[:10]:  # Limit to 10 most recent/closest
+            # None for a crime type the dimension cache doesn't know
+            crime_type = dimensions.crime_type(crime.crime_type_id)
+            matches.append({
+                'id': crime.id,
+                'type': crime_type.name if crime_type else None,
+                'occurred_at': crime.occurred_at,
+                'distance_meters': crime.distance.m
+            })
+        
         # Return the matching crimes
         return Response({
             'alert_id': alert.id,
             'total_matches': matching_crimes.count(),
-            'matches': [
-                {
-                    'id': crime.id,
-                    'type': crime.crime_type.name,
-                    'occurred_at': crime.occurred_at,
-                    'distance_meters': crime.distance.m
-                } for crime in matching_crimes[:10]  # Limit to 10 most recent/closest
-            ]
+            'matches': matches
         })
 
 class AlertNotificationViewSet(viewsets.ModelViewSet):
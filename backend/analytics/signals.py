@@ -0,0 +1,13 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from crime_analysis.conditional import PREDICTIONS_SCOPE, bump_data_version
+from .models import Prediction, PredictiveModel
+
+
+@receiver(post_save, sender=Prediction)
+@receiver(post_delete, sender=Prediction)
+@receiver(post_save, sender=PredictiveModel)
+@receiver(post_delete, sender=PredictiveModel)
+def bump_prediction_data_version(sender, **kwargs):
+    """Invalidate the conditional GET validators of the prediction endpoints"""
+    bump_data_version(PREDICTIONS_SCOPE)
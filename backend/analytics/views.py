@@ -3,6 +3,7 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.utils import timezone
 from django.db.models import Q
+from crime_analysis.conditional import PREDICTIONS_SCOPE, conditional_get
 
 from .models import PredictiveModel, Prediction, AnalysisRequest
 from .serializers import (
@@ -74,6 +75,14 @@ class PredictionViewSet(viewsets.ModelViewSet):
         """Set the generator of the prediction"""
         serializer.save(generated_by=self.request.user)
 
+    @conditional_get(PREDICTIONS_SCOPE)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @conditional_get(PREDICTIONS_SCOPE)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
     def get_queryset(self):
         """
         Optionally filter predictions by various parameters
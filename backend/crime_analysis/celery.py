@@ -0,0 +1,10 @@
+import os
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'crime_analysis.settings')
+
+app = Celery('crime_analysis')
+
+# Settings prefixed with CELERY_ in the Django settings configure the app
+app.config_from_object('django.conf:settings', namespace='CELERY')
+app.autodiscover_tasks()
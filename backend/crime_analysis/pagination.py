@@ -0,0 +1,182 @@
+import json
+from django.db import connections
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+# How a paginated list reports its total
+COUNT_EXACT = 'exact'
+COUNT_ESTIMATE = 'estimate'
+COUNT_CAPPED = 'capped'
+COUNT_NONE = 'none'
+COUNT_MODES = (COUNT_EXACT, COUNT_ESTIMATE, COUNT_CAPPED, COUNT_NONE)
+
+# Query string aliases kept for clients that pass count=true / count=false
+COUNT_MODE_ALIASES = {'true': COUNT_EXACT, '1': COUNT_EXACT, 'yes': COUNT_EXACT,
+                      'false': COUNT_NONE, '0': COUNT_NONE, 'no': COUNT_NONE}
+
+
+def estimate_count(queryset):
+    """Row count the planner expects queryset to return, read from EXPLAIN without running it"""
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class CountModePagination(PageNumberPagination):
+    """
+    Page number pagination that doesn't have to COUNT(*) the whole result.
+
+    The count mode comes from the view's ``pagination_count_mode`` (falling
+    back to ``count_mode``, exact) and can be overridden with ``?count=``.
+    Views over large tables opt into a cheaper mode:
+
+    - ``exact``: a regular COUNT(*)
+    - ``estimate``: the planner's row estimate, or an exact count when the
+      estimate is below ``exact_count_threshold``
+    - ``capped``: an exact count up to ``count_cap``, reported as the cap
+      (with ``count_type: capped``) above it
+    - ``none``: no count
+
+    The last page always gets an exact count for free, and an estimated or
+    capped count never falls below the rows known to exist (the ones up to
+    the end of the page, plus one when there's a next page). Responses
+    carry ``count_type`` to tell clients how to display the count.
+
+    ``paginate_queryset`` takes optional ``params`` read instead of the
+    query string, for views whose parameters come from a POST body.
+    """
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    count_query_param = 'count'
+    count_mode = COUNT_EXACT
+    exact_count_threshold = 1000
+    count_cap = 10000
+
+    # Parameters passed to paginate_queryset, read instead of the query string
+    params = None
+
+    def get_params(self, request):
+        return request.query_params if self.params is None else self.params
+
+    def get_page_size(self, request):
+        try:
+            return _positive_int(
+                self.get_params(request)[self.page_size_query_param],
+                strict=True,
+                cutoff=self.max_page_size
+            )
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def get_page_number(self, request, paginator):
+        page_number = self.get_params(request).get(self.page_query_param) or 1
+        if page_number in self.last_page_strings:
+            page_number = paginator.num_pages
+        return page_number
+
+    def get_count_mode(self, request, view=None, default=None):
+        requested = self.get_params(request).get(self.count_query_param, '').lower()
+        requested = COUNT_MODE_ALIASES.get(requested, requested)
+        if requested in COUNT_MODES:
+            return requested
+        if default is not None:
+            return default
+        return getattr(view, 'pagination_count_mode', self.count_mode)
+
+    def get_count(self, queryset, mode, minimum=0):
+        """Return (count, count_type) for queryset under mode, with minimum rows known to exist"""
+        if mode == COUNT_NONE:
+            return None, None
+        if mode == COUNT_CAPPED:
+            count = queryset.order_by()[:self.count_cap + 1].count()
+            if count > self.count_cap:
+                return max(self.count_cap, minimum), COUNT_CAPPED
+            return count, COUNT_EXACT
+        if mode == COUNT_ESTIMATE:
+            estimate = estimate_count(queryset)
+            if estimate >= self.exact_count_threshold:
+                return max(estimate, minimum), COUNT_ESTIMATE
+        return queryset.count(), COUNT_EXACT
+
+    def paginate_queryset(self, queryset, request, view=None, params=None):
+        self.params = params
+        self.count_type = COUNT_EXACT
+        self.count_mode_used = self.get_count_mode(request, view)
+        if self.count_mode_used == COUNT_EXACT:
+            return super().paginate_queryset(queryset, request, view)
+
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        self.request = request
+        self.page = None
+
+        page_number = self.get_params(request).get(self.page_query_param) or 1
+        try:
+            page_number = int(page_number)
+        except ValueError:
+            page_number = 0
+        if page_number < 1:
+            raise NotFound(self.invalid_page_message)
+
+        offset = (page_number - 1) * page_size
+        rows = list(queryset[offset:offset + page_size + 1])
+        if not rows and page_number > 1:
+            raise NotFound(self.invalid_page_message)
+
+        self.page_number = page_number
+        self.has_next = len(rows) > page_size
+        rows = rows[:page_size]
+        if not self.has_next:
+            # Last page: the total is known without counting
+            self.count, self.count_type = offset + len(rows), COUNT_EXACT
+        else:
+            self.count, self.count_type = self.get_count(
+                queryset, self.count_mode_used, minimum=offset + len(rows) + 1
+            )
+        return rows
+
+    def get_paginated_response(self, data):
+        if self.page is not None:
+            self.count = self.page.paginator.count
+        return Response({
+            'count': self.count,
+            'count_type': self.count_type,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        response = super().get_paginated_response_schema(schema)
+        response['properties']['count']['nullable'] = True
+        response['properties']['count_type'] = {
+            'type': 'string',
+            'nullable': True,
+            'enum': [COUNT_EXACT, COUNT_ESTIMATE, COUNT_CAPPED],
+        }
+        return response
+
+    def get_next_link(self):
+        if self.page is not None:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.page_query_param, self.page_number + 1)
+
+    def get_previous_link(self):
+        if self.page is not None:
+            return super().get_previous_link()
+        if self.page_number <= 1:
+            return None
+        url = self.request.build_absolute_uri()
+        if self.page_number == 2:
+            return remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.page_query_param, self.page_number - 1)
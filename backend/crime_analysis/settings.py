@@ -45,6 +45,7 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     "django.contrib.gis",
+    'django.contrib.postgres',
     
 
      # Third-party apps
@@ -65,6 +66,7 @@ INSTALLED_APPS = [
     'reports',
     'analytics',
     'etl',
+    'geocoding',
 ]
 
 MIDDLEWARE = [
@@ -195,7 +197,7 @@ REST_FRAMEWORK = {
         'rest_framework.filters.SearchFilter',
         'rest_framework.filters.OrderingFilter',
     ),
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'crime_analysis.pagination.CountModePagination',
     'PAGE_SIZE': 25,
     'DEFAULT_SCHEMA_CLASS': 'rest_framework.schemas.coreapi.AutoSchema',
     'DEFAULT_VERSIONING_CLASS': 'rest_framework.versioning.URLPathVersioning',
@@ -235,6 +237,23 @@ CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
 
+# ETL settings
+# Functions custom validation rules may name: rule name -> dotted path of a
+# vectorized callable (column ndarray -> mask of valid values)
+ETL_CUSTOM_VALIDATORS = {}
+
+# Directory file sources are read from; their paths are relative to it
+ETL_IMPORT_ROOT = os.environ.get('ETL_IMPORT_ROOT', os.path.join(BASE_DIR, 'imports'))
+
+# Cache configuration. Use a shared backend (Redis, Memcached) in production so
+# cache invalidation is seen by every worker process.
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    }
+}
+
 # Swagger/OpenAPI settings
 SWAGGER_SETTINGS = {
     'SECURITY_DEFINITIONS': {
@@ -30,6 +30,7 @@ api_patterns = [
     path('reports/', include('reports.urls')),
     path('analytics/', include('analytics.urls')),
     path('etl/', include('etl.urls')),
+    path('map/', include('geocoding.urls')),
     
     # API documentation
     path('swagger<format>/', schema_view.without_ui(cache_timeout=0), name='schema-json'),
@@ -1,6 +1,15 @@
 from django.contrib import admin
 from django.contrib.gis.admin import GISModelAdmin
-from .models import CrimeCategory, CrimeType, Crime, CrimeAttribute
+from .dimensions import dimensions
+from .models import (
+    CrimeCategory,
+    CrimeType,
+    Crime,
+    CrimeAttribute,
+    CrimeDailyRollup,
+    CrimeDuplicateGroup,
+    CrimeDuplicateMember
+)
 
 @admin.register(CrimeCategory)
 class CrimeCategoryAdmin(admin.ModelAdmin):
@@ -20,7 +29,7 @@ class CrimeAdmin(GISModelAdmin):
     """Admin configuration for Crime Incidents"""
     list_display = [
         'incident_id', 
-        'crime_type', 
+        'crime_type_name', 
         'occurred_at', 
         'city', 
         'state', 
@@ -31,6 +40,7 @@ class CrimeAdmin(GISModelAdmin):
         'city', 
         'state', 
         'verification_status', 
+        'is_active',
         'occurred_at'
     ]
     search_fields = [
@@ -39,6 +49,14 @@ class CrimeAdmin(GISModelAdmin):
         'block_address'
     ]
     
+    # Names are resolved from the dimension cache instead of joining per page
+    list_select_related = False
+    
+    @admin.display(description='Crime type', ordering='crime_type__name')
+    def crime_type_name(self, obj):
+        crime_type = dimensions.crime_type(obj.crime_type_id)
+        return crime_type.name if crime_type else obj.crime_type
+    
     # Use OSMGeoAdmin to provide map interface for location
     default_lon = 0  # Default longitude
     default_lat = 0  # Default latitude
@@ -49,4 +67,36 @@ class CrimeAttributeAdmin(admin.ModelAdmin):
     """Admin configuration for Crime Attributes"""
     list_display = ['crime', 'name', 'value']
     list_filter = ['name']
-    search_fields = ['name', 'value']
\ No newline at end of file
+    search_fields = ['name', 'value']
+
+@admin.register(CrimeDailyRollup)
+class CrimeDailyRollupAdmin(admin.ModelAdmin):
+    """Admin configuration for the daily crime rollup (maintained automatically)"""
+    list_display = ['date', 'crime_type_name', 'agency_name', 'city', 'verification_status', 'count']
+    list_filter = ['verification_status', 'date']
+    search_fields = ['city', 'state']
+    readonly_fields = ['date', 'crime_type', 'agency', 'city', 'state', 'verification_status', 'count']
+    
+    @admin.display(description='Crime type')
+    def crime_type_name(self, obj):
+        crime_type = dimensions.crime_type(obj.crime_type_id)
+        return crime_type.name if crime_type else obj.crime_type
+    
+    @admin.display(description='Agency')
+    def agency_name(self, obj):
+        agency = dimensions.agency(obj.agency_id)
+        return agency.name if agency else obj.agency
+
+class CrimeDuplicateMemberInline(admin.TabularInline):
+    """Incidents linked in a duplicate group"""
+    model = CrimeDuplicateMember
+    extra = 0
+    raw_id_fields = ['crime']
+    readonly_fields = ['score', 'previous_status', 'linked_at']
+
+@admin.register(CrimeDuplicateGroup)
+class CrimeDuplicateGroupAdmin(admin.ModelAdmin):
+    """Admin configuration for duplicate incident groups (maintained by detect_duplicate_crimes)"""
+    list_display = ['id', 'canonical', 'created_at', 'updated_at']
+    raw_id_fields = ['canonical']
+    inlines = [CrimeDuplicateMemberInline]
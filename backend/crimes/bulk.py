@@ -0,0 +1,94 @@
+from django.db import transaction
+from crime_analysis.conditional import CRIMES_SCOPE, bump_data_version
+from agencies.models import Agency
+from .models import Crime, CrimeAttribute, CrimeIncidentKey, CrimeType
+from .rollups import apply_rollup_deltas, rollup_deltas
+from .serializers import CrimeBulkItemSerializer
+from .gridcache import invalidate_all_grids
+
+# Rows per INSERT statement
+BULK_BATCH_SIZE = 1000
+
+# Largest batch accepted by the bulk ingestion endpoint
+BULK_MAX_ROWS = 50000
+
+# Size of the IN (...) lists used for the batch-level lookups
+LOOKUP_CHUNK_SIZE = 5000
+
+
+def _existing_values(queryset, field, values):
+    """Return the subset of values already present in queryset, in chunks"""
+    values = list(values)
+    existing = set()
+    for start in range(0, len(values), LOOKUP_CHUNK_SIZE):
+        chunk = values[start:start + LOOKUP_CHUNK_SIZE]
+        existing.update(
+            queryset.filter(**{f'{field}__in': chunk}).values_list(field, flat=True)
+        )
+    return existing
+
+
+def bulk_ingest_crimes(rows, batch_size=BULK_BATCH_SIZE):
+    """
+    Validate a batch of incident rows and insert every valid row with
+    set-based inserts inside a single transaction.
+
+    Returns a tuple of (created crimes, {row index: errors}).
+    """
+    validated, errors = CrimeBulkItemSerializer(data=rows, many=True).validate_rows()
+
+    # Lookups that would otherwise cost one query per row
+    incident_ids = {data['incident_id'] for _, data in validated}
+    existing_incidents = _existing_values(CrimeIncidentKey.objects.all(), 'incident_id', incident_ids)
+    crime_type_ids = _existing_values(
+        CrimeType.objects.all(), 'pk', {data['crime_type_id'] for _, data in validated}
+    )
+    agency_ids = _existing_values(
+        Agency.objects.all(), 'pk', {data['agency_id'] for _, data in validated}
+    )
+
+    crimes = []
+    attributes = []
+    seen_incidents = set()
+    for index, data in validated:
+        row_errors = {}
+        incident_id = data['incident_id']
+        if incident_id in existing_incidents:
+            row_errors['incident_id'] = ['crime with this incident id already exists.']
+        elif incident_id in seen_incidents:
+            row_errors['incident_id'] = ['Duplicate incident id within this batch.']
+        if data['crime_type_id'] not in crime_type_ids:
+            row_errors['crime_type'] = [f'Invalid pk "{data["crime_type_id"]}" - object does not exist.']
+        if data['agency_id'] not in agency_ids:
+            row_errors['agency'] = [f'Invalid pk "{data["agency_id"]}" - object does not exist.']
+        if row_errors:
+            errors[index] = row_errors
+            continue
+
+        seen_incidents.add(incident_id)
+        data = dict(data)
+        attributes_data = data.pop('attributes', [])
+        longitude = data.pop('longitude')
+        latitude = data.pop('latitude')
+
+        crime = Crime(**data)
+        crime.set_location(longitude, latitude)
+        crimes.append(crime)
+        attributes.append(attributes_data)
+
+    with transaction.atomic():
+        Crime.objects.bulk_create(crimes, batch_size=batch_size)
+        CrimeAttribute.objects.bulk_create(
+            [
+                CrimeAttribute(crime=crime, **attribute_data)
+                for crime, attributes_data in zip(crimes, attributes)
+                for attribute_data in attributes_data
+            ],
+            batch_size=batch_size
+        )
+        # bulk_create doesn't send signals, so derived data is maintained here
+        apply_rollup_deltas(rollup_deltas(crimes))
+        transaction.on_commit(lambda: invalidate_all_grids(crime.location for crime in crimes))
+        bump_data_version(CRIMES_SCOPE)
+
+    return crimes, errors
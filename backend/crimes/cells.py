@@ -0,0 +1,103 @@
+from django.contrib.gis.geos import Polygon
+from django.db.models import F
+from .geo import HEATMAP_CELLS_PER_TILE, block_for_point, block_size
+
+# Resolutions stored on every incident, each in a grid_r<resolution> column.
+# A cell at resolution r is a lon/lat grid block of 360 / 2**r degrees
+# (about 39 km, 2.4 km and 300 m at the equator).
+GRID_RESOLUTIONS = (10, 14, 17)
+
+MAX_GRID_RESOLUTION = max(GRID_RESOLUTIONS)
+
+# Most cells returned by one grid aggregation
+MAX_GRID_CELLS = 10000
+
+
+def grid_field(resolution):
+    return f'grid_r{resolution}'
+
+
+def resolution_for_zoom(zoom, cells_per_tile=HEATMAP_CELLS_PER_TILE):
+    """Resolution whose cells match the grid_cell_size of a map zoom level"""
+    return zoom + cells_per_tile.bit_length() - 1
+
+
+def cell_id(longitude, latitude, resolution):
+    """
+    Hierarchical integer id of the cell containing a point. The block (x, y)
+    bits are interleaved (Morton order) under a leading 1 bit that marks the
+    resolution, so a cell's parent is ``cell >> 2`` and ids of different
+    resolutions never collide.
+    """
+    x, y = block_for_point(longitude, latitude, resolution)
+    scale = 2 ** resolution
+    x = min(max(x, 0), scale - 1)
+    y = min(max(y, 0), max(scale // 2 - 1, 0))
+
+    cell = 1
+    for bit in range(resolution - 1, -1, -1):
+        cell = (cell << 2) | (((y >> bit) & 1) << 1) | ((x >> bit) & 1)
+    return cell
+
+
+def cell_resolution(cell):
+    return (cell.bit_length() - 1) // 2
+
+
+def parent_cell(cell, resolution):
+    """Id of the ancestor of cell at a coarser resolution"""
+    return cell >> (2 * (cell_resolution(cell) - resolution))
+
+
+def cell_block(cell):
+    """Return the (resolution, x, y) grid block of a cell id"""
+    resolution = cell_resolution(cell)
+    x = y = 0
+    for bit in range(resolution - 1, -1, -1):
+        pair = (cell >> (2 * bit)) & 3
+        x = (x << 1) | (pair & 1)
+        y = (y << 1) | (pair >> 1)
+    return resolution, x, y
+
+
+def cell_bounds(cell):
+    """Return the (min_lon, min_lat, max_lon, max_lat) bounds of a cell"""
+    resolution, x, y = cell_block(cell)
+    size = block_size(resolution)
+    return (
+        x * size - 180.0,
+        y * size - 90.0,
+        min((x + 1) * size - 180.0, 180.0),
+        min((y + 1) * size - 90.0, 90.0)
+    )
+
+
+def cell_polygon(cell):
+    """WGS84 polygon of a cell, for responses"""
+    polygon = Polygon.from_bbox(cell_bounds(cell))
+    polygon.srid = 4326
+    return polygon
+
+
+def cell_center(cell):
+    min_lon, min_lat, max_lon, max_lat = cell_bounds(cell)
+    return (min_lon + max_lon) / 2, (min_lat + max_lat) / 2
+
+
+def cell_expression(resolution):
+    """
+    SQL expression of the incident's cell at any resolution up to the finest
+    stored one, derived from the nearest finer stored column by an integer
+    shift (division by a power of 4), so no geometry is involved.
+    """
+    stored = min(r for r in GRID_RESOLUTIONS if r >= resolution)
+    shift = stored - resolution
+    if not shift:
+        return F(grid_field(stored))
+    return F(grid_field(stored)) / (4 ** shift)
+
+
+def cells_for_point(longitude, latitude):
+    """Return {field name: cell id} for every stored resolution"""
+    cell = cell_id(longitude, latitude, MAX_GRID_RESOLUTION)
+    return {grid_field(resolution): parent_cell(cell, resolution) for resolution in GRID_RESOLUTIONS}
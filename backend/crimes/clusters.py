@@ -0,0 +1,122 @@
+from collections import defaultdict
+from django.contrib.gis.geos import Polygon
+from django.core.cache import cache
+from django.db.models import Count, F, Sum
+from django.db.models.functions import Floor
+from .geo import Latitude, Longitude, block_size, in_box
+from .gridcache import CLUSTER_NAMESPACE, get_version, params_digest
+
+# Clusters are computed on a grid of CLUSTER_CELLS_PER_BLOCK x CLUSTER_CELLS_PER_BLOCK
+# cells per block, where a block spans one map tile width at the requested zoom
+CLUSTER_CELLS_PER_BLOCK = 8
+
+# Largest number of blocks a single viewport request may cover
+MAX_CLUSTER_BLOCKS = 64
+
+CLUSTER_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def blocks_for_bbox(bbox, zoom):
+    """Return every (x, y) grid block at zoom overlapping a (min_lon, min_lat, max_lon, max_lat) box"""
+    min_lon, min_lat, max_lon, max_lat = bbox
+    size = block_size(zoom)
+    max_x = 2 ** zoom - 1
+    max_y = max(2 ** zoom // 2 - 1, 0)
+
+    def clamp(value, upper):
+        return min(max(int(value), 0), upper)
+
+    return [
+        (x, y)
+        for x in range(clamp((min_lon + 180.0) // size, max_x), clamp((max_lon + 180.0) // size, max_x) + 1)
+        for y in range(clamp((min_lat + 90.0) // size, max_y), clamp((max_lat + 90.0) // size, max_y) + 1)
+    ]
+
+
+def _cache_key(zoom, x, y, params):
+    version = get_version(CLUSTER_NAMESPACE, zoom, x, y)
+    return f'crimes:clusters:{zoom}:{x}:{y}:{version}:{params_digest(params)}'
+
+
+def _compute_blocks(queryset, zoom, blocks):
+    """
+    Cluster the incidents of queryset that fall in the given blocks with a
+    single grouped query. Returns {(x, y): [cluster, ...]}.
+    """
+    size = block_size(zoom)
+    cell_size = size / CLUSTER_CELLS_PER_BLOCK
+    min_x = min(x for x, _ in blocks)
+    max_x = max(x for x, _ in blocks)
+    min_y = min(y for _, y in blocks)
+    max_y = max(y for _, y in blocks)
+
+    area = Polygon.from_bbox((
+        min_x * size - 180.0,
+        min_y * size - 90.0,
+        min((max_x + 1) * size - 180.0, 180.0),
+        min((max_y + 1) * size - 90.0, 90.0)
+    ))
+    area.srid = 4326
+
+    rows = in_box(queryset, area).annotate(
+        longitude=Longitude(),
+        latitude=Latitude()
+    ).annotate(
+        cell_x=Floor((F('longitude') + 180.0) / cell_size),
+        cell_y=Floor((F('latitude') + 90.0) / cell_size)
+    ).values(
+        'cell_x', 'cell_y', 'crime_type__category__name'
+    ).annotate(
+        count=Count('id'),
+        longitude_sum=Sum('longitude'),
+        latitude_sum=Sum('latitude')
+    )
+
+    cells = defaultdict(lambda: {'count': 0, 'longitude_sum': 0.0, 'latitude_sum': 0.0, 'categories': {}})
+    for row in rows:
+        cell = cells[(int(row['cell_x']), int(row['cell_y']))]
+        cell['count'] += row['count']
+        cell['longitude_sum'] += row['longitude_sum']
+        cell['latitude_sum'] += row['latitude_sum']
+        cell['categories'][row['crime_type__category__name']] = row['count']
+
+    wanted = set(blocks)
+    clusters = {block: [] for block in blocks}
+    for (cell_x, cell_y), cell in cells.items():
+        block = (cell_x // CLUSTER_CELLS_PER_BLOCK, cell_y // CLUSTER_CELLS_PER_BLOCK)
+        if block not in wanted:
+            continue
+        clusters[block].append({
+            'longitude': round(cell['longitude_sum'] / cell['count'], 6),
+            'latitude': round(cell['latitude_sum'] / cell['count'], 6),
+            'count': cell['count'],
+            'categories': cell['categories']
+        })
+    return clusters
+
+
+def viewport_clusters(queryset, zoom, bbox, params):
+    """
+    Clusters of queryset covering the bbox viewport at zoom. Clusters are
+    cached per grid block, so panning reuses the blocks already computed.
+    params are the filter parameters that shaped queryset, scoped to what
+    the request may see (see CrimeViewSet.cache_scope), for cache keys.
+    """
+    blocks = blocks_for_bbox(bbox, zoom)
+    keys = {block: _cache_key(zoom, *block, params) for block in blocks}
+    cached = cache.get_many(list(keys.values()))
+
+    clusters = {block: cached[key] for block, key in keys.items() if key in cached}
+    missing = [block for block in blocks if block not in clusters]
+    if missing:
+        computed = _compute_blocks(queryset, zoom, missing)
+        cache.set_many({keys[block]: computed[block] for block in missing}, CLUSTER_CACHE_TIMEOUT)
+        clusters.update(computed)
+
+    min_lon, min_lat, max_lon, max_lat = bbox
+    return [
+        cluster
+        for block in blocks
+        for cluster in clusters[block]
+        if min_lon <= cluster['longitude'] <= max_lon and min_lat <= cluster['latitude'] <= max_lat
+    ]
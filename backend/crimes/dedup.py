@@ -0,0 +1,248 @@
+from collections import Counter, defaultdict
+from datetime import timedelta
+from django.db import connection, transaction
+from django.utils import timezone
+from crime_analysis.conditional import CRIMES_SCOPE, bump_data_version
+from .gridcache import invalidate_all_grids
+from .models import Crime, CrimeDuplicateGroup, CrimeDuplicateMember, CrimeType
+from .rollups import TRACKED_FIELDS, apply_rollup_deltas, rollup_key
+
+# Blocking window: only incidents this close in space and time are compared
+DUPLICATE_DISTANCE_METERS = 200
+DUPLICATE_TIME_WINDOW = timedelta(hours=2)
+
+# Weights of the candidate score components (they add up to 1)
+SCORE_WEIGHTS = {
+    'distance': 0.35,
+    'time': 0.35,
+    'crime_type': 0.2,
+    'address': 0.1,
+}
+
+# Candidates scoring at least this much are linked as duplicates
+DUPLICATE_SCORE_THRESHOLD = 0.6
+
+# Span of occurred_at handled per query in batch mode
+BATCH_WINDOW = timedelta(days=1)
+
+DUPLICATE_STATUS = 'duplicate'
+
+CANDIDATES_SQL = """
+    SELECT
+        a.id,
+        b.id,
+        ST_Distance(a.location, b.location),
+        ABS(EXTRACT(EPOCH FROM (a.occurred_at - b.occurred_at))),
+        a.crime_type_id = b.crime_type_id,
+        similarity(a.block_address, b.block_address)
+    FROM {crime} a
+    JOIN {crime_type} ta ON ta.id = a.crime_type_id
+    JOIN {crime} b
+        ON b.occurred_at BETWEEN a.occurred_at - %(window)s AND a.occurred_at + %(window)s
+        AND ST_DWithin(a.location, b.location, %(distance)s)
+        AND b.agency_id <> a.agency_id
+        AND b.is_active
+    JOIN {crime_type} tb ON tb.id = b.crime_type_id AND tb.category_id = ta.category_id
+    WHERE a.is_active AND {condition}
+"""
+
+
+def score_candidate(distance, seconds, same_crime_type, address_similarity):
+    """Score (0-1) of how likely two blocked incidents are to be the same event"""
+    window = DUPLICATE_TIME_WINDOW.total_seconds()
+    return (
+        SCORE_WEIGHTS['distance'] * max(0.0, 1 - distance / DUPLICATE_DISTANCE_METERS) +
+        SCORE_WEIGHTS['time'] * max(0.0, 1 - float(seconds) / window) +
+        SCORE_WEIGHTS['crime_type'] * (1.0 if same_crime_type else 0.0) +
+        SCORE_WEIGHTS['address'] * (address_similarity or 0.0)
+    )
+
+
+def _candidates(condition, params):
+    """
+    Yield (id, id, score) for the pairs of active incidents from different
+    agencies that share a crime category and fall in the blocking window.
+    The window predicates are answered from the occurred_at and location
+    indexes, so each incident is only compared with its few neighbours.
+    """
+    sql = CANDIDATES_SQL.format(
+        crime=Crime._meta.db_table,
+        crime_type=CrimeType._meta.db_table,
+        condition=condition
+    )
+    params = {'window': DUPLICATE_TIME_WINDOW, 'distance': DUPLICATE_DISTANCE_METERS, **params}
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        for first, second, distance, seconds, same_type, similarity in cursor.fetchall():
+            score = score_candidate(distance, seconds, same_type, similarity)
+            if score >= DUPLICATE_SCORE_THRESHOLD:
+                yield first, second, score
+
+
+class _DisjointSet:
+    def __init__(self):
+        self.parent = {}
+
+    def find(self, node):
+        self.parent.setdefault(node, node)
+        root = node
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[node] != root:
+            self.parent[node], node = root, self.parent[node]
+        return root
+
+    def union(self, first, second):
+        self.parent[self.find(first)] = self.find(second)
+
+    def components(self):
+        groups = defaultdict(set)
+        for node in self.parent:
+            groups[self.find(node)].add(node)
+        return list(groups.values())
+
+
+def _apply_statuses(rows, statuses):
+    """
+    Write new verification statuses with one UPDATE per status, keeping the
+    daily rollup and the cached map grids in step (queryset updates don't
+    send signals).
+    """
+    changed = {pk: status for pk, status in statuses.items() if rows[pk]['verification_status'] != status}
+    if not changed:
+        return
+
+    deltas = Counter()
+    for pk, status in changed.items():
+        row = rows[pk]
+        if row['is_active']:
+            deltas[rollup_key(row)] -= 1
+            deltas[rollup_key({**row, 'verification_status': status})] += 1
+
+    by_status = defaultdict(list)
+    for pk, status in changed.items():
+        by_status[status].append(pk)
+    now = timezone.now()
+    for status, pks in by_status.items():
+        Crime.all_objects.for_ids(pks).update(verification_status=status, updated_at=now)
+
+    apply_rollup_deltas(deltas)
+    points = [rows[pk]['location'] for pk in changed]
+    transaction.on_commit(lambda: invalidate_all_grids(points))
+    bump_data_version(CRIMES_SCOPE)
+
+
+@transaction.atomic
+def link_duplicates(pairs):
+    """
+    Merge scored (id, id, score) pairs into duplicate groups. Pairs that touch
+    incidents already in a group join (and merge) those groups. In every
+    group the earliest reported incident is canonical and keeps its status,
+    the others are marked as duplicates. Returns the number of groups
+    created or changed.
+    """
+    links = _DisjointSet()
+    best_scores = defaultdict(float)
+    for first, second, score in pairs:
+        links.union(first, second)
+        best_scores[first] = max(best_scores[first], score)
+        best_scores[second] = max(best_scores[second], score)
+    if not best_scores:
+        return 0
+
+    # Pull existing groups into the components through a node per group
+    memberships = CrimeDuplicateMember.objects.select_for_update().filter(
+        group__in=CrimeDuplicateMember.objects.filter(crime__in=list(best_scores)).values('group')
+    )
+    members = {member.crime_id: member for member in memberships}
+    for member in members.values():
+        links.union(member.crime_id, ('group', member.group_id))
+
+    crime_ids = {node for node in links.parent if not isinstance(node, tuple)}
+    rows = {
+        row['id']: row
+        for row in Crime.all_objects.for_ids(crime_ids).values(
+            'id', 'reported_at', 'location', *TRACKED_FIELDS
+        )
+    }
+
+    statuses = {}
+    touched = 0
+    for component in links.components():
+        crimes = sorted(
+            (node for node in component if not isinstance(node, tuple) and node in rows),
+            key=lambda pk: (rows[pk]['reported_at'], pk)
+        )
+        group_ids = sorted(node[1] for node in component if isinstance(node, tuple))
+        if len(crimes) < 2:
+            continue
+
+        canonical = crimes[0]
+        if group_ids:
+            group_id = group_ids[0]
+            if len(group_ids) > 1:
+                CrimeDuplicateMember.objects.filter(group__in=group_ids[1:]).update(group=group_id)
+                CrimeDuplicateGroup.objects.filter(pk__in=group_ids[1:]).delete()
+            CrimeDuplicateGroup.objects.filter(pk=group_id).update(
+                canonical=canonical, updated_at=timezone.now()
+            )
+        else:
+            group_id = CrimeDuplicateGroup.objects.create(canonical_id=canonical).pk
+
+        new_members = []
+        for pk in crimes:
+            member = members.get(pk)
+            if member is None:
+                current = rows[pk]['verification_status']
+                new_members.append(CrimeDuplicateMember(
+                    group_id=group_id,
+                    crime_id=pk,
+                    score=best_scores[pk],
+                    previous_status=current if current != DUPLICATE_STATUS else 'unverified'
+                ))
+                previous_status = new_members[-1].previous_status
+            else:
+                if best_scores[pk] > member.score:
+                    CrimeDuplicateMember.objects.filter(pk=member.pk).update(score=best_scores[pk])
+                previous_status = member.previous_status
+            statuses[pk] = previous_status if pk == canonical else DUPLICATE_STATUS
+        CrimeDuplicateMember.objects.bulk_create(new_members)
+        touched += 1
+
+    _apply_statuses(rows, statuses)
+    return touched
+
+
+def detect_duplicates_for(crime_ids):
+    """
+    Incremental mode: compare the given (typically newly loaded) incidents
+    with every incident in their blocking window and link the duplicates.
+    Returns the number of groups created or changed.
+    """
+    crime_ids = list(crime_ids)
+    if not crime_ids:
+        return 0
+    pairs = list(_candidates('a.id = ANY(%(ids)s)', {'ids': crime_ids}))
+    return link_duplicates(pairs)
+
+
+def detect_duplicates(start, end, window=BATCH_WINDOW):
+    """
+    Batch mode: find the duplicates among incidents that occurred between
+    start and end, one window of occurred_at at a time. Each pair is found
+    once, from its earlier incident, so the work grows with the number of
+    incidents rather than with the number of pairs. Returns the number of
+    groups created or changed.
+    """
+    touched = 0
+    window_start = start
+    while window_start < end:
+        window_end = min(window_start + window, end)
+        pairs = list(_candidates(
+            'a.occurred_at >= %(start)s AND a.occurred_at < %(end)s '
+            'AND (b.occurred_at, b.id) > (a.occurred_at, a.id)',
+            {'start': window_start, 'end': window_end}
+        ))
+        touched += link_duplicates(pairs)
+        window_start = window_end
+    return touched
@@ -0,0 +1,110 @@
+import threading
+import time
+from collections import namedtuple
+from django.apps import apps
+from django.core.cache import cache
+
+# Snapshot rows of the small, rarely changing tables incidents refer to
+CrimeCategoryEntry = namedtuple('CrimeCategoryEntry', ['id', 'name'])
+CrimeTypeEntry = namedtuple(
+    'CrimeTypeEntry', ['id', 'name', 'category_id', 'category_name', 'severity_level']
+)
+AgencyEntry = namedtuple('AgencyEntry', ['id', 'name', 'agency_code'])
+
+# Shared cache key holding the current version of the dimension tables
+DIMENSION_VERSION_KEY = 'crimes:dimensions:version'
+
+# Seconds a process trusts its snapshot before checking the shared version again
+VERSION_CHECK_INTERVAL = 5
+
+
+class DimensionCache:
+    """
+    Per-process snapshot of crime categories, crime types and agencies.
+
+    The snapshot is loaded once and reused until the shared version key
+    changes, which happens whenever one of the tables is written (see
+    crimes.signals). Lookups are dictionary reads, so names can be resolved
+    without joins or per-row queries.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._version = None
+        self._checked_at = 0.0
+
+    def _shared_version(self):
+        version = cache.get(DIMENSION_VERSION_KEY)
+        if version is None:
+            cache.add(DIMENSION_VERSION_KEY, time.time_ns(), None)
+            version = cache.get(DIMENSION_VERSION_KEY)
+        return version
+
+    def _load(self):
+        CrimeCategory = apps.get_model('crimes', 'CrimeCategory')
+        CrimeType = apps.get_model('crimes', 'CrimeType')
+        Agency = apps.get_model('agencies', 'Agency')
+
+        categories = {
+            row['id']: CrimeCategoryEntry(**row)
+            for row in CrimeCategory.objects.values('id', 'name')
+        }
+        crime_types = {
+            row['id']: CrimeTypeEntry(
+                category_name=categories[row['category_id']].name if row['category_id'] in categories else None,
+                **row
+            )
+            for row in CrimeType.objects.values('id', 'name', 'category_id', 'severity_level')
+        }
+        agencies = {
+            row['id']: AgencyEntry(**row)
+            for row in Agency.objects.values('id', 'name', 'agency_code')
+        }
+        return {'category': categories, 'crime_type': crime_types, 'agency': agencies}
+
+    def snapshot(self):
+        """Return the current {dimension: {pk: entry}} snapshot, reloading it if it is stale"""
+        now = time.monotonic()
+        if self._snapshot is not None and now - self._checked_at < VERSION_CHECK_INTERVAL:
+            return self._snapshot
+
+        with self._lock:
+            if self._snapshot is not None and now - self._checked_at < VERSION_CHECK_INTERVAL:
+                return self._snapshot
+            version = self._shared_version()
+            if self._snapshot is None or version != self._version:
+                self._snapshot = self._load()
+                self._version = version
+            self._checked_at = now
+            return self._snapshot
+
+    def get(self, dimension, pk):
+        """Entry of the given dimension ('category', 'crime_type' or 'agency') with pk, or None"""
+        if pk is None:
+            return None
+        entry = self.snapshot()[dimension].get(pk)
+        if entry is None:
+            # The row may be newer than the snapshot, so check the shared version now
+            self._checked_at = 0.0
+            entry = self.snapshot()[dimension].get(pk)
+        return entry
+
+    def category(self, pk):
+        return self.get('category', pk)
+
+    def crime_type(self, pk):
+        return self.get('crime_type', pk)
+
+    def agency(self, pk):
+        return self.get('agency', pk)
+
+    def invalidate(self):
+        """Drop the local snapshot and bump the shared version so other processes reload too"""
+        cache.set(DIMENSION_VERSION_KEY, time.time_ns(), None)
+        with self._lock:
+            self._snapshot = None
+            self._version = None
+
+
+dimensions = DimensionCache()
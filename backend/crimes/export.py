@@ -0,0 +1,91 @@
+import json
+from django.core.serializers.json import DjangoJSONEncoder
+from .geo import Latitude, Longitude
+from .serializers import CrimeGeoSerializer, DimensionNameField
+
+# Rows fetched per round trip from the server-side cursor
+EXPORT_CHUNK_SIZE = 2000
+
+# Rows encoded into each chunk written to the response
+EXPORT_WRITE_SIZE = 500
+
+
+def export_columns():
+    """
+    Map the property fields of CrimeGeoSerializer to (name, ORM lookup,
+    converter) triples, so export rows can be fetched with values() instead
+    of serializing each instance. Converters resolve cached dimension names.
+    """
+    serializer = CrimeGeoSerializer()
+    meta = CrimeGeoSerializer.Meta
+    id_field = getattr(meta, 'id_field', 'id')
+    return [
+        (
+            name,
+            field.source.replace('.', '__'),
+            field.to_representation if isinstance(field, DimensionNameField) else None
+        )
+        for name, field in serializer.fields.items()
+        if name not in (meta.geo_field, id_field)
+    ]
+
+
+def _rows(queryset):
+    """Yield (id, properties, longitude, latitude) for every incident in queryset"""
+    columns = export_columns()
+    lookups = {lookup for _, lookup, _ in columns}
+    rows = queryset.values('id', *lookups, export_longitude=Longitude(), export_latitude=Latitude())
+    for row in rows.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        properties = {
+            name: convert(row[lookup]) if convert else row[lookup]
+            for name, lookup, convert in columns
+        }
+        yield row['id'], properties, row['export_longitude'], row['export_latitude']
+
+
+def _chunked(lines):
+    buffer = []
+    for line in lines:
+        buffer.append(line)
+        if len(buffer) >= EXPORT_WRITE_SIZE:
+            yield ''.join(buffer)
+            buffer = []
+    if buffer:
+        yield ''.join(buffer)
+
+
+def stream_geojson(queryset):
+    """Stream queryset as a GeoJSON FeatureCollection, one chunk of features at a time"""
+    def features():
+        separator = ''
+        for pk, properties, longitude, latitude in _rows(queryset):
+            yield separator + json.dumps({
+                'type': 'Feature',
+                'id': pk,
+                'geometry': {'type': 'Point', 'coordinates': [longitude, latitude]},
+                'properties': properties
+            }, cls=DjangoJSONEncoder)
+            separator = ','
+
+    yield '{"type": "FeatureCollection", "features": ['
+    yield from _chunked(features())
+    yield ']}\n'
+
+
+def stream_ndjson(queryset):
+    """Stream queryset as newline-delimited JSON, one flat record per incident"""
+    def records():
+        for pk, properties, longitude, latitude in _rows(queryset):
+            yield json.dumps(
+                {'id': pk, **properties, 'longitude': longitude, 'latitude': latitude},
+                cls=DjangoJSONEncoder
+            ) + '\n'
+
+    yield from _chunked(records())
+
+
+# Export format -> (streaming function, content type)
+EXPORT_FORMATS = {
+    'geojson': (stream_geojson, 'application/geo+json'),
+    'ndjson': (stream_ndjson, 'application/x-ndjson'),
+}
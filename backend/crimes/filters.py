@@ -0,0 +1,266 @@
+import json
+import django_filters
+from django.contrib.gis.gdal import GDALException
+from django.contrib.gis.geos import GEOSException, GEOSGeometry, Point, Polygon
+from django.contrib.gis.measure import D
+from django.db.models import CharField, Exists, F, Func, OuterRef
+from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework import fields
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend, OrderingFilter, SearchFilter, search_smart_split
+from agencies.models import Agency
+from reports.models import Report
+from .models import Crime, CrimeAttribute, CrimeDailyRollup
+
+# Query parameter prefix of the crime attribute filters (?attr.weapon=firearm)
+ATTRIBUTE_PARAM_PREFIX = 'attr.'
+
+# Comparison lookups accepted on numeric attributes (?attr.victims__gte=2)
+ATTRIBUTE_RANGE_LOOKUPS = ('gt', 'gte', 'lt', 'lte')
+
+
+def parse_bbox_coords(value):
+    """Parse a 'min_lon,min_lat,max_lon,max_lat' string into a tuple of floats"""
+    try:
+        min_lon, min_lat, max_lon, max_lat = (float(part) for part in value.split(','))
+    except ValueError:
+        raise ValidationError({'bbox': 'Expected min_lon,min_lat,max_lon,max_lat'})
+
+    if not (-180 <= min_lon < max_lon <= 180 and -90 <= min_lat < max_lat <= 90):
+        raise ValidationError({'bbox': 'Bounding box is outside the valid coordinate range'})
+    return min_lon, min_lat, max_lon, max_lat
+
+
+def parse_bbox(value):
+    """Parse a 'min_lon,min_lat,max_lon,max_lat' string into a WGS84 polygon"""
+    polygon = Polygon.from_bbox(parse_bbox_coords(value))
+    polygon.srid = 4326
+    return polygon
+
+
+# Largest radius accepted by the near filter, in meters
+MAX_NEAR_RADIUS = 100000
+
+# Largest number of vertices accepted in a within_polygon geometry
+MAX_POLYGON_VERTICES = 10000
+
+
+def parse_polygon(value, param='within_polygon'):
+    """Parse a GeoJSON or WKT polygon (or multipolygon) into a WGS84 geometry"""
+    try:
+        geometry = GEOSGeometry(value)
+        if geometry.srid is None:
+            geometry.srid = 4326
+        elif geometry.srid != 4326:
+            geometry.transform(4326)
+    except (ValueError, TypeError, GEOSException, GDALException):
+        raise ValidationError({param: 'Expected a GeoJSON or WKT polygon'})
+
+    if geometry.geom_type not in ('Polygon', 'MultiPolygon'):
+        raise ValidationError({param: 'Expected a Polygon or MultiPolygon'})
+    if geometry.num_coords > MAX_POLYGON_VERTICES:
+        raise ValidationError({param: f'Polygon may have at most {MAX_POLYGON_VERTICES} vertices'})
+    if not geometry.valid:
+        raise ValidationError({param: f'Invalid polygon: {geometry.valid_reason}'})
+    return geometry
+
+
+def parse_near(value):
+    """Parse a 'lon,lat,radius' string (radius in meters) into a (point, distance) pair"""
+    try:
+        longitude, latitude, radius = (float(part) for part in value.split(','))
+    except ValueError:
+        raise ValidationError({'near': 'Expected lon,lat,radius'})
+
+    if not (-180 <= longitude <= 180 and -90 <= latitude <= 90):
+        raise ValidationError({'near': 'Point is outside the valid coordinate range'})
+    if not 0 < radius <= MAX_NEAR_RADIUS:
+        raise ValidationError({'near': f'Radius must be between 0 and {MAX_NEAR_RADIUS} meters'})
+    return Point(longitude, latitude, srid=4326), D(m=radius)
+
+
+def parse_attribute_value(value):
+    """Read a query string value as JSON when possible, otherwise as a plain string"""
+    try:
+        return json.loads(value)
+    except ValueError:
+        return value
+
+
+class NumberInFilter(django_filters.BaseInFilter, django_filters.NumberFilter):
+    """Comma separated list of numbers"""
+
+
+class CrimeFilter(django_filters.FilterSet):
+    """
+    FilterSet for crime incidents. Adds date-range and spatial filters on
+    top of the plain field filters.
+
+    The spatial filters compile to ST_Intersects / ST_DWithin against a
+    constant geometry, so they are answered from the location GiST index:
+    ``in_bbox`` (``bbox`` is kept as an alias) takes a viewport,
+    ``within_polygon`` a GeoJSON or WKT polygon or the id of one of the
+    user's saved report areas, ``within_agency`` an agency id whose
+    jurisdiction area is used, and ``near`` a lon,lat,radius in meters.
+    """
+    occurred_after = django_filters.DateTimeFilter(field_name='occurred_at', lookup_expr='gte')
+    occurred_before = django_filters.DateTimeFilter(field_name='occurred_at', lookup_expr='lte')
+    crime_types = NumberInFilter(field_name='crime_type', lookup_expr='in', label='Crime type ids')
+    bbox = django_filters.CharFilter(method='filter_bbox', label='min_lon,min_lat,max_lon,max_lat')
+    in_bbox = django_filters.CharFilter(method='filter_bbox', label='min_lon,min_lat,max_lon,max_lat')
+    within_polygon = django_filters.CharFilter(method='filter_within_polygon', label='GeoJSON, WKT or saved area id')
+    within_agency = django_filters.NumberFilter(method='filter_within_agency', label='Agency id')
+    near = django_filters.CharFilter(method='filter_near', label='lon,lat,radius (meters)')
+
+    class Meta:
+        model = Crime
+        fields = [
+            'crime_type',
+            'agency',
+            'city',
+            'state',
+            'verification_status',
+            'occurred_at',
+            'reported_at'
+        ]
+
+    def filter_bbox(self, queryset, name, value):
+        return queryset.filter(location__intersects=parse_bbox(value))
+
+    def filter_within_polygon(self, queryset, name, value):
+        if value.strip().isdigit():
+            user = getattr(self.request, 'user', None)
+            if user is None or not user.is_authenticated:
+                raise ValidationError({name: 'Saved areas require authentication'})
+            area = Report.objects.filter(pk=int(value), user=user).values_list(
+                'area_of_interest', flat=True
+            ).first()
+            if area is None:
+                raise ValidationError({name: 'Saved area not found'})
+        else:
+            area = parse_polygon(value, name)
+        return queryset.filter(location__intersects=area)
+
+    def filter_within_agency(self, queryset, name, value):
+        # Fetched first, so the predicate compares against a constant the
+        # planner can use the index for, rather than a correlated subquery
+        area = Agency.objects.filter(pk=value).values_list('jurisdiction_area', flat=True).first()
+        if area is None:
+            raise ValidationError({name: 'Agency not found or has no jurisdiction area'})
+        return queryset.filter(location__intersects=area)
+
+    def filter_near(self, queryset, name, value):
+        point, distance = parse_near(value)
+        return queryset.filter(location__dwithin=(point, distance))
+
+
+
+class CrimeRollupFilter(django_filters.FilterSet):
+    """FilterSet for the daily rollup, using the same parameter names as CrimeFilter"""
+    occurred_after = django_filters.DateFilter(field_name='date', lookup_expr='gte')
+    occurred_before = django_filters.DateFilter(field_name='date', lookup_expr='lte')
+    category = django_filters.NumberFilter(field_name='crime_type__category')
+
+    class Meta:
+        model = CrimeDailyRollup
+        fields = [
+            'crime_type',
+            'agency',
+            'city',
+            'state',
+            'verification_status'
+        ]
+
+
+
+class CrimeAttributeFilter(django_filters.FilterSet):
+    """FilterSet for crime attributes. ``value`` matches by JSON containment."""
+    value = django_filters.CharFilter(method='filter_value')
+
+    class Meta:
+        model = CrimeAttribute
+        fields = ['crime', 'name']
+
+    def filter_value(self, queryset, name, value):
+        return queryset.filter(value__contains=parse_attribute_value(value))
+
+
+class ExplicitParamsMixin:
+    """
+    Lets a filter backend run with explicit parameters in place of the
+    request's query string, through ``filter_params``. Views use it for
+    actions whose filters come from a POST body, or that leave some of
+    their own parameters out of the filters.
+    """
+    params = None
+
+    def filter_params(self, request, queryset, view, params):
+        self.params = params
+        return self.filter_queryset(request, queryset, view)
+
+    def get_params(self, request):
+        return request.query_params if self.params is None else self.params
+
+
+class CrimeSearchFilter(ExplicitParamsMixin, SearchFilter):
+    """SearchFilter (``?search=``) accepting explicit parameters"""
+
+    def get_search_terms(self, request):
+        value = self.get_params(request).get(self.search_param, '')
+        value = fields.CharField(trim_whitespace=False, allow_blank=True).run_validation(value)
+        return search_smart_split(value)
+
+
+class CrimeOrderingFilter(ExplicitParamsMixin, OrderingFilter):
+    """OrderingFilter (``?ordering=``) accepting explicit parameters"""
+
+    def get_ordering(self, request, queryset, view):
+        value = self.get_params(request).get(self.ordering_param)
+        if value:
+            ordering = self.remove_invalid_fields(
+                queryset, [term.strip() for term in value.split(',')], view, request
+            )
+            if ordering:
+                return ordering
+        return self.get_default_ordering(view)
+
+
+class CrimeFilterBackend(ExplicitParamsMixin, DjangoFilterBackend):
+    """DjangoFilterBackend binding the view's filterset to explicit parameters"""
+
+    def get_filterset_kwargs(self, request, queryset, view):
+        return {**super().get_filterset_kwargs(request, queryset, view), 'data': self.get_params(request)}
+
+
+class CrimeAttributeFilterBackend(ExplicitParamsMixin, BaseFilterBackend):
+    """
+    Filters crimes by their attributes. ``attr.<name>=<value>`` matches
+    attributes by JSON containment, which the (name, value) GIN index can
+    answer, and ``attr.<name>__gte=<number>`` (gt, gte, lt, lte) compares
+    numeric attributes.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        for param, values in self.get_params(request).lists():
+            if not param.startswith(ATTRIBUTE_PARAM_PREFIX):
+                continue
+            name, _, lookup = param[len(ATTRIBUTE_PARAM_PREFIX):].partition('__')
+            if not name:
+                raise ValidationError({param: 'Missing attribute name'})
+            if lookup and lookup not in ATTRIBUTE_RANGE_LOOKUPS:
+                raise ValidationError({param: f'Expected one of {", ".join(ATTRIBUTE_RANGE_LOOKUPS)}'})
+
+            for value in values:
+                attributes = CrimeAttribute.objects.filter(crime=OuterRef('pk'), name=name)
+                if lookup:
+                    try:
+                        number = float(value)
+                    except ValueError:
+                        raise ValidationError({param: 'Expected a number'})
+                    attributes = attributes.annotate(
+                        value_type=Func(F('value'), function='jsonb_typeof', output_field=CharField())
+                    ).filter(value_type='number', **{f'value__{lookup}': number})
+                else:
+                    attributes = attributes.filter(value__contains=parse_attribute_value(value))
+                queryset = queryset.filter(Exists(attributes))
+        return queryset
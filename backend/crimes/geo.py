@@ -0,0 +1,87 @@
+import math
+from django.contrib.gis.db.models import PointField
+from django.db.models import FloatField, Func
+from django.db.models.functions import Cast
+
+# Deepest web map zoom level accepted by the spatial endpoints
+MAX_ZOOM = 20
+
+# Web Mercator half-circumference in meters
+MERCATOR_HALF_WORLD = 20037508.342789244
+
+# Largest latitude representable in Web Mercator
+MERCATOR_MAX_LATITUDE = 85.0511287798066
+
+# Number of heatmap grid cells along the width of one 256px map tile
+HEATMAP_CELLS_PER_TILE = 64
+
+# Boxes at least this many degrees wide are tested as planar lon/lat boxes.
+# Geography edges are great circles, which bow away from a box's parallels
+# further the wider it is, and a box spanning half the world or more (a
+# tile at zoom 0 or 1) has no well-defined interior on the sphere.
+PLANAR_BOX_MIN_WIDTH = 5.0
+
+
+def as_geometry(expression='location'):
+    """Cast a geography point column to geometry so planar functions apply"""
+    return Cast(expression, output_field=PointField(srid=4326))
+
+
+def in_box(queryset, box, field='location'):
+    """
+    Rows of queryset whose point lies in a lon/lat box polygon. Narrow boxes
+    use a geography ST_Intersects the GiST index answers, wide ones a
+    geometry bounding box test (&&) on the point cast to lon/lat.
+    """
+    min_lon, _, max_lon, _ = box.extent
+    if max_lon - min_lon < PLANAR_BOX_MIN_WIDTH:
+        return queryset.filter(**{f'{field}__intersects': box})
+    return queryset.alias(planar_point=as_geometry(field)).filter(planar_point__bboverlaps=box)
+
+
+class Longitude(Func):
+    """Longitude of a point column, extracted in SQL"""
+    function = 'ST_X'
+    output_field = FloatField()
+
+    def __init__(self, expression='location', **extra):
+        super().__init__(as_geometry(expression), **extra)
+
+
+class Latitude(Func):
+    """Latitude of a point column, extracted in SQL"""
+    function = 'ST_Y'
+    output_field = FloatField()
+
+    def __init__(self, expression='location', **extra):
+        super().__init__(as_geometry(expression), **extra)
+
+
+def grid_cell_size(zoom, cells_per_tile=HEATMAP_CELLS_PER_TILE):
+    """Size in degrees of a grid cell at the given map zoom level"""
+    return 360.0 / (2 ** zoom) / cells_per_tile
+
+
+
+def tile_for_point(longitude, latitude, zoom):
+    """Return the (x, y) of the Web Mercator tile containing a point"""
+    latitude = max(-MERCATOR_MAX_LATITUDE, min(latitude, MERCATOR_MAX_LATITUDE))
+    scale = 2 ** zoom
+    x = int((longitude + 180.0) / 360.0 * scale)
+    lat_rad = math.radians(latitude)
+    y = int((1.0 - math.asinh(math.tan(lat_rad)) / math.pi) / 2.0 * scale)
+    return min(max(x, 0), scale - 1), min(max(y, 0), scale - 1)
+
+
+def block_size(zoom):
+    """Size in degrees of a square lon/lat grid block at the given zoom level"""
+    return 360.0 / (2 ** zoom)
+
+
+def block_for_point(longitude, latitude, zoom):
+    """
+    Return the (x, y) of the lon/lat grid block containing a point. Blocks
+    are anchored at (-180, -90) so a block's parent is (x >> 1, y >> 1).
+    """
+    size = block_size(zoom)
+    return int((longitude + 180.0) // size), int((latitude + 90.0) // size)
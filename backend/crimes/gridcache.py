@@ -0,0 +1,70 @@
+import hashlib
+import time
+from django.core.cache import cache
+from .geo import block_for_point, tile_for_point
+
+# Cells deeper than this share the cache version of their ancestor at this zoom,
+# so a single write only has to bump one version key per zoom level up to here
+VERSION_ZOOM = 10
+
+TILE_NAMESPACE = 'tiles'
+CLUSTER_NAMESPACE = 'clusters'
+
+# Function locating the cell containing a point, for every cached grid
+GRIDS = {
+    TILE_NAMESPACE: tile_for_point,
+    CLUSTER_NAMESPACE: block_for_point,
+}
+
+
+def _version_key(namespace, z, x, y):
+    if z > VERSION_ZOOM:
+        shift = z - VERSION_ZOOM
+        z, x, y = VERSION_ZOOM, x >> shift, y >> shift
+    return f'crimes:{namespace}:version:{z}:{x}:{y}'
+
+
+def get_version(namespace, z, x, y):
+    """
+    Current cache version of a grid cell. A missing key (never written or
+    evicted) is reset to the current time so stale entries can't resurface.
+    """
+    key = _version_key(namespace, z, x, y)
+    version = cache.get(key)
+    if version is None:
+        version = time.time_ns()
+        cache.add(key, version, None)
+        version = cache.get(key, version)
+    return version
+
+
+def invalidate_points(namespace, points):
+    """Bump the cache version of every cell of one grid containing one of the points"""
+    cell_for_point = GRIDS[namespace]
+    keys = set()
+    for point in points:
+        if point is None:
+            continue
+        for zoom in range(VERSION_ZOOM + 1):
+            keys.add(_version_key(namespace, zoom, *cell_for_point(point.x, point.y, zoom)))
+
+    if keys:
+        version = time.time_ns()
+        cache.set_many({key: version for key in keys}, None)
+
+
+def invalidate_all_grids(points):
+    """Bump the versions of every cached grid for the given points"""
+    points = [point for point in points if point is not None]
+    for namespace in GRIDS:
+        invalidate_points(namespace, points)
+
+
+def params_digest(params):
+    """
+    Stable digest of request query parameters (a QueryDict), for use in
+    cache keys. Every value of a repeated parameter counts, in any order.
+    """
+    return hashlib.md5(
+        repr(sorted((key, sorted(values)) for key, values in params.lists())).encode('utf-8')
+    ).hexdigest()
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from crimes.cells import GRID_RESOLUTIONS, cells_for_point, grid_field
+from crimes.models import Crime
+
+# Incidents updated per transaction
+DEFAULT_BATCH_SIZE = 5000
+
+
+class Command(BaseCommand):
+    help = "Assign grid cell ids to incidents stored before they were tagged on save"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                            help="Incidents updated per transaction")
+        parser.add_argument('--all', action='store_true',
+                            help="Recompute every incident, not only the untagged ones")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError("--batch-size must be positive")
+
+        fields = [grid_field(resolution) for resolution in GRID_RESOLUTIONS]
+        queryset = Crime.all_objects.order_by('pk')
+        if not options['all']:
+            queryset = queryset.filter(**{f'{fields[-1]}__isnull': True})
+
+        updated = 0
+        last_pk = 0
+        while True:
+            batch = list(queryset.filter(pk__gt=last_pk).only('pk', 'occurred_at', 'location')[:batch_size])
+            if not batch:
+                break
+            for crime in batch:
+                for name, cell in cells_for_point(crime.location.x, crime.location.y).items():
+                    setattr(crime, name, cell)
+            with transaction.atomic():
+                Crime.all_objects.bulk_update(batch, fields)
+            updated += len(batch)
+            last_pk = batch[-1].pk
+            self.stdout.write(f"Tagged {updated} incidents")
+
+        self.stdout.write(self.style.SUCCESS(f"Assigned grid cells to {updated} incidents"))
@@ -0,0 +1,54 @@
+import time
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.test import APIRequestFactory, force_authenticate
+from crimes.views import CrimeViewSet
+
+
+class Command(BaseCommand):
+    help = (
+        "Time one page of the incident list in its nested and lean "
+        "representations against the current database (best of --repeat runs)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help="Username the requests are made as (default: the first superuser)")
+        parser.add_argument('--page-size', type=int, default=1000, help="Incidents per page")
+        parser.add_argument('--repeat', type=int, default=5, help="Runs per representation")
+        parser.add_argument('--include-attributes', action='store_true',
+                            help="Serialize the incident attributes too")
+
+    def handle(self, *args, **options):
+        if options['page_size'] < 1 or options['repeat'] < 1:
+            raise CommandError("--page-size and --repeat must be positive")
+        User = get_user_model()
+        if options['user']:
+            user = User.objects.filter(username=options['user']).first()
+        else:
+            user = User.objects.filter(is_superuser=True).order_by('pk').first()
+        if user is None:
+            raise CommandError("No user to make the requests as, pass --user")
+
+        params = {'page_size': options['page_size'], 'count': 'none'}
+        if options['include_attributes']:
+            params['include'] = 'attributes'
+
+        nested = self._time(user, params, options['repeat'])
+        lean = self._time(user, {**params, 'lean': 'true'}, options['repeat'])
+        self.stdout.write(f"nested: {nested * 1000:.1f} ms")
+        self.stdout.write(f"lean:   {lean * 1000:.1f} ms")
+        self.stdout.write(self.style.SUCCESS(f"The lean list is {nested / lean:.1f}x faster"))
+
+    def _time(self, user, params, repeat):
+        view = CrimeViewSet.as_view({'get': 'list'})
+        seconds = float('inf')
+        for _ in range(repeat):
+            request = APIRequestFactory().get('/crimes/', params)
+            force_authenticate(request, user=user)
+            started = time.perf_counter()
+            response = view(request)
+            response.render()
+            seconds = min(seconds, time.perf_counter() - started)
+            if response.status_code != 200:
+                raise CommandError(f"The list answered {response.status_code}: {response.content[:200]!r}")
+        return seconds
@@ -0,0 +1,71 @@
+from datetime import datetime, time, timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from crimes.dedup import detect_duplicates, detect_duplicates_for
+from crimes.models import Crime
+
+# Incidents compared per query in incremental mode
+INCREMENTAL_CHUNK_SIZE = 5000
+
+
+class Command(BaseCommand):
+    help = (
+        "Find incidents reported more than once (usually by different agencies) "
+        "and link them in duplicate groups. Scans a range of occurrence dates "
+        "(--start/--end), or only incidents created after --created-after."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help="First occurrence date to scan (YYYY-MM-DD)")
+        parser.add_argument('--end', help="Last occurrence date to scan (YYYY-MM-DD)")
+        parser.add_argument(
+            '--created-after',
+            help="Incremental mode: only check incidents created after this time (ISO 8601)"
+        )
+
+    def handle(self, *args, **options):
+        if options['created_after']:
+            if options['start'] or options['end']:
+                raise CommandError("--created-after can't be combined with --start/--end")
+            touched = self._incremental(options['created_after'])
+        else:
+            start = self._parse(options['start'], '--start')
+            end = self._parse(options['end'], '--end')
+            if start is None or end is None:
+                raise CommandError("--start and --end are required for a batch scan")
+            if start > end:
+                raise CommandError("--start must not be after --end")
+            touched = detect_duplicates(
+                timezone.make_aware(datetime.combine(start, time.min)),
+                timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min))
+            )
+
+        self.stdout.write(self.style.SUCCESS(f"Created or updated {touched} duplicate groups"))
+
+    def _incremental(self, value):
+        created_after = parse_datetime(value)
+        if created_after is None:
+            raise CommandError("--created-after must be an ISO 8601 date and time")
+        if timezone.is_naive(created_after):
+            created_after = timezone.make_aware(created_after)
+
+        ids = list(
+            Crime.objects.filter(created_at__gt=created_after)
+            .order_by().values_list('id', flat=True)
+        )
+        touched = 0
+        for start in range(0, len(ids), INCREMENTAL_CHUNK_SIZE):
+            touched += detect_duplicates_for(ids[start:start + INCREMENTAL_CHUNK_SIZE])
+        return touched
+
+    def _parse(self, value, option):
+        if value is None:
+            return None
+        try:
+            parsed = parse_date(value)
+        except ValueError:
+            parsed = None
+        if parsed is None:
+            raise CommandError(f"{option} must be a date in YYYY-MM-DD format")
+        return parsed
@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+from crimes.partitions import DEFAULT_MONTHS_AHEAD, detach_partitions, ensure_partitions
+
+
+class Command(BaseCommand):
+    help = (
+        "Create and attach the monthly partitions of the crime table, and "
+        "optionally detach old months for archival. Meant to run regularly, "
+        "e.g. daily from cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--months-ahead', type=int, default=DEFAULT_MONTHS_AHEAD,
+            help="Months of partitions to keep ahead of the current one"
+        )
+        parser.add_argument(
+            '--start', help="Also create partitions from this month on (YYYY-MM-DD)"
+        )
+        parser.add_argument(
+            '--detach-before',
+            help="Detach partitions ending on or before the month of this date (YYYY-MM-DD)"
+        )
+
+    def handle(self, *args, **options):
+        if options['months_ahead'] < 0:
+            raise CommandError("--months-ahead must not be negative")
+        start = self._parse(options['start'], '--start')
+        detach_before = self._parse(options['detach_before'], '--detach-before')
+
+        for name in ensure_partitions(start=start, months_ahead=options['months_ahead']):
+            self.stdout.write(f"Created partition {name}")
+
+        if detach_before:
+            for name in detach_partitions(detach_before):
+                self.stdout.write(f"Detached partition {name}")
+
+        self.stdout.write(self.style.SUCCESS("Crime partitions are up to date"))
+
+    def _parse(self, value, option):
+        if value is None:
+            return None
+        try:
+            parsed = parse_date(value)
+        except ValueError:
+            parsed = None
+        if parsed is None:
+            raise CommandError(f"{option} must be a date in YYYY-MM-DD format")
+        return parsed
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+from crimes.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Rebuild the daily crime rollup table from the crime incidents"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help="First date to rebuild (YYYY-MM-DD)")
+        parser.add_argument('--end', help="Last date to rebuild (YYYY-MM-DD)")
+
+    def handle(self, *args, **options):
+        start = self._parse(options['start'], '--start')
+        end = self._parse(options['end'], '--end')
+        if start and end and start > end:
+            raise CommandError("--start must not be after --end")
+
+        written = rebuild_rollups(start=start, end=end)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {written} rollup rows"))
+
+    def _parse(self, value, option):
+        if value is None:
+            return None
+        try:
+            parsed = parse_date(value)
+        except ValueError:
+            parsed = None
+        if parsed is None:
+            raise CommandError(f"{option} must be a date in YYYY-MM-DD format")
+        return parsed
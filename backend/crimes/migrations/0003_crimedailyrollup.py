@@ -0,0 +1,31 @@
+# Generated by Django 5.1.6 on 2026-10-18 09:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agencies', '0001_initial'),
+        ('crimes', '0002_remove_crime_crimes_crim_block_a_653b82_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CrimeDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('city', models.CharField(max_length=100)),
+                ('state', models.CharField(max_length=50)),
+                ('verification_status', models.CharField(choices=[('unverified', 'Unverified'), ('verified', 'Verified'), ('suspicious', 'Suspicious Data'), ('corrected', 'Data Corrected')], max_length=20)),
+                ('count', models.IntegerField(default=0)),
+                ('agency', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_crime_rollups', to='agencies.agency')),
+                ('crime_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to='crimes.crimetype')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('date', 'crime_type', 'agency', 'city', 'state', 'verification_status'), name='crimes_rollup_dimensions_uniq')],
+            },
+        ),
+    ]
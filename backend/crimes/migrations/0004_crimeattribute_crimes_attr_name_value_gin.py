@@ -0,0 +1,20 @@
+# Generated by Django 5.1.6 on 2026-10-18 09:40
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import BtreeGinExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crimes', '0003_crimedailyrollup'),
+    ]
+
+    operations = [
+        BtreeGinExtension(),
+        migrations.AddIndex(
+            model_name='crimeattribute',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['name', 'value'], name='crimes_attr_name_value_gin'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.6 on 2026-10-18 10:05
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crimes', '0004_crimeattribute_crimes_attr_name_value_gin'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='crime',
+            name='search_vector',
+            field=models.GeneratedField(db_persist=True, expression=django.contrib.postgres.search.SearchVector('block_address', weight='A', config='english') + django.contrib.postgres.search.SearchVector('description', weight='B', config='english'), output_field=django.contrib.postgres.search.SearchVectorField()),
+        ),
+        migrations.AddIndex(
+            model_name='crime',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='crimes_crime_search_gin'),
+        ),
+    ]
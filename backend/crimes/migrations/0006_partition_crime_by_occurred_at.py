@@ -0,0 +1,167 @@
+# Generated by Django 5.1.6 on 2026-10-18 11:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Columns copied between the plain and the partitioned table. search_vector
+# is left out since it is generated by the database.
+CRIME_COLUMNS = (
+    'id, incident_id, description, occurred_at, reported_at, data_source, location, '
+    'block_address, zip_code, city, state, country, verification_status, created_at, '
+    'updated_at, is_active, agency_id, crime_type_id'
+)
+
+# Recreate the secondary indexes of {source} on crimes_crime under their
+# original names, so later schema changes find them where Django expects.
+# Indexes backing constraints are recreated separately.
+COPY_INDEXES_SQL = r"""
+DO $$
+DECLARE
+    idx record;
+BEGIN
+    FOR idx IN
+        SELECT i.oid, i.relname AS name, pg_get_indexdef(i.oid) AS definition
+        FROM pg_index x JOIN pg_class i ON i.oid = x.indexrelid
+        WHERE x.indrelid = '{source}'::regclass
+          AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = i.oid)
+    LOOP
+        EXECUTE format('ALTER INDEX %I RENAME TO %I', idx.name, 'old_' || left(idx.name, 55));
+        EXECUTE regexp_replace(idx.definition, ' ON (\S+\.)?{source} ', ' ON crimes_crime ');
+    END LOOP;
+END $$;
+"""
+
+PARTITION_SQL = f"""
+ALTER TABLE crimes_crime RENAME TO crimes_crime_legacy;
+ALTER TABLE crimes_crime_legacy ALTER COLUMN id DROP IDENTITY;
+ALTER TABLE crimes_crime_legacy RENAME CONSTRAINT crimes_crime_pkey TO crimes_crime_legacy_pkey;
+
+CREATE TABLE crimes_crime (
+    LIKE crimes_crime_legacy INCLUDING DEFAULTS INCLUDING GENERATED
+) PARTITION BY RANGE (occurred_at);
+
+-- Identity columns aren't supported on partitioned tables, so ids come from
+-- a sequence owned by the column
+CREATE SEQUENCE crimes_crime_id_seq OWNED BY crimes_crime.id;
+SELECT setval('crimes_crime_id_seq', COALESCE((SELECT MAX(id) FROM crimes_crime_legacy), 0) + 1, false);
+ALTER TABLE crimes_crime ALTER COLUMN id SET DEFAULT nextval('crimes_crime_id_seq');
+
+-- Unique constraints on a partitioned table must include the partition key
+ALTER TABLE crimes_crime ADD CONSTRAINT crimes_crime_pkey PRIMARY KEY (id, occurred_at);
+ALTER TABLE crimes_crime ADD CONSTRAINT crimes_crime_incident_occurred_uniq UNIQUE (incident_id, occurred_at);
+ALTER TABLE crimes_crime ADD CONSTRAINT crimes_crime_agency_id_fk_agencies_agency_id
+    FOREIGN KEY (agency_id) REFERENCES agencies_agency (id) DEFERRABLE INITIALLY DEFERRED;
+ALTER TABLE crimes_crime ADD CONSTRAINT crimes_crime_crime_type_id_fk_crimes_crimetype_id
+    FOREIGN KEY (crime_type_id) REFERENCES crimes_crimetype (id) DEFERRABLE INITIALLY DEFERRED;
+
+-- Monthly partitions (UTC) covering the existing incidents and the next
+-- three months; anything outside lands in the default partition until
+-- manage_crime_partitions creates its month
+SET LOCAL timezone = 'UTC';
+DO $$
+DECLARE
+    month timestamptz;
+BEGIN
+    SELECT date_trunc('month', COALESCE(MIN(occurred_at), now())) INTO month FROM crimes_crime_legacy;
+    WHILE month <= date_trunc('month', now()) + interval '3 months' LOOP
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF crimes_crime FOR VALUES FROM (%L) TO (%L)',
+            'crimes_crime_p' || to_char(month, 'YYYYMM'), month, month + interval '1 month'
+        );
+        month := month + interval '1 month';
+    END LOOP;
+END $$;
+CREATE TABLE crimes_crime_default PARTITION OF crimes_crime DEFAULT;
+
+INSERT INTO crimes_crime ({CRIME_COLUMNS}) SELECT {CRIME_COLUMNS} FROM crimes_crime_legacy;
+
+{COPY_INDEXES_SQL.format(source='crimes_crime_legacy')}
+DROP TABLE crimes_crime_legacy;
+ANALYZE crimes_crime;
+"""
+
+# Plain (default operator class, non-constraint) indexes on incident_id alone
+INCIDENT_ID_INDEXES_SQL = """
+SELECT i.relname
+FROM pg_index x
+JOIN pg_class i ON i.oid = x.indexrelid
+JOIN pg_attribute a ON a.attrelid = x.indrelid AND a.attnum = x.indkey[0]
+JOIN pg_opclass o ON o.oid = x.indclass[0]
+WHERE x.indrelid = 'crimes_crime'::regclass
+  AND x.indnatts = 1 AND a.attname = 'incident_id' AND o.opcdefault
+  AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = i.oid)
+"""
+
+UNPARTITION_SQL = f"""
+ALTER TABLE crimes_crime RENAME TO crimes_crime_partitioned;
+ALTER TABLE crimes_crime_partitioned RENAME CONSTRAINT crimes_crime_pkey TO crimes_crime_partitioned_pkey;
+
+CREATE TABLE crimes_crime (
+    LIKE crimes_crime_partitioned INCLUDING DEFAULTS INCLUDING GENERATED
+);
+ALTER TABLE crimes_crime ALTER COLUMN id DROP DEFAULT;
+INSERT INTO crimes_crime ({CRIME_COLUMNS}) SELECT {CRIME_COLUMNS} FROM crimes_crime_partitioned;
+
+ALTER TABLE crimes_crime ALTER COLUMN id ADD GENERATED BY DEFAULT AS IDENTITY;
+SELECT setval(pg_get_serial_sequence('crimes_crime', 'id'), COALESCE((SELECT MAX(id) FROM crimes_crime), 0) + 1, false);
+ALTER TABLE crimes_crime ADD CONSTRAINT crimes_crime_pkey PRIMARY KEY (id);
+ALTER TABLE crimes_crime ADD CONSTRAINT crimes_crime_incident_id_key UNIQUE (incident_id);
+ALTER TABLE crimes_crime ADD CONSTRAINT crimes_crime_agency_id_fk_agencies_agency_id
+    FOREIGN KEY (agency_id) REFERENCES agencies_agency (id) DEFERRABLE INITIALLY DEFERRED;
+ALTER TABLE crimes_crime ADD CONSTRAINT crimes_crime_crime_type_id_fk_crimes_crimetype_id
+    FOREIGN KEY (crime_type_id) REFERENCES crimes_crimetype (id) DEFERRABLE INITIALLY DEFERRED;
+
+{COPY_INDEXES_SQL.format(source='crimes_crime_partitioned')}
+DROP TABLE crimes_crime_partitioned CASCADE;
+"""
+
+
+def create_incident_id_index(apps, schema_editor):
+    """Index for incident_id lookups, which no longer have a unique index of their own"""
+    Crime = apps.get_model('crimes', 'Crime')
+    schema_editor.execute(
+        schema_editor._create_index_sql(Crime, fields=[Crime._meta.get_field('incident_id')])
+    )
+
+
+def drop_incident_id_index(apps, schema_editor):
+    """Drop the incident_id index under whatever name it was created with"""
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(INCIDENT_ID_INDEXES_SQL)
+        names = [row[0] for row in cursor.fetchall()]
+    for name in names:
+        schema_editor.execute(f'DROP INDEX {schema_editor.quote_name(name)}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agencies', '0001_initial'),
+        ('crimes', '0005_crime_search_vector'),
+    ]
+
+    operations = [
+        # A partitioned table can't be the target of a foreign key on id alone
+        migrations.AlterField(
+            model_name='crimeattribute',
+            name='crime',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='attributes', to='crimes.crime'),
+        ),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='crime',
+                    name='incident_id',
+                    field=models.CharField(db_index=True, max_length=100),
+                ),
+                migrations.AddConstraint(
+                    model_name='crime',
+                    constraint=models.UniqueConstraint(fields=('incident_id', 'occurred_at'), name='crimes_crime_incident_occurred_uniq'),
+                ),
+            ],
+            database_operations=[
+                migrations.RunSQL(PARTITION_SQL, UNPARTITION_SQL),
+                migrations.RunPython(create_incident_id_index, drop_incident_id_index),
+            ],
+        ),
+    ]
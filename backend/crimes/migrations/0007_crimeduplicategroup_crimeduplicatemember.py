@@ -0,0 +1,44 @@
+# Generated by Django 5.1.6 on 2026-10-18 12:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crimes', '0006_partition_crime_by_occurred_at'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='crime',
+            name='verification_status',
+            field=models.CharField(choices=[('unverified', 'Unverified'), ('verified', 'Verified'), ('suspicious', 'Suspicious Data'), ('corrected', 'Data Corrected'), ('duplicate', 'Duplicate Report')], default='unverified', max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='crimedailyrollup',
+            name='verification_status',
+            field=models.CharField(choices=[('unverified', 'Unverified'), ('verified', 'Verified'), ('suspicious', 'Suspicious Data'), ('corrected', 'Data Corrected'), ('duplicate', 'Duplicate Report')], max_length=20),
+        ),
+        migrations.CreateModel(
+            name='CrimeDuplicateGroup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('canonical', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='crimes.crime')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CrimeDuplicateMember',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('previous_status', models.CharField(choices=[('unverified', 'Unverified'), ('verified', 'Verified'), ('suspicious', 'Suspicious Data'), ('corrected', 'Data Corrected'), ('duplicate', 'Duplicate Report')], max_length=20)),
+                ('linked_at', models.DateTimeField(auto_now_add=True)),
+                ('crime', models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='duplicate_membership', to='crimes.crime')),
+                ('group', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='members', to='crimes.crimeduplicategroup')),
+            ],
+        ),
+    ]
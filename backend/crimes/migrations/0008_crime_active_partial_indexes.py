@@ -0,0 +1,30 @@
+# Generated by Django 5.1.6 on 2026-10-18 13:30
+
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crimes', '0007_crimeduplicategroup_crimeduplicatemember'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='crime',
+            options={'default_manager_name': 'all_objects', 'ordering': ['-occurred_at']},
+        ),
+        migrations.AddIndex(
+            model_name='crime',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['occurred_at', 'id'], name='crimes_crime_active_occ_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='crime',
+            index=django.contrib.postgres.indexes.GistIndex(condition=models.Q(('is_active', True)), fields=['location'], name='crimes_crime_active_loc_gist'),
+        ),
+        migrations.AddIndex(
+            model_name='crime',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['city'], name='crimes_crime_active_city_idx'),
+        ),
+    ]
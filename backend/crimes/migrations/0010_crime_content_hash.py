@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-18 17:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crimes', '0009_crime_grid_cells'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='crime',
+            name='content_hash',
+            field=models.CharField(blank=True, editable=False, max_length=32),
+        ),
+    ]
@@ -0,0 +1,86 @@
+# Generated by Django 5.1.6 on 2026-10-18 19:40
+
+from django.db import migrations, models
+
+# Keeps crimes_crimeincidentkey in step with crimes_crime. Row triggers on
+# a partitioned table also fire for rows moving between partitions (as a
+# delete plus an insert, in no guaranteed order), so a key is only dropped
+# when no crime with its id and incident id is left, and inserting the key
+# of a crime id that already owns it is a no-op. A key owned by another
+# crime is a duplicate incident id and raises unique_violation.
+SYNC_FUNCTION_SQL = r"""
+CREATE FUNCTION crimes_crime_sync_incident_key() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        DELETE FROM crimes_crimeincidentkey
+        WHERE incident_id = OLD.incident_id AND crime_id = OLD.id
+          AND NOT EXISTS (
+              SELECT 1 FROM crimes_crime WHERE id = OLD.id AND incident_id = OLD.incident_id
+          );
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO crimes_crimeincidentkey (incident_id, crime_id, occurred_at)
+        VALUES (NEW.incident_id, NEW.id, NEW.occurred_at)
+        ON CONFLICT (incident_id) DO UPDATE SET occurred_at = EXCLUDED.occurred_at
+        WHERE crimes_crimeincidentkey.crime_id = EXCLUDED.crime_id;
+        IF NOT FOUND THEN
+            RAISE unique_violation USING
+                MESSAGE = 'duplicate key value violates unique constraint "crimes_crimeincidentkey_pkey"',
+                DETAIL = format('Key (incident_id)=(%s) already exists.', NEW.incident_id),
+                CONSTRAINT = 'crimes_crimeincidentkey_pkey',
+                TABLE = 'crimes_crimeincidentkey';
+        END IF;
+    END IF;
+    RETURN NULL;
+END $$ LANGUAGE plpgsql;
+
+CREATE TRIGGER crimes_crime_incident_key_sync
+    AFTER INSERT OR DELETE ON crimes_crime
+    FOR EACH ROW EXECUTE FUNCTION crimes_crime_sync_incident_key();
+CREATE TRIGGER crimes_crime_incident_key_update
+    AFTER UPDATE OF id, incident_id, occurred_at ON crimes_crime
+    FOR EACH ROW EXECUTE FUNCTION crimes_crime_sync_incident_key();
+
+-- Fails if incident ids were duplicated while only the serializers checked them
+INSERT INTO crimes_crimeincidentkey (incident_id, crime_id, occurred_at)
+SELECT incident_id, id, occurred_at FROM crimes_crime;
+
+-- Foreign keys to incidents reference the key table's unique crime id
+ALTER TABLE crimes_crimeattribute ADD CONSTRAINT crimes_crimeattribute_crime_id_fk_incident_key
+    FOREIGN KEY (crime_id) REFERENCES crimes_crimeincidentkey (crime_id)
+    ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED;
+ALTER TABLE crimes_crimeduplicatemember ADD CONSTRAINT crimes_crimeduplicatemember_crime_id_fk_incident_key
+    FOREIGN KEY (crime_id) REFERENCES crimes_crimeincidentkey (crime_id)
+    ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED;
+ALTER TABLE crimes_crimeduplicategroup ADD CONSTRAINT crimes_crimeduplicategroup_canonical_id_fk_incident_key
+    FOREIGN KEY (canonical_id) REFERENCES crimes_crimeincidentkey (crime_id)
+    ON DELETE SET NULL DEFERRABLE INITIALLY DEFERRED;
+"""
+
+DROP_SYNC_FUNCTION_SQL = """
+ALTER TABLE crimes_crimeduplicategroup DROP CONSTRAINT crimes_crimeduplicategroup_canonical_id_fk_incident_key;
+ALTER TABLE crimes_crimeduplicatemember DROP CONSTRAINT crimes_crimeduplicatemember_crime_id_fk_incident_key;
+ALTER TABLE crimes_crimeattribute DROP CONSTRAINT crimes_crimeattribute_crime_id_fk_incident_key;
+DROP TRIGGER crimes_crime_incident_key_update ON crimes_crime;
+DROP TRIGGER crimes_crime_incident_key_sync ON crimes_crime;
+DROP FUNCTION crimes_crime_sync_incident_key();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crimes', '0010_crime_content_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CrimeIncidentKey',
+            fields=[
+                ('incident_id', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('crime_id', models.BigIntegerField(unique=True)),
+                ('occurred_at', models.DateTimeField()),
+            ],
+        ),
+        migrations.RunSQL(SYNC_FUNCTION_SQL, DROP_SYNC_FUNCTION_SQL),
+    ]
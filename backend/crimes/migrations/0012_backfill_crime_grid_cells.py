@@ -0,0 +1,38 @@
+# Generated by Django 5.1.6 on 2026-10-18 21:10
+
+from django.db import migrations
+from crimes.cells import cells_for_point
+
+# Incidents tagged per UPDATE; each batch commits on its own
+BACKFILL_BATCH_SIZE = 5000
+
+
+def backfill_grid_cells(apps, schema_editor):
+    # Incidents stored before 0009 have no grid cells, and the heatmap and
+    # grid aggregations only read tagged rows
+    Crime = apps.get_model('crimes', 'Crime')
+    untagged = Crime._base_manager.filter(grid_r17__isnull=True).order_by('pk')
+    last_pk = 0
+    while True:
+        crimes = list(untagged.filter(pk__gt=last_pk).only('pk', 'occurred_at', 'location')[:BACKFILL_BATCH_SIZE])
+        if not crimes:
+            break
+        for crime in crimes:
+            for field, cell in cells_for_point(crime.location.x, crime.location.y).items():
+                setattr(crime, field, cell)
+        Crime._base_manager.bulk_update(crimes, ['grid_r10', 'grid_r14', 'grid_r17'])
+        last_pk = crimes[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    # A large table is tagged in batches rather than in one transaction
+    atomic = False
+
+    dependencies = [
+        ('crimes', '0011_crimeincidentkey'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_grid_cells, migrations.RunPython.noop),
+    ]
@@ -1,9 +1,12 @@
 from django.db import models
 from django.contrib.gis.db import models as gis_models
 from django.contrib.gis.geos import Point
-from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.indexes import GinIndex, GistIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.utils.translation import gettext_lazy as _
 from agencies.models import Agency
+from .cells import GRID_RESOLUTIONS, cells_for_point, grid_field
+from .dimensions import dimensions
 
 class CrimeCategory(models.Model):
     """Model for categorizing types of crimes"""
@@ -29,15 +32,46 @@ class CrimeType(models.Model):
     ], default=2)
     
     def __str__(self):
-        return f"{self.name} ({self.category.name})"
+        category = dimensions.category(self.category_id)
+        category_name = category.name if category else self.category.name
+        return f"{self.name} ({category_name})"
     
     class Meta:
         unique_together = ('category', 'name')
 
+class CrimeQuerySet(models.QuerySet):
+    def active(self):
+        return self.filter(is_active=True)
+    
+    def inactive(self):
+        return self.filter(is_active=False)
+    
+    def for_ids(self, pks):
+        """
+        Filter on crime ids, narrowed to the partitions holding them. The
+        occurred_at of each id is read from the incident key table first,
+        so the lookup doesn't probe every partition's primary key.
+        """
+        pks = list(pks)
+        occurred = CrimeIncidentKey.objects.filter(crime_id__in=pks).values_list('occurred_at', flat=True)
+        return self.filter(pk__in=pks, occurred_at__in=list(occurred))
+
+class ActiveCrimeManager(models.Manager.from_queryset(CrimeQuerySet)):
+    """Manager that leaves out soft-deleted incidents"""
+    def get_queryset(self):
+        return super().get_queryset().filter(is_active=True)
+
 class Crime(models.Model):
     """Model for storing individual crime incidents"""
-    # Unique identifier from source system
-    incident_id = models.CharField(max_length=100, unique=True)
+    # Crime.objects only sees live incidents; Crime.all_objects includes the
+    # soft-deleted ones, for admin, audit and maintenance code
+    objects = ActiveCrimeManager()
+    all_objects = models.Manager.from_queryset(CrimeQuerySet)()
+    
+    # Unique identifier from source system. The table is partitioned by
+    # occurred_at, so it can only enforce uniqueness together with it;
+    # CrimeIncidentKey enforces it on its own.
+    incident_id = models.CharField(max_length=100, db_index=True)
     
     # Crime details
     crime_type = models.ForeignKey(CrimeType, on_delete=models.PROTECT, related_name='crimes')
@@ -59,27 +93,80 @@ class Crime(models.Model):
     state = models.CharField(max_length=50, db_index=True)
     country = models.CharField(max_length=50, default="Kenya")
     
+    # Hierarchical grid cells of the location (see crimes.cells), assigned on
+    # save so spatial aggregations can GROUP BY integers
+    grid_r10 = models.BigIntegerField(null=True, blank=True, editable=False, db_index=True)
+    grid_r14 = models.BigIntegerField(null=True, blank=True, editable=False, db_index=True)
+    grid_r17 = models.BigIntegerField(null=True, blank=True, editable=False, db_index=True)
+    
     # Verification status
     VERIFICATION_STATUS = (
         ('unverified', 'Unverified'),
         ('verified', 'Verified'),
         ('suspicious', 'Suspicious Data'),
-        ('corrected', 'Data Corrected')
+        ('corrected', 'Data Corrected'),
+        ('duplicate', 'Duplicate Report')
     )
     verification_status = models.CharField(max_length=20, choices=VERIFICATION_STATUS, default='unverified')
     
+    # Digest of the source values, so ETL reloads can skip unchanged incidents
+    content_hash = models.CharField(max_length=32, blank=True, editable=False)
+    
     # System metadata
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=True, help_text="Soft delete flag")
     
+    # Full-text search document, kept up to date by the database
+    search_vector = models.GeneratedField(
+        expression=(
+            SearchVector('block_address', weight='A', config='english') +
+            SearchVector('description', weight='B', config='english')
+        ),
+        output_field=SearchVectorField(),
+        db_persist=True
+    )
+    
     # Methods to work with geographic data
     def set_location(self, longitude, latitude):
         """Set location using longitude and latitude"""
         self.location = Point(longitude, latitude, srid=4326)
+        self.assign_grid_cells()
+    
+    def assign_grid_cells(self):
+        """Set the grid cell columns from the location"""
+        if self.location is None:
+            cells = dict.fromkeys(grid_field(resolution) for resolution in GRID_RESOLUTIONS)
+        else:
+            cells = cells_for_point(self.location.x, self.location.y)
+        for name, cell in cells.items():
+            setattr(self, name, cell)
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Keep the loaded field values so signal handlers can see what changed"""
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+    
+    def save(self, *args, **kwargs):
+        self.assign_grid_cells()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'location' in update_fields:
+            kwargs['update_fields'] = {
+                *update_fields, *(grid_field(resolution) for resolution in GRID_RESOLUTIONS)
+            }
+        super().save(*args, **kwargs)
+        self._loaded_values = {
+            field.attname: self.__dict__[field.attname]
+            for field in self._meta.concrete_fields
+            if field.attname in self.__dict__
+        }
     
     def __str__(self):
-        return f"{self.crime_type.name} at {self.block_address} on {self.occurred_at.date()}"
+        crime_type = dimensions.crime_type(self.crime_type_id)
+        crime_type_name = crime_type.name if crime_type else self.crime_type.name
+        return f"{crime_type_name} at {self.block_address} on {self.occurred_at.date()}"
     
     class Meta:
         indexes = [
@@ -89,12 +176,30 @@ class Crime(models.Model):
             models.Index(fields=['zip_code']),
             models.Index(fields=['city']),
              GinIndex(fields=['block_address'], opclasses=['gin_trgm_ops'],name='block_address_gin_idx'),  # Fix
+             GinIndex(fields=['search_vector'], name='crimes_crime_search_gin'),
+             # Partial indexes for the hot paths, which only read live incidents
+             models.Index(
+                 fields=['occurred_at', 'id'], condition=models.Q(is_active=True),
+                 name='crimes_crime_active_occ_idx'
+             ),
+             GistIndex(fields=['location'], condition=models.Q(is_active=True), name='crimes_crime_active_loc_gist'),
+             models.Index(fields=['city'], condition=models.Q(is_active=True), name='crimes_crime_active_city_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['incident_id', 'occurred_at'],
+                name='crimes_crime_incident_occurred_uniq'
+            ),
         ]
         ordering = ['-occurred_at']
+        # Framework code (admin, dumpdata, related lookups) sees every incident
+        default_manager_name = 'all_objects'
 
 class CrimeAttribute(models.Model):
     """Model for storing additional attributes of crimes that may vary by crime type"""
-    crime = models.ForeignKey(Crime, on_delete=models.CASCADE, related_name='attributes')
+    # Partitioned crimes can't be referenced on their id alone, so the
+    # database foreign key points at CrimeIncidentKey.crime_id instead
+    crime = models.ForeignKey(Crime, on_delete=models.CASCADE, related_name='attributes', db_constraint=False)
     name = models.CharField(max_length=100)
     value = models.JSONField(help_text="Flexible storage for various attribute types")
     
@@ -102,4 +207,89 @@ class CrimeAttribute(models.Model):
         return f"{self.name}: {self.value}"
     
     class Meta:
-        unique_together = ('crime', 'name')
\ No newline at end of file
+        unique_together = ('crime', 'name')
+        indexes = [
+            # Multi-column GIN (needs btree_gin) for name equality plus value containment
+            GinIndex(fields=['name', 'value'], name='crimes_attr_name_value_gin'),
+        ]
+
+class CrimeIncidentKey(models.Model):
+    """
+    One row per incident, kept in step with the partitioned crime table by
+    database triggers (see migration 0011). It holds the constraints the
+    partitioned table can't: incident ids unique across all partitions, and
+    a unique crime id for the foreign keys referencing incidents. It also
+    maps crime ids to the occurred_at of their partition.
+    """
+    incident_id = models.CharField(max_length=100, primary_key=True)
+    crime_id = models.BigIntegerField(unique=True)
+    occurred_at = models.DateTimeField()
+    
+    def __str__(self):
+        return self.incident_id
+
+class CrimeDailyRollup(models.Model):
+    """Daily incident counts per dimension combination, maintained incrementally"""
+    date = models.DateField()
+    crime_type = models.ForeignKey(CrimeType, on_delete=models.CASCADE, related_name='daily_rollups')
+    agency = models.ForeignKey(Agency, on_delete=models.CASCADE, related_name='daily_crime_rollups')
+    city = models.CharField(max_length=100)
+    state = models.CharField(max_length=50)
+    verification_status = models.CharField(max_length=20, choices=Crime.VERIFICATION_STATUS)
+    
+    # Number of active incidents for this combination
+    count = models.IntegerField(default=0)
+    
+    def __str__(self):
+        return f"{self.date}: {self.count} incidents"
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['date', 'crime_type', 'agency', 'city', 'state', 'verification_status'],
+                name='crimes_rollup_dimensions_uniq'
+            ),
+        ]
+
+class CrimeDuplicateGroup(models.Model):
+    """Incidents found to describe the same event, usually reported by different agencies"""
+    # The report kept as the group's representative (the earliest one reported)
+    canonical = models.ForeignKey(
+        Crime, on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='+', db_constraint=False
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"Duplicate group {self.pk}"
+
+class CrimeDuplicateMember(models.Model):
+    """Membership of an incident in a duplicate group"""
+    group = models.ForeignKey(CrimeDuplicateGroup, on_delete=models.CASCADE, related_name='members')
+    crime = models.OneToOneField(
+        Crime, on_delete=models.CASCADE, related_name='duplicate_membership', db_constraint=False
+    )
+    
+    # Best match score against another member of the group (0-1)
+    score = models.FloatField()
+    
+    # Verification status before the incident was marked as a duplicate
+    previous_status = models.CharField(max_length=20, choices=Crime.VERIFICATION_STATUS)
+    linked_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"{self.crime_id} in duplicate group {self.group_id}"
+
+class DataVersion(models.Model):
+    """
+    Version of a data scope behind the API's ETags (see
+    crime_analysis.conditional). Kept in the database rather than the
+    cache so that every worker process sees the same versions.
+    """
+    scope = models.CharField(max_length=50, primary_key=True)
+    # Time (in ns) of the last committed write to the scope
+    version = models.BigIntegerField()
+    
+    def __str__(self):
+        return f"{self.scope}: {self.version}"
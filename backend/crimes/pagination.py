@@ -0,0 +1,109 @@
+import base64
+import binascii
+import json
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from crime_analysis.pagination import COUNT_EXACT, COUNT_NONE, CountModePagination
+
+
+class CrimeKeysetPagination(CountModePagination):
+    """
+    Count mode pagination with an opt-in keyset mode for crime incidents.
+
+    Passing ``cursor`` (left empty for the first page) switches to keyset
+    pagination on (occurred_at, id). Each page seeks on the occurred_at
+    index instead of scanning an OFFSET, so deep pages cost the same as the
+    first one. Keyset pages only carry a count when ``count`` asks for one.
+    """
+    cursor_query_param = 'cursor'
+    ordering = ('-occurred_at', '-id')
+    invalid_cursor_message = 'Invalid cursor'
+
+    keyset = False
+
+    def paginate_queryset(self, queryset, request, view=None, params=None):
+        self.params = params
+        self.keyset = self.cursor_query_param in self.get_params(request)
+        if not self.keyset:
+            return super().paginate_queryset(queryset, request, view, params)
+
+        self.request = request
+        self.display_page_controls = False
+        self.page_size = self.get_page_size(request)
+        position = self.decode_cursor(request)
+
+        count_mode = self.get_count_mode(request, view, default=COUNT_NONE)
+        # Counted before the seek, so the total covers every page
+        counted = queryset
+        # The keyset only works for the default ordering, so any ordering
+        # requested through OrderingFilter is replaced here
+        queryset = queryset.order_by(*self.ordering)
+        if position is not None:
+            occurred_at, pk = position
+            queryset = queryset.filter(occurred_at__lte=occurred_at).exclude(
+                occurred_at=occurred_at, id__gte=pk
+            )
+
+        results = list(queryset[:self.page_size + 1])
+        self.has_next = len(results) > self.page_size
+        self.keyset_page = results[:self.page_size]
+        if count_mode == COUNT_NONE:
+            self.count = self.count_type = None
+        elif position is None and not self.has_next:
+            # A single page holds everything, so the total is already known
+            self.count, self.count_type = len(self.keyset_page), COUNT_EXACT
+        else:
+            self.count, self.count_type = self.get_count(
+                counted, count_mode, minimum=len(self.keyset_page) + self.has_next
+            )
+        return self.keyset_page
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+
+        response = {}
+        if self.count is not None:
+            response['count'] = self.count
+            response['count_type'] = self.count_type
+        response['next'] = self.get_keyset_next_link()
+        response['results'] = data
+        return Response(response)
+
+    def get_keyset_next_link(self):
+        if not self.has_next:
+            return None
+        last = self.keyset_page[-1]
+        # Pages hold model instances or, for the lean list, values() rows
+        if isinstance(last, dict):
+            occurred_at, pk = last['occurred_at'], last['id']
+        else:
+            occurred_at, pk = last.occurred_at, last.pk
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.page_query_param)
+        return replace_query_param(
+            url, self.cursor_query_param, self.encode_cursor(occurred_at, pk)
+        )
+
+    def encode_cursor(self, occurred_at, pk):
+        payload = json.dumps([occurred_at.isoformat(), pk]).encode('utf-8')
+        return base64.urlsafe_b64encode(payload).decode('ascii')
+
+    def decode_cursor(self, request):
+        """Return the (occurred_at, id) position of the cursor, or None for the first page"""
+        encoded = self.get_params(request).get(self.cursor_query_param)
+        if not encoded:
+            return None
+
+        try:
+            occurred_at, pk = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            occurred_at = parse_datetime(occurred_at)
+            pk = int(pk)
+        except (TypeError, ValueError, UnicodeError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+
+        if occurred_at is None:
+            raise NotFound(self.invalid_cursor_message)
+        return occurred_at, pk
@@ -0,0 +1,146 @@
+import re
+from datetime import date, datetime, timezone as dt_timezone
+from django.db import connection, transaction
+from .models import Crime
+
+# Partitions are named <table>_pYYYYMM and hold one UTC calendar month of occurred_at
+PARTITION_NAME_PATTERN = re.compile(r'_p(\d{4})(\d{2})$')
+
+# Months of partitions kept ahead of the current one
+DEFAULT_MONTHS_AHEAD = 3
+
+
+def month_start(value):
+    """First day of the month containing value"""
+    return date(value.year, value.month, 1)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f'{Crime._meta.db_table}_p{month:%Y%m}'
+
+
+def default_partition_name():
+    return f'{Crime._meta.db_table}_default'
+
+
+def _bounds(month):
+    """UTC timestamps bounding the partition of month, as SQL literals"""
+    lower = datetime(month.year, month.month, 1, tzinfo=dt_timezone.utc)
+    upper = datetime.combine(add_months(month, 1), datetime.min.time(), tzinfo=dt_timezone.utc)
+    return lower.isoformat(), upper.isoformat()
+
+
+def _columns():
+    """Columns that can be copied between partitions (generated ones can't be written)"""
+    return ', '.join(
+        connection.ops.quote_name(field.column)
+        for field in Crime._meta.concrete_fields
+        if not field.generated
+    )
+
+
+def existing_partitions():
+    """Return {month: table name} for the monthly partitions attached to the crime table"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT child.relname
+            FROM pg_inherits
+            JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE parent.relname = %s
+            """,
+            [Crime._meta.db_table]
+        )
+        names = [row[0] for row in cursor.fetchall()]
+
+    partitions = {}
+    for name in names:
+        match = PARTITION_NAME_PATTERN.search(name)
+        if match:
+            partitions[date(int(match.group(1)), int(match.group(2)), 1)] = name
+    return partitions
+
+
+def create_partition(month):
+    """
+    Create and attach the partition for month. Rows of that month that
+    already landed in the default partition are moved into it, since
+    Postgres refuses to attach a range the default partition still holds.
+    """
+    table = connection.ops.quote_name(Crime._meta.db_table)
+    default = connection.ops.quote_name(default_partition_name())
+    name = connection.ops.quote_name(partition_name(month))
+    lower, upper = _bounds(month)
+    columns = _columns()
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'LOCK TABLE {table} IN ACCESS EXCLUSIVE MODE')
+        cursor.execute(
+            f'SELECT EXISTS (SELECT 1 FROM {default} WHERE occurred_at >= %s AND occurred_at < %s)',
+            [lower, upper]
+        )
+        stranded = cursor.fetchone()[0]
+
+        if stranded:
+            cursor.execute(f'ALTER TABLE {table} DETACH PARTITION {default}')
+        cursor.execute(
+            f"CREATE TABLE {name} PARTITION OF {table} FOR VALUES FROM ('{lower}') TO ('{upper}')"
+        )
+        if stranded:
+            cursor.execute(
+                f"""
+                WITH moved AS (
+                    DELETE FROM {default} WHERE occurred_at >= %s AND occurred_at < %s
+                    RETURNING {columns}
+                )
+                INSERT INTO {table} ({columns}) SELECT {columns} FROM moved
+                """,
+                [lower, upper]
+            )
+            cursor.execute(f'ALTER TABLE {table} ATTACH PARTITION {default} DEFAULT')
+
+
+def ensure_partitions(start=None, months_ahead=DEFAULT_MONTHS_AHEAD):
+    """
+    Make sure a partition exists for every month from start (the current
+    month by default) through months_ahead months from now. Returns the
+    names of the partitions created.
+    """
+    current = month_start(datetime.now(dt_timezone.utc))
+    month = month_start(start) if start else current
+    last = add_months(current, months_ahead)
+    existing = existing_partitions()
+
+    created = []
+    while month <= last:
+        if month not in existing:
+            create_partition(month)
+            created.append(partition_name(month))
+        month = add_months(month, 1)
+    return created
+
+
+def detach_partitions(before):
+    """
+    Detach the monthly partitions that end on or before the month of
+    before. Detached partitions remain as standalone tables, ready to be
+    archived and dropped. Their rows keep their incident keys, so archived
+    incident ids aren't reused. Returns their names.
+    """
+    table = connection.ops.quote_name(Crime._meta.db_table)
+    cutoff = month_start(before)
+
+    detached = []
+    for month, name in sorted(existing_partitions().items()):
+        if add_months(month, 1) > cutoff:
+            continue
+        with connection.cursor() as cursor:
+            cursor.execute(f'ALTER TABLE {table} DETACH PARTITION {connection.ops.quote_name(name)}')
+        detached.append(name)
+    return detached
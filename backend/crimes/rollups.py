@@ -0,0 +1,105 @@
+from collections import Counter
+from datetime import datetime, time, timedelta
+from django.db import connection, transaction
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from crime_analysis.conditional import CRIMES_SCOPE, bump_data_version
+from .models import Crime, CrimeDailyRollup
+
+# Crime attributes that make up a rollup key, besides the occurrence date
+ROLLUP_FIELDS = ('crime_type_id', 'agency_id', 'city', 'state', 'verification_status')
+
+# Crime attributes whose change can move an incident between rollup rows
+TRACKED_FIELDS = ('occurred_at', 'is_active') + ROLLUP_FIELDS
+
+# Rows per INSERT ... ON CONFLICT statement
+UPSERT_BATCH_SIZE = 1000
+
+
+def rollup_key(values):
+    """
+    Rollup key of an incident, from a mapping of its attribute names to
+    values (an instance's __dict__ or the values it was loaded with).
+    """
+    occurred_at = values['occurred_at']
+    if timezone.is_aware(occurred_at):
+        occurred_on = timezone.localdate(occurred_at)
+    else:
+        occurred_on = occurred_at.date()
+    return (occurred_on,) + tuple(values[field] for field in ROLLUP_FIELDS)
+
+
+def rollup_deltas(crimes, sign=1):
+    """Counter of rollup key -> delta for the active incidents among crimes"""
+    return Counter({
+        key: sign * count
+        for key, count in Counter(rollup_key(vars(crime)) for crime in crimes if crime.is_active).items()
+    })
+
+
+def apply_rollup_deltas(deltas):
+    """
+    Add signed counts to the rollup rows with INSERT ... ON CONFLICT, so
+    concurrent writers can't lose increments. Keys are applied in sorted
+    order to keep lock ordering consistent between transactions.
+    """
+    rows = sorted((key, delta) for key, delta in deltas.items() if delta)
+    if not rows:
+        return
+
+    table = CrimeDailyRollup._meta.db_table
+    columns = ('date',) + ROLLUP_FIELDS + ('count',)
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), UPSERT_BATCH_SIZE):
+            batch = rows[start:start + UPSERT_BATCH_SIZE]
+            placeholders = ', '.join(['(' + ', '.join(['%s'] * len(columns)) + ')'] * len(batch))
+            cursor.execute(
+                f"""
+                INSERT INTO {table} ({', '.join(columns)}) VALUES {placeholders}
+                ON CONFLICT (date, {', '.join(ROLLUP_FIELDS)})
+                DO UPDATE SET count = {table}.count + EXCLUDED.count
+                """,
+                [value for key, delta in batch for value in key + (delta,)]
+            )
+
+
+def rebuild_rollups(start=None, end=None, batch_size=UPSERT_BATCH_SIZE):
+    """
+    Recompute the rollup rows for the given date range (everything when
+    no bounds are given) from the crime table. Returns the number of rows
+    written.
+    """
+    rollups = CrimeDailyRollup.objects.all()
+    crimes = Crime.objects.all()
+    if start:
+        rollups = rollups.filter(date__gte=start)
+        crimes = crimes.filter(occurred_at__gte=timezone.make_aware(datetime.combine(start, time.min)))
+    if end:
+        rollups = rollups.filter(date__lte=end)
+        crimes = crimes.filter(
+            occurred_at__lt=timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min))
+        )
+
+    aggregated = crimes.annotate(date=TruncDate('occurred_at')).order_by().values(
+        'date', *ROLLUP_FIELDS
+    ).annotate(total=Count('id'))
+
+    with transaction.atomic():
+        # Block incremental updates until the rebuilt rows are committed
+        with connection.cursor() as cursor:
+            cursor.execute(f'LOCK TABLE {CrimeDailyRollup._meta.db_table} IN EXCLUSIVE MODE')
+        rollups.delete()
+        written = 0
+        batch = []
+        for row in aggregated.iterator(chunk_size=batch_size):
+            total = row.pop('total')
+            batch.append(CrimeDailyRollup(count=total, **row))
+            if len(batch) >= batch_size:
+                CrimeDailyRollup.objects.bulk_create(batch)
+                written += len(batch)
+                batch = []
+        CrimeDailyRollup.objects.bulk_create(batch)
+        written += len(batch)
+        bump_data_version(CRIMES_SCOPE)
+    return written
@@ -0,0 +1,91 @@
+import re
+from django.contrib.postgres.search import SearchHeadline, SearchQuery
+from django.http import QueryDict
+
+# Text search configuration, must match the one used by Crime.search_vector
+SEARCH_CONFIG = 'english'
+
+HIGHLIGHT_START = '<mark>'
+HIGHLIGHT_STOP = '</mark>'
+
+# Keys of the search page's payload that map one to one onto query parameters
+PAYLOAD_PARAMS = {
+    'query': 'q',
+    'page': 'page',
+    'pageSize': 'page_size',
+    'startDate': 'occurred_after',
+    'endDate': 'occurred_before',
+}
+
+# Keys of the payload handled below rather than passed through
+PAYLOAD_SPECIAL_KEYS = ('crimeTypes', 'latitude', 'longitude', 'radius', 'sortBy', 'sortOrder')
+
+# Fields the payload's sortBy can name ('relevance' keeps the rank order)
+PAYLOAD_SORT_FIELDS = {'date': 'occurred_at', 'reported': 'reported_at', 'created': 'created_at'}
+
+
+def build_search_query(text):
+    """
+    Build a prefix-matching tsquery from free text, so 'rob kib' matches
+    'robbery' near 'Kibera'. Returns None when the text has no terms.
+    """
+    terms = re.findall(r'\w+', text or '')
+    if not terms:
+        return None
+    return SearchQuery(
+        ' & '.join(f'{term}:*' for term in terms),
+        search_type='raw',
+        config=SEARCH_CONFIG
+    )
+
+
+def headline(field, query):
+    """Snippet of field with the terms matching query highlighted"""
+    return SearchHeadline(
+        field,
+        query,
+        config=SEARCH_CONFIG,
+        start_sel=HIGHLIGHT_START,
+        stop_sel=HIGHLIGHT_STOP
+    )
+
+
+def _is_blank(value):
+    return value is None or value == '' or value == []
+
+
+def search_params(data, query_params=None):
+    """
+    Merge a POSTed search body into query parameters for the list filters
+    and pagination. The body can use the query parameter names directly, or
+    be the search page's payload: ``query``, ``page``, ``pageSize``,
+    ``crimeTypes`` (ids), ``startDate``, ``endDate``, ``latitude``,
+    ``longitude`` and ``radius`` (km), ``sortBy`` and ``sortOrder``.
+    """
+    params = query_params.copy() if query_params is not None else QueryDict(mutable=True)
+    for key, value in data.items():
+        if key in PAYLOAD_SPECIAL_KEYS or _is_blank(value) or isinstance(value, dict):
+            continue
+        name = PAYLOAD_PARAMS.get(key, key)
+        if isinstance(value, list):
+            params.setlist(name, [str(item) for item in value])
+        else:
+            params[name] = str(value)
+
+    crime_types = data.get('crimeTypes')
+    if not _is_blank(crime_types):
+        if not isinstance(crime_types, list):
+            crime_types = [crime_types]
+        params['crime_types'] = ','.join(str(crime_type) for crime_type in crime_types)
+
+    if not _is_blank(data.get('latitude')) and not _is_blank(data.get('longitude')):
+        try:
+            radius = float(data.get('radius') or 5) * 1000
+        except (TypeError, ValueError):
+            radius = data.get('radius')
+        params['near'] = f"{data['longitude']},{data['latitude']},{radius}"
+
+    sort_field = PAYLOAD_SORT_FIELDS.get(data.get('sortBy'))
+    if sort_field is not None:
+        params['ordering'] = f"{'' if data.get('sortOrder') == 'asc' else '-'}{sort_field}"
+    return params
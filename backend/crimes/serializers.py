@@ -1,14 +1,32 @@
+import json
 from rest_framework import serializers # type: ignore
 from rest_framework_gis.serializers import GeoFeatureModelSerializer # type: ignore
+from rest_framework.validators import UniqueValidator # type: ignore
+from .dimensions import dimensions
+from .geo import Latitude, Longitude
 from .models import CrimeCategory, CrimeType, Crime, CrimeAttribute
 
+class DimensionNameField(serializers.ReadOnlyField):
+    """
+    Resolves a foreign key id to an attribute of the referenced row through
+    the in-process dimension cache, so no join or related lookup is needed.
+    """
+    def __init__(self, dimension, attribute='name', **kwargs):
+        self.dimension = dimension
+        self.attribute = attribute
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        entry = dimensions.get(self.dimension, value)
+        return getattr(entry, self.attribute) if entry else None
+
 class CrimeCategorySerializer(serializers.ModelSerializer):
     class Meta:
         model = CrimeCategory
         fields = ['id', 'name', 'description']
 
 class CrimeTypeSerializer(serializers.ModelSerializer):
-    category_name = serializers.ReadOnlyField(source='category.name')
+    category_name = DimensionNameField('category', source='category_id')
     
     class Meta:
         model = CrimeType
@@ -28,8 +46,8 @@ class CrimeAttributeSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'value']
 
 class CrimeSerializer(serializers.ModelSerializer):
-    crime_type_name = serializers.ReadOnlyField(source='crime_type.name')
-    agency_name = serializers.ReadOnlyField(source='agency.name')
+    crime_type_name = DimensionNameField('crime_type', source='crime_type_id')
+    agency_name = DimensionNameField('agency', source='agency_id')
     attributes = CrimeAttributeSerializer(many=True, read_only=True)
     longitude = serializers.SerializerMethodField()
     latitude = serializers.SerializerMethodField()
@@ -55,9 +73,77 @@ class CrimeSerializer(serializers.ModelSerializer):
             return obj.location.y
         return None
 
+class CrimeListSerializer(serializers.Serializer):
+    """
+    Lean representation for the incident list, opted into with
+    ``?lean=true`` or ``?fields=``. It serializes flat rows from values(),
+    with coordinates extracted in SQL and names resolved from the dimension
+    cache, instead of model instances with nested serializers. The
+    ``fields`` context entry selects a sparse fieldset.
+    """
+    id = serializers.IntegerField(read_only=True)
+    incident_id = serializers.CharField(read_only=True)
+    crime_type = serializers.IntegerField(read_only=True)
+    crime_type_name = DimensionNameField('crime_type', source='crime_type')
+    category_name = DimensionNameField('crime_type', attribute='category_name', source='crime_type')
+    agency = serializers.IntegerField(read_only=True)
+    agency_name = DimensionNameField('agency', source='agency')
+    occurred_at = serializers.DateTimeField(read_only=True)
+    reported_at = serializers.DateTimeField(read_only=True)
+    block_address = serializers.CharField(read_only=True)
+    city = serializers.CharField(read_only=True)
+    state = serializers.CharField(read_only=True)
+    verification_status = serializers.CharField(read_only=True)
+    longitude = serializers.FloatField(read_only=True)
+    latitude = serializers.FloatField(read_only=True)
+    attributes = serializers.ReadOnlyField()
+
+    # Fields that are only returned when asked for explicitly
+    optional_fields = ['attributes']
+
+    # Columns always fetched, since pagination needs them
+    required_columns = ['id', 'occurred_at']
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        fields = self.context.get('fields')
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+    @classmethod
+    def get_annotations(cls):
+        """SQL expressions for the fields that aren't plain Crime columns"""
+        return {
+            'longitude': Longitude(),
+            'latitude': Latitude(),
+        }
+
+    @classmethod
+    def default_fields(cls):
+        return [name for name in cls._declared_fields if name not in cls.optional_fields]
+
+    @classmethod
+    def setup_queryset(cls, queryset, fields):
+        """Turn a Crime queryset into the rows needed to serialize fields"""
+        annotations = {
+            name: expression for name, expression in cls.get_annotations().items() if name in fields
+        }
+        columns = list(cls.required_columns)
+        for name in fields:
+            field = cls._declared_fields[name]
+            if isinstance(field, DimensionNameField):
+                # Names come from the dimension cache, only the key is fetched
+                columns.append(field.source)
+            elif name not in annotations and name not in cls.optional_fields:
+                columns.append(name)
+        return queryset.select_related(None).prefetch_related(None).annotate(
+            **annotations
+        ).values(*dict.fromkeys(columns), *annotations)
+
 class CrimeGeoSerializer(GeoFeatureModelSerializer):
-    crime_type_name = serializers.ReadOnlyField(source='crime_type.name')
-    agency_name = serializers.ReadOnlyField(source='agency.name')
+    crime_type_name = DimensionNameField('crime_type', source='crime_type_id')
+    agency_name = DimensionNameField('agency', source='agency_id')
     
     class Meta:
         model = Crime
@@ -109,18 +195,32 @@ class CrimeCreateUpdateSerializer(serializers.ModelSerializer):
             'city', 'state', 'country', 'verification_status',
             'attributes', 'is_active'
         ]
+        # The partitioned table only enforces (incident_id, occurred_at), so
+        # incident_id is checked on its own here for a field error; the
+        # incident key table makes concurrent duplicates fail in the database
+        extra_kwargs = {
+            'incident_id': {'validators': [UniqueValidator(queryset=Crime.all_objects.all())]}
+        }
+        validators = []
+    
+    def validate_attributes(self, value):
+        names = [attribute['name'] for attribute in value]
+        if len(names) != len(set(names)):
+            raise serializers.ValidationError("Attribute names must be unique per incident.")
+        return value
     
     def create(self, validated_data):
         attributes_data = validated_data.pop('attributes', [])
         longitude = validated_data.pop('longitude')
         latitude = validated_data.pop('latitude')
         
-        crime = Crime.objects.create(**validated_data)
+        crime = Crime(**validated_data)
         crime.set_location(longitude, latitude)
         crime.save()
         
-        for attribute_data in attributes_data:
-            CrimeAttribute.objects.create(crime=crime, **attribute_data)
+        CrimeAttribute.objects.bulk_create([
+            CrimeAttribute(crime=crime, **attribute_data) for attribute_data in attributes_data
+        ])
         
         return crime
     
@@ -139,10 +239,80 @@ class CrimeCreateUpdateSerializer(serializers.ModelSerializer):
         
         instance.save()
         
-        # Update attributes if provided
+        # Update attributes if provided. PUT replaces the whole set, PATCH
+        # only adds or changes the attributes it names.
         if attributes_data is not None:
-            instance.attributes.all().delete()  # Remove existing attributes
-            for attribute_data in attributes_data:
-                CrimeAttribute.objects.create(crime=instance, **attribute_data)
+            self.sync_attributes(instance, attributes_data, replace=not self.partial)
         
-        return instance
\ No newline at end of file
+        return instance
+    
+    @staticmethod
+    def sync_attributes(instance, attributes_data, replace=True):
+        """
+        Bring the attributes of instance in line with attributes_data by name,
+        with at most one INSERT, one UPDATE and one DELETE. Attributes whose
+        value is unchanged aren't written. With replace=False attributes
+        missing from attributes_data are kept.
+        """
+        existing = {attribute.name: attribute for attribute in instance.attributes.all()}
+        
+        def encoded(value):
+            # Compare JSON documents, so 1, 1.0 and true aren't taken as equal
+            return json.dumps(value, sort_keys=True)
+        
+        to_create = []
+        to_update = []
+        for attribute_data in attributes_data:
+            attribute = existing.get(attribute_data['name'])
+            if attribute is None:
+                to_create.append(CrimeAttribute(crime=instance, **attribute_data))
+            elif encoded(attribute.value) != encoded(attribute_data['value']):
+                attribute.value = attribute_data['value']
+                to_update.append(attribute)
+        
+        to_delete = []
+        if replace:
+            incoming = {attribute_data['name'] for attribute_data in attributes_data}
+            to_delete = [attribute.pk for name, attribute in existing.items() if name not in incoming]
+        
+        if to_delete:
+            CrimeAttribute.objects.filter(pk__in=to_delete).delete()
+        if to_update:
+            CrimeAttribute.objects.bulk_update(to_update, ['value'], batch_size=len(to_update))
+        if to_create:
+            CrimeAttribute.objects.bulk_create(to_create)
+
+class CrimeBulkListSerializer(serializers.ListSerializer):
+    """
+    Validates a bulk ingestion batch through a single child serializer, so
+    fields are built once per batch rather than once per row. Unlike
+    is_valid(), a row failing validation doesn't discard the valid ones.
+    """
+    def validate_rows(self):
+        """Return ([(row index, validated data), ...], {row index: errors})"""
+        validated = []
+        errors = {}
+        for index, row in enumerate(self.initial_data):
+            try:
+                validated.append((index, self.child.run_validation(row)))
+            except serializers.ValidationError as exc:
+                errors[index] = exc.detail
+        return validated, errors
+
+class CrimeBulkItemSerializer(CrimeCreateUpdateSerializer):
+    """
+    Validates a row of a bulk ingestion batch (used with many=True, see
+    CrimeBulkListSerializer). Foreign keys and incident_id uniqueness are
+    checked once for the whole batch in crimes.bulk instead of once per row.
+    """
+    crime_type = serializers.IntegerField(source='crime_type_id')
+    agency = serializers.IntegerField(source='agency_id')
+    longitude = serializers.FloatField(write_only=True, min_value=-180, max_value=180)
+    latitude = serializers.FloatField(write_only=True, min_value=-90, max_value=90)
+    attributes = CrimeAttributeSerializer(many=True, required=False)
+
+    class Meta(CrimeCreateUpdateSerializer.Meta):
+        list_serializer_class = CrimeBulkListSerializer
+        extra_kwargs = {
+            'incident_id': {'validators': []}
+        }
@@ -0,0 +1,85 @@
+from collections import Counter
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from agencies.models import Agency
+from crime_analysis.conditional import CRIMES_SCOPE, bump_data_version
+from .dimensions import dimensions
+from .gridcache import invalidate_all_grids
+from .models import Crime, CrimeAttribute, CrimeCategory, CrimeType
+from .rollups import TRACKED_FIELDS, apply_rollup_deltas, rollup_key
+
+
+def _has_tracked_fields(values):
+    return values is not None and all(field in values for field in TRACKED_FIELDS)
+
+
+@receiver(pre_save, sender=Crime)
+def load_previous_state(sender, instance, raw=False, **kwargs):
+    """Make sure the stored state of an existing incident is known before it changes"""
+    if raw or instance.pk is None:
+        return
+    loaded = getattr(instance, '_loaded_values', None)
+    if not _has_tracked_fields(loaded):
+        previous = Crime.all_objects.for_ids([instance.pk]).values(*TRACKED_FIELDS, 'location').first()
+        if previous is not None:
+            instance._loaded_values = {**(loaded or {}), **previous}
+
+
+@receiver(post_save, sender=Crime)
+def update_rollups_on_save(sender, instance, created, raw=False, **kwargs):
+    """Move the incident between daily rollup rows when it is created, edited or soft-deleted"""
+    if raw:
+        return
+    deltas = Counter()
+    previous = None if created else getattr(instance, '_loaded_values', None)
+    if _has_tracked_fields(previous) and previous['is_active']:
+        deltas[rollup_key(previous)] -= 1
+    if instance.is_active:
+        deltas[rollup_key(vars(instance))] += 1
+    apply_rollup_deltas(deltas)
+
+
+@receiver(post_save, sender=Crime)
+def invalidate_cached_grids_on_save(sender, instance, created, **kwargs):
+    """Drop cached tiles and clusters covering the incident's new and previous location"""
+    points = [instance.location]
+    previous = getattr(instance, '_loaded_values', {}).get('location')
+    if not created and previous is not None and previous != instance.location:
+        points.append(previous)
+    transaction.on_commit(lambda: invalidate_all_grids(points))
+
+
+@receiver(post_delete, sender=Crime)
+def update_rollups_on_delete(sender, instance, **kwargs):
+    values = {**vars(instance), **getattr(instance, '_loaded_values', {})}
+    if _has_tracked_fields(values) and values['is_active']:
+        apply_rollup_deltas(Counter({rollup_key(values): -1}))
+
+
+@receiver(post_delete, sender=Crime)
+def invalidate_cached_grids_on_delete(sender, instance, **kwargs):
+    points = [instance.location]
+    transaction.on_commit(lambda: invalidate_all_grids(points))
+
+
+@receiver(post_save, sender=CrimeCategory)
+@receiver(post_delete, sender=CrimeCategory)
+@receiver(post_save, sender=CrimeType)
+@receiver(post_delete, sender=CrimeType)
+@receiver(post_save, sender=Agency)
+@receiver(post_delete, sender=Agency)
+def invalidate_dimensions(sender, **kwargs):
+    """Make every process reload its dimension snapshot once the change is committed"""
+    transaction.on_commit(dimensions.invalidate)
+    # Names of these rows appear in incident responses
+    bump_data_version(CRIMES_SCOPE)
+
+
+@receiver(post_save, sender=Crime)
+@receiver(post_delete, sender=Crime)
+@receiver(post_save, sender=CrimeAttribute)
+@receiver(post_delete, sender=CrimeAttribute)
+def bump_crime_data_version(sender, **kwargs):
+    """Invalidate the conditional GET validators of the crime endpoints"""
+    bump_data_version(CRIMES_SCOPE)
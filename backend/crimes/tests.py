@@ -1,3 +1,293 @@
-from django.test import TestCase
+import re
+from datetime import timedelta
+from django.contrib.auth import get_user_model
+from django.contrib.gis.geos import MultiPolygon, Polygon
+from django.core.cache import cache
+from django.db import connection
+from django.http import QueryDict
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, force_authenticate
+from agencies.models import Agency
+from crime_analysis.conditional import CRIMES_SCOPE, bump_data_version
+from reports.models import Report
+from .filters import CrimeFilter
+from .gridcache import params_digest
+from .models import Crime, CrimeAttribute, CrimeCategory, CrimeType
+from .serializers import CrimeListSerializer
+from .tiles import tile_cache_key
+from .views import CrimeViewSet
 
-# Create your tests here.
+# GiST indexes of the crime table and its partitions
+GIST_INDEXES_SQL = """
+    SELECT index.relname
+    FROM pg_index
+    JOIN pg_class index ON index.oid = pg_index.indexrelid
+    JOIN pg_am ON pg_am.oid = index.relam
+    WHERE pg_am.amname = 'gist'
+      AND pg_index.indrelid IN (SELECT relid FROM pg_partition_tree(%s::regclass))
+"""
+
+NAIROBI = Polygon.from_bbox((36.65, -1.45, 37.10, -1.15))
+NAIROBI.srid = 4326
+
+
+def make_agency():
+    return Agency.objects.create(
+        name='Nairobi County Police',
+        agency_code='NCP',
+        agency_type='police',
+        contact_email='ncp@example.com',
+        address='Harambee Avenue',
+        city='Nairobi',
+        state='Nairobi',
+        zip_code='00100',
+        jurisdiction_area=MultiPolygon(NAIROBI, srid=4326)
+    )
+
+
+def make_crimes(count):
+    """count burglaries in Nairobi, an hour apart, each with a weapon attribute"""
+    agency = make_agency()
+    category = CrimeCategory.objects.create(name='Property')
+    crime_type = CrimeType.objects.create(category=category, name='Burglary')
+    now = timezone.now()
+    crimes = []
+    for index in range(count):
+        crime = Crime(
+            incident_id=f'INC-{index:06d}',
+            crime_type=crime_type,
+            description='Break-in reported by the owner',
+            occurred_at=now - timedelta(hours=index),
+            reported_at=now - timedelta(hours=index),
+            agency=agency,
+            data_source='benchmark',
+            block_address=f'{index % 100} Block of Moi Avenue',
+            city='Nairobi',
+            state='Nairobi'
+        )
+        crime.set_location(36.82 + index * 1e-4, -1.29)
+        crimes.append(crime)
+    Crime.objects.bulk_create(crimes)
+    CrimeAttribute.objects.bulk_create(
+        CrimeAttribute(crime=crime, name='weapon', value='none') for crime in crimes
+    )
+    return crimes
+
+
+class SpatialFilterIndexTests(TestCase):
+    """
+    The spatial filters must compare the location against a constant
+    geometry, so that the planner can answer them from the GiST index
+    instead of testing every row
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.agency = make_agency()
+
+    def setUp(self):
+        with connection.cursor() as cursor:
+            cursor.execute(GIST_INDEXES_SQL, [Crime._meta.db_table])
+            self.gist_indexes = {row[0] for row in cursor.fetchall()}
+            # The test tables are nearly empty, where a sequential scan wins
+            cursor.execute('SET LOCAL enable_seqscan = off')
+
+    def assertUsesGistIndex(self, params):
+        plan = CrimeFilter(params, queryset=Crime.objects.all()).qs.explain()
+        scanned = set(re.findall(r'Index (?:Only )?Scan(?: Backward)? (?:using|on) (\S+)', plan))
+        self.assertTrue(scanned & self.gist_indexes, f"No GiST index scan in:\n{plan}")
+
+    def test_in_bbox(self):
+        self.assertUsesGistIndex({'in_bbox': '36.65,-1.45,37.10,-1.15'})
+
+    def test_within_polygon(self):
+        self.assertUsesGistIndex({'within_polygon': NAIROBI.wkt})
+
+    def test_within_agency(self):
+        self.assertUsesGistIndex({'within_agency': self.agency.pk})
+
+    def test_near(self):
+        self.assertUsesGistIndex({'near': '36.82,-1.29,2000'})
+
+
+class ParamsDigestTests(SimpleTestCase):
+
+    def test_every_value_of_a_repeated_parameter_counts(self):
+        both = params_digest(QueryDict('crime_type=1&crime_type=2'))
+        self.assertNotEqual(both, params_digest(QueryDict('crime_type=2')))
+        self.assertEqual(both, params_digest(QueryDict('crime_type=2&crime_type=1')))
+        self.assertNotEqual(params_digest(QueryDict('a=1&b=2')), params_digest(QueryDict('a=1%26b%3D2')))
+
+
+class TileCacheScopeTests(TestCase):
+    """Cached tiles must only be served to requests allowed to see what they hold"""
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.analyst = User.objects.create_user('analyst', password='analyst')
+        cls.auditor = User.objects.create_user('auditor', password='auditor', is_staff=True)
+        cls.area = Report.objects.create(
+            title='Nairobi',
+            user=cls.auditor,
+            parameters={},
+            area_of_interest=NAIROBI,
+            start_date=timezone.now().date(),
+            end_date=timezone.now().date()
+        )
+
+    def get_tile(self, user, params):
+        request = APIRequestFactory().get('/crimes/tiles/10/619/511.mvt', params)
+        force_authenticate(request, user=user)
+        return CrimeViewSet.as_view({'get': 'tiles'})(request, z=10, x=619, y=511)
+
+    def cache_key(self, user, params):
+        request = APIRequestFactory().get('/crimes/tiles/10/619/511.mvt', params)
+        force_authenticate(request, user=user)
+        view = CrimeViewSet(request=Request(request))
+        return tile_cache_key(10, 619, 511, view.cache_scope(view.request.query_params))
+
+    def test_include_inactive_only_shares_tiles_between_staff(self):
+        params = {'include_inactive': 'true'}
+        self.assertNotEqual(self.cache_key(self.analyst, params), self.cache_key(self.auditor, params))
+        self.assertEqual(self.cache_key(self.analyst, params), self.cache_key(self.analyst, {}))
+
+    def test_saved_areas_are_scoped_to_their_owner(self):
+        params = {'within_polygon': str(self.area.pk)}
+        self.assertNotEqual(self.cache_key(self.analyst, params), self.cache_key(self.auditor, params))
+
+        self.assertEqual(self.get_tile(self.auditor, params).status_code, 200)
+        self.assertEqual(self.get_tile(self.analyst, params).status_code, 400)
+
+
+class CrimeListTests(TestCase):
+    """
+    The lean list reads flat rows in a fixed number of queries. Timings of
+    both representations come from the benchmark_crime_list command.
+    """
+
+    page_size = 1000
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user('analyst', password='analyst')
+        make_crimes(cls.page_size)
+
+    def get_list(self, params):
+        # Without a count the queries don't depend on the page being the last
+        request = APIRequestFactory().get('/crimes/', {'page_size': self.page_size, 'count': 'none', **params})
+        force_authenticate(request, user=self.user)
+        response = CrimeViewSet.as_view({'get': 'list'})(request)
+        response.render()
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_default_list_keeps_the_nested_crime_type(self):
+        row = self.get_list({}).data['results'][0]
+        self.assertEqual(row['crime_type']['name'], 'Burglary')
+        self.assertEqual(row['crime_type']['category']['name'], 'Property')
+
+        row = self.get_list({'lean': 'true'}).data['results'][0]
+        self.assertIsInstance(row['crime_type'], int)
+        self.assertEqual(row['crime_type_name'], 'Burglary')
+
+    def test_lean_list_fields(self):
+        rows = self.get_list({'lean': 'true'}).data['results']
+        self.assertEqual(len(rows), self.page_size)
+        self.assertEqual(list(rows[0]), CrimeListSerializer.default_fields())
+
+        row = self.get_list({'lean': 'true', 'include': 'attributes'}).data['results'][0]
+        self.assertEqual(row['attributes'], [{'name': 'weapon', 'value': 'none'}])
+
+        row = self.get_list({'fields': 'id,occurred_at,crime_type_name'}).data['results'][0]
+        self.assertEqual(set(row), {'id', 'occurred_at', 'crime_type_name'})
+
+    def test_lean_list_payload_is_smaller(self):
+        for params in ({}, {'include': 'attributes'}):
+            with self.subTest(**params):
+                nested = self.get_list(params).content
+                lean = self.get_list({**params, 'lean': 'true'}).content
+                self.assertLess(len(lean), len(nested))
+
+    def test_lean_list_queries(self):
+        # Names come from the dimension cache, loaded by the first request.
+        # Each request reads the data version and then the page.
+        self.get_list({'lean': 'true'})
+        with self.assertNumQueries(2):
+            self.get_list({'lean': 'true'})
+        with self.assertNumQueries(3):
+            self.get_list({'lean': 'true', 'include': 'attributes'})
+
+    def test_writes_change_the_etag(self):
+        etag = self.get_list({'lean': 'true'})['ETag']
+        request = APIRequestFactory().get('/crimes/', {'page_size': self.page_size, 'count': 'none', 'lean': 'true'},
+                                          HTTP_IF_NONE_MATCH=etag)
+        force_authenticate(request, user=self.user)
+        self.assertEqual(CrimeViewSet.as_view({'get': 'list'})(request).status_code, 304)
+
+        # Versions are kept in the database, not in a per-process cache
+        cache.clear()
+        self.assertEqual(self.get_list({'lean': 'true'})['ETag'], etag)
+        with self.captureOnCommitCallbacks(execute=True):
+            bump_data_version(CRIMES_SCOPE)
+        self.assertNotEqual(self.get_list({'lean': 'true'})['ETag'], etag)
+
+    def test_queries_do_not_grow_with_the_page(self):
+        for params in ({'include': 'attributes'}, {'lean': 'true', 'include': 'attributes'}):
+            with self.subTest(**params):
+                self.get_list({**params, 'page_size': 10})
+                with CaptureQueriesContext(connection) as small_page:
+                    self.get_list({**params, 'page_size': 10})
+                with self.assertNumQueries(len(small_page)):
+                    self.get_list(params)
+
+
+class CrimeSearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user('analyst', password='analyst')
+        cls.crimes = make_crimes(30)
+
+    def test_post_takes_the_search_page_payload(self):
+        request = APIRequestFactory().post('/crimes/search/?count=exact', {
+            'query': 'break moi',
+            'pageSize': 10,
+            'page': 2,
+            'sortBy': 'date',
+            'sortOrder': 'asc'
+        }, format='json')
+        force_authenticate(request, user=self.user)
+        response = CrimeViewSet.as_view({'post': 'search'})(request)
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(response.data['count'], 30)
+        incident_ids = [row['incident_id'] for row in response.data['results']]
+        self.assertEqual(incident_ids, [crime.incident_id for crime in self.crimes[19:9:-1]])
+        self.assertIn('<mark>', response.data['results'][0]['highlight']['description'])
+        # The body is passed to the filters and the paginator, not written into the request
+        self.assertEqual(dict(request.GET), {'count': ['exact']})
+
+
+class CrimeClusterTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user('analyst', password='analyst')
+        make_crimes(30)
+
+    def get_clusters(self, params):
+        request = APIRequestFactory().get('/crimes/clusters/', params)
+        force_authenticate(request, user=self.user)
+        response = CrimeViewSet.as_view({'get': 'clusters'})(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(dict(request.GET), {name: [value] for name, value in params.items()})
+        return response.data['clusters']
+
+    def test_viewport_doesnt_narrow_the_filters(self):
+        params = {'bbox': '36.80,-1.30,36.83,-1.28', 'zoom': '12', 'city': 'Nairobi'}
+        self.assertEqual(sum(cluster['count'] for cluster in self.get_clusters(params)), 30)
+        self.assertEqual(self.get_clusters({**params, 'city': 'Mombasa'}), [])
@@ -0,0 +1,116 @@
+import math
+from django.contrib.gis.geos import Polygon
+from django.db import connection
+from .geo import MERCATOR_HALF_WORLD, in_box
+from .gridcache import TILE_NAMESPACE, get_version, params_digest
+
+# Vector tile geometry extent and buffer, in tile units
+TILE_EXTENT = 4096
+TILE_BUFFER = 64
+
+# Deepest zoom level served as a vector tile
+MAX_TILE_ZOOM = 22
+
+# Below this zoom points are aggregated into grid cells instead of sent individually
+AGGREGATE_BELOW_ZOOM = 12
+
+# Size of an aggregation cell, in tile units
+AGGREGATE_CELL_SIZE = 64
+
+TILE_CACHE_TIMEOUT = 60 * 60 * 24
+
+MVT_CONTENT_TYPE = 'application/vnd.mapbox-vector-tile'
+
+
+def tile_bounds(z, x, y):
+    """Return the (min_lon, min_lat, max_lon, max_lat) bounds of a tile"""
+    scale = 2 ** z
+
+    def latitude(tile_y):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * tile_y / scale))))
+
+    return (
+        x / scale * 360.0 - 180.0,
+        latitude(y + 1),
+        (x + 1) / scale * 360.0 - 180.0,
+        latitude(y)
+    )
+
+
+def tile_polygon(z, x, y):
+    """WGS84 polygon of a tile, padded by the tile buffer so edge points are kept"""
+    min_lon, min_lat, max_lon, max_lat = tile_bounds(z, x, y)
+    pad_lon = (max_lon - min_lon) * TILE_BUFFER / TILE_EXTENT
+    pad_lat = (max_lat - min_lat) * TILE_BUFFER / TILE_EXTENT
+    polygon = Polygon.from_bbox((
+        max(min_lon - pad_lon, -180.0),
+        max(min_lat - pad_lat, -90.0),
+        min(max_lon + pad_lon, 180.0),
+        min(max_lat + pad_lat, 90.0)
+    ))
+    polygon.srid = 4326
+    return polygon
+
+
+def is_valid_tile(z, x, y):
+    return 0 <= z <= MAX_TILE_ZOOM and 0 <= x < 2 ** z and 0 <= y < 2 ** z
+
+
+def tile_cache_key(z, x, y, params):
+    """Cache key for an encoded tile, scoped to its version and filter parameters (see CrimeViewSet.cache_scope)"""
+    return f'crimes:tiles:{z}:{x}:{y}:{get_version(TILE_NAMESPACE, z, x, y)}:{params_digest(params)}'
+
+
+def render_tile(queryset, z, x, y):
+    """
+    Encode the incidents of queryset that fall in tile z/x/y as a Mapbox
+    Vector Tile with ST_AsMVT. Below AGGREGATE_BELOW_ZOOM points are
+    snapped to a grid and sent as one feature per cell with a count.
+    """
+    inner = in_box(queryset, tile_polygon(z, x, y)).order_by().values(
+        'id', 'location', 'crime_type', 'verification_status', 'occurred_at'
+    )
+    inner_sql, inner_params = inner.query.sql_with_params()
+
+    if z < AGGREGATE_BELOW_ZOOM:
+        cell_size = 2 * MERCATOR_HALF_WORLD / (2 ** z) / (TILE_EXTENT / AGGREGATE_CELL_SIZE)
+        sql = f"""
+            SELECT ST_AsMVT(tile, 'crimes', {TILE_EXTENT}, 'geom') FROM (
+                SELECT
+                    ST_AsMVTGeom(ST_Centroid(ST_Collect(cell.geom)), ST_TileEnvelope(%s, %s, %s),
+                                 {TILE_EXTENT}, {TILE_BUFFER}, true) AS geom,
+                    COUNT(*) AS count
+                FROM (
+                    SELECT
+                        ST_Transform(q.location::geometry, 3857) AS geom,
+                        ST_SnapToGrid(ST_Transform(q.location::geometry, 3857), %s) AS cell
+                    FROM ({inner_sql}) AS q
+                ) AS cell
+                GROUP BY cell.cell
+            ) AS tile
+            WHERE tile.geom IS NOT NULL
+        """
+        params = [z, x, y, cell_size, *inner_params]
+    else:
+        sql = f"""
+            SELECT ST_AsMVT(tile, 'crimes', {TILE_EXTENT}, 'geom') FROM (
+                SELECT
+                    ST_AsMVTGeom(ST_Transform(q.location::geometry, 3857), ST_TileEnvelope(%s, %s, %s),
+                                 {TILE_EXTENT}, {TILE_BUFFER}, true) AS geom,
+                    q.id,
+                    q.crime_type_id AS crime_type,
+                    q.verification_status,
+                    EXTRACT(EPOCH FROM q.occurred_at)::bigint AS occurred_at
+                FROM ({inner_sql}) AS q
+            ) AS tile
+            WHERE tile.geom IS NOT NULL
+        """
+        params = [z, x, y, *inner_params]
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        row = cursor.fetchone()
+
+    if row is None or row[0] is None:
+        return b''
+    return bytes(row[0])
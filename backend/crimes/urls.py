@@ -15,6 +15,35 @@ router.register(r'incidents', CrimeViewSet, basename='crime')
 router.register(r'attributes', CrimeAttributeViewSet, basename='crime-attribute')
 
 urlpatterns = [
+    # Vector tiles are served outside the router so the path can end in .mvt
+    path(
+        'tiles/<int:z>/<int:x>/<int:y>.mvt',
+        CrimeViewSet.as_view({'get': 'tiles'}),
+        name='crime-tiles'
+    ),
+    # Heatmap at the path the frontend requests it from
+    path(
+        'heatmap/',
+        CrimeViewSet.as_view({'get': 'heatmap'}, **CrimeViewSet.heatmap.kwargs),
+        name='crime-heatmap-page'
+    ),
+    # Rollup statistics and trends at the paths CrimeService requests
+    path(
+        'statistics/',
+        CrimeViewSet.as_view({'get': 'statistics'}, **CrimeViewSet.statistics.kwargs),
+        name='crime-statistics-page'
+    ),
+    path(
+        'trends/',
+        CrimeViewSet.as_view({'get': 'trends'}, **CrimeViewSet.trends.kwargs),
+        name='crime-trends-page'
+    ),
+    # Search is also served at the path the frontend posts its search page to
+    path(
+        'search/',
+        CrimeViewSet.as_view({'get': 'search', 'post': 'search'}, **CrimeViewSet.search.kwargs),
+        name='crime-search-page'
+    ),
     # Include router URLs
     path('', include(router.urls)),
 ]
\ No newline at end of file
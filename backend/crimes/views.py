@@ -1,6 +1,46 @@
-from rest_framework import viewsets, filters
+import json
+from rest_framework import viewsets, filters, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from django.contrib.postgres.search import SearchRank
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.db.models import Count, F, Sum
+from django.db.models.functions import Floor, TruncDay, TruncMonth, TruncWeek
 from django_filters.rest_framework import DjangoFilterBackend
-from .models import CrimeCategory, CrimeType, Crime, CrimeAttribute
+from crime_analysis.conditional import CRIMES_SCOPE, conditional_get
+from crime_analysis.pagination import CountModePagination
+from .bulk import BULK_MAX_ROWS, bulk_ingest_crimes
+from .cells import (
+    GRID_RESOLUTIONS,
+    MAX_GRID_CELLS,
+    MAX_GRID_RESOLUTION,
+    cell_center,
+    cell_expression,
+    cell_polygon,
+    grid_field,
+    resolution_for_zoom
+)
+from .clusters import MAX_CLUSTER_BLOCKS, blocks_for_bbox, viewport_clusters
+from .dimensions import dimensions
+from .export import EXPORT_FORMATS
+from .filters import (
+    CrimeAttributeFilter,
+    CrimeAttributeFilterBackend,
+    CrimeFilter,
+    CrimeFilterBackend,
+    CrimeOrderingFilter,
+    CrimeRollupFilter,
+    CrimeSearchFilter,
+    parse_bbox_coords
+)
+from .geo import MAX_ZOOM, Latitude, Longitude, grid_cell_size
+from .models import CrimeCategory, CrimeType, Crime, CrimeAttribute, CrimeDailyRollup
+from .pagination import CrimeKeysetPagination
+from .search import build_search_query, headline, search_params
+from .tiles import MVT_CONTENT_TYPE, TILE_CACHE_TIMEOUT, is_valid_tile, render_tile, tile_cache_key
 from .serializers import (
     CrimeCategorySerializer,
     CrimeTypeDetailSerializer, 
@@ -9,7 +49,9 @@ from .serializers import (
     CrimeDetailSerializer, 
     CrimeCreateUpdateSerializer,
     CrimeGeoSerializer,
-    CrimeAttributeSerializer
+    CrimeAttributeSerializer,
+    CrimeBulkItemSerializer,
+    CrimeListSerializer
 )
 
 class CrimeCategoryViewSet(viewsets.ModelViewSet):
@@ -47,20 +89,17 @@ class CrimeViewSet(viewsets.ModelViewSet):
         'crime_type__category', 
         'agency'
     ).prefetch_related('attributes').all()
+    pagination_class = CrimeKeysetPagination
+    # Exact counts of the incident table are too slow for every page
+    pagination_count_mode = 'estimate'
+    # The backends also run with explicit parameters (see filter_queryset)
     filter_backends = [
-        filters.SearchFilter, 
-        filters.OrderingFilter, 
-        DjangoFilterBackend
-    ]
-    filterset_fields = [
-        'crime_type', 
-        'agency', 
-        'city', 
-        'state', 
-        'verification_status',
-        'occurred_at',
-        'reported_at'
+        CrimeSearchFilter,
+        CrimeOrderingFilter,
+        CrimeFilterBackend,
+        CrimeAttributeFilterBackend
     ]
+    filterset_class = CrimeFilter
     search_fields = [
         'description', 
         'block_address', 
@@ -73,20 +112,500 @@ class CrimeViewSet(viewsets.ModelViewSet):
     ]
 
     def get_serializer_class(self):
-        if self.action == 'create' or self.action == 'update':
+        if self.action in ['create', 'update', 'partial_update']:
             return CrimeCreateUpdateSerializer
+        elif self.action == 'list' and self.lean_list():
+            return CrimeListSerializer
         elif self.action in ['retrieve', 'list']:
             return CrimeDetailSerializer
         elif self.action == 'spatial':
             return CrimeGeoSerializer
+        elif self.action == 'bulk':
+            return CrimeBulkItemSerializer
         return CrimeSerializer
 
+    def lean_list(self):
+        """
+        The list keeps the detail representation (nested crime type) unless
+        ``?lean=true`` or a ``?fields=`` sparse fieldset asks for flat rows
+        """
+        params = self.request.query_params
+        return 'fields' in params or params.get('lean', '').lower() in ('1', 'true', 'yes')
+
+    def get_list_fields(self):
+        """
+        Fields requested for the lean list through ``?fields=`` (a comma
+        separated sparse fieldset) and ``?include=attributes``
+        """
+        if hasattr(self, '_list_fields'):
+            return self._list_fields
+
+        requested = self.request.query_params.get('fields')
+        if requested:
+            fields = [name.strip() for name in requested.split(',') if name.strip()]
+            unknown = set(fields) - set(CrimeListSerializer._declared_fields)
+            if unknown:
+                raise ValidationError({'fields': f'Unknown fields: {", ".join(sorted(unknown))}'})
+        else:
+            fields = CrimeListSerializer.default_fields()
+
+        included = self.request.query_params.get('include', '')
+        if 'attributes' in included.split(',') and 'attributes' not in fields:
+            fields.append('attributes')
+
+        self._list_fields = fields
+        return fields
+
+    def include_inactive(self):
+        """Staff can see soft-deleted incidents with ``include_inactive=true``, e.g. for audits"""
+        return (
+            self.request.user.is_staff and
+            self.request.query_params.get('include_inactive', '').lower() in ('1', 'true', 'yes')
+        )
+
+    def cache_scope(self, params):
+        """
+        params as they shape what this request may see, for cache keys: the
+        resolved include_inactive flag (only staff get it) replaces the raw
+        value, and a saved within_polygon area is scoped to the user owning it
+        """
+        scope = params.copy()
+        scope['include_inactive'] = 'true' if self.include_inactive() else 'false'
+        if scope.get('within_polygon', '').strip().isdigit():
+            scope['within_polygon_owner'] = str(self.request.user.pk)
+        return scope
+
+    def get_queryset(self):
+        if self.include_inactive():
+            queryset = Crime.all_objects.select_related(
+                'crime_type',
+                'crime_type__category',
+                'agency'
+            ).prefetch_related('attributes')
+        else:
+            queryset = super().get_queryset()
+        if self.detail:
+            # Read only the partition holding the incident
+            try:
+                pk = int(self.kwargs[self.lookup_url_kwarg or self.lookup_field])
+            except (KeyError, ValueError):
+                raise Http404
+            queryset = queryset.for_ids([pk])
+        if self.action == 'list' and self.lean_list():
+            queryset = CrimeListSerializer.setup_queryset(queryset, self.get_list_fields())
+        return queryset
+
+    def filter_queryset(self, queryset, params=None):
+        """
+        Apply the filter backends. params (a QueryDict) replaces the query
+        string for actions that take their filters from elsewhere.
+        """
+        if params is None:
+            return super().filter_queryset(queryset)
+        for backend in self.filter_backends:
+            queryset = backend().filter_params(self.request, queryset, self, params)
+        return queryset
+
+    def paginate_queryset(self, queryset, params=None):
+        """Paginate queryset, reading the page parameters from params when given"""
+        if self.paginator is None:
+            return None
+        return self.paginator.paginate_queryset(queryset, self.request, view=self, params=params)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.action == 'list' and self.lean_list():
+            context['fields'] = self.get_list_fields()
+        return context
+
+    @conditional_get(CRIMES_SCOPE)
+    def list(self, request, *args, **kwargs):
+        if not self.lean_list():
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+
+        page = self.paginate_queryset(queryset)
+        rows = list(page) if page is not None else list(queryset)
+
+        if 'attributes' in self.get_list_fields():
+            attributes = {}
+            for attribute in CrimeAttribute.objects.filter(
+                crime_id__in=[row['id'] for row in rows]
+            ).values('crime_id', 'name', 'value'):
+                attributes.setdefault(attribute.pop('crime_id'), []).append(attribute)
+            for row in rows:
+                row['attributes'] = attributes.get(row['id'], [])
+
+        serializer = self.get_serializer(rows, many=True)
+        if page is not None:
+            return self.get_paginated_response(serializer.data)
+        return Response(serializer.data)
+
+    @conditional_get(CRIMES_SCOPE)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+    def _conflict_response(self, error):
+        # The incident key table rejected an incident id another writer took
+        return Response({
+            'error': str(error)
+        }, status=status.HTTP_409_CONFLICT)
+
+    def create(self, request, *args, **kwargs):
+        try:
+            with transaction.atomic():
+                return super().create(request, *args, **kwargs)
+        except IntegrityError as e:
+            return self._conflict_response(e)
+
+    def update(self, request, *args, **kwargs):
+        try:
+            with transaction.atomic():
+                return super().update(request, *args, **kwargs)
+        except IntegrityError as e:
+            return self._conflict_response(e)
+
+    def _aggregate_queryset(self, params=None):
+        """Filtered incidents stripped of joins and ordering, ready for GROUP BY"""
+        return self.filter_queryset(self.get_queryset(), params).select_related(None).prefetch_related(None).order_by()
+
+    def _get_zoom(self, request, default=10):
+        try:
+            zoom = int(request.query_params.get('zoom', default))
+        except ValueError:
+            raise ValidationError({'zoom': 'Zoom must be an integer'})
+        return max(0, min(zoom, MAX_ZOOM))
+
+    @action(detail=False, methods=['get'])
+    @conditional_get(CRIMES_SCOPE)
+    def heatmap(self, request):
+        """
+        Grid-binned heatmap of the filtered incidents as [lon, lat, weight]
+        triples. The grid gets finer as ``zoom`` increases, and
+        ``weight=severity`` weights incidents by their crime type severity.
+        """
+        zoom = self._get_zoom(request)
+        cell_size = grid_cell_size(zoom)
+
+        if request.query_params.get('weight') == 'severity':
+            weight = Sum('crime_type__severity_level')
+        else:
+            weight = Count('id')
+
+        resolution = resolution_for_zoom(zoom)
+        if resolution <= MAX_GRID_RESOLUTION:
+            # Bin on the stored cell ids: an integer GROUP BY, no geometry.
+            # Every incident is tagged on write, and migration 0012 tagged
+            # the ones stored before the grid columns existed.
+            bins = self._aggregate_queryset().filter(
+                **{f'{grid_field(MAX_GRID_RESOLUTION)}__isnull': False}
+            ).annotate(cell=cell_expression(resolution)).values('cell').annotate(weight=weight)
+            points = [
+                [*(round(value, 6) for value in cell_center(cell['cell'])), cell['weight']]
+                for cell in bins
+            ]
+        else:
+            bins = self._aggregate_queryset().annotate(
+                cell_x=Floor(Longitude() / cell_size),
+                cell_y=Floor(Latitude() / cell_size)
+            ).values('cell_x', 'cell_y').annotate(weight=weight)
+            points = [
+                [
+                    round((cell['cell_x'] + 0.5) * cell_size, 6),
+                    round((cell['cell_y'] + 0.5) * cell_size, 6),
+                    cell['weight']
+                ] for cell in bins
+            ]
+
+        return Response({
+            'zoom': zoom,
+            'cell_size': cell_size,
+            'points': points
+        })
+
+    @action(detail=False, methods=['get'])
+    @conditional_get(CRIMES_SCOPE)
+    def grid(self, request):
+        """
+        Counts of the filtered incidents per grid cell at ``resolution``
+        (1-17, see crimes.cells) as a GeoJSON FeatureCollection of cell
+        polygons, busiest cells first.
+        """
+        try:
+            resolution = int(request.query_params.get('resolution', GRID_RESOLUTIONS[1]))
+        except ValueError:
+            raise ValidationError({'resolution': 'Resolution must be an integer'})
+        if not 1 <= resolution <= MAX_GRID_RESOLUTION:
+            raise ValidationError({'resolution': f'Resolution must be between 1 and {MAX_GRID_RESOLUTION}'})
+
+        cells = self._aggregate_queryset().filter(
+            **{f'{grid_field(MAX_GRID_RESOLUTION)}__isnull': False}
+        ).annotate(cell=cell_expression(resolution)).values('cell').annotate(
+            count=Count('id')
+        ).order_by('-count')[:MAX_GRID_CELLS]
+
+        return Response({
+            'type': 'FeatureCollection',
+            'resolution': resolution,
+            'features': [
+                {
+                    'type': 'Feature',
+                    'id': cell['cell'],
+                    'geometry': json.loads(cell_polygon(cell['cell']).geojson),
+                    'properties': {'cell': cell['cell'], 'count': cell['count']}
+                } for cell in cells
+            ]
+        })
+
+    @conditional_get(CRIMES_SCOPE)
+    def tiles(self, request, z, x, y):
+        """
+        Mapbox Vector Tile of the filtered incidents for tile z/x/y. Encoded
+        tiles are cached until an incident inside them changes.
+        """
+        if not is_valid_tile(z, x, y):
+            raise Http404('Tile coordinates out of range')
+
+        # Filtering validates the parameters (and saved area ownership)
+        # before any cached tile is served; the queryset itself stays lazy
+        queryset = self.filter_queryset(self.get_queryset()).select_related(None).prefetch_related(None)
+        cache_key = tile_cache_key(z, x, y, self.cache_scope(request.query_params))
+        tile = cache.get(cache_key)
+        if tile is None:
+            tile = render_tile(queryset, z, x, y)
+            cache.set(cache_key, tile, TILE_CACHE_TIMEOUT)
+
+        return HttpResponse(tile, content_type=MVT_CONTENT_TYPE)
+
+    @action(detail=False, methods=['get'])
+    @conditional_get(CRIMES_SCOPE)
+    def clusters(self, request):
+        """
+        Server-side clusters of the filtered incidents inside the ``bbox``
+        viewport at ``zoom``, each with a count broken down by crime category.
+        """
+        if 'bbox' not in request.query_params:
+            raise ValidationError({'bbox': 'A bbox viewport is required'})
+        bbox = parse_bbox_coords(request.query_params['bbox'])
+        zoom = self._get_zoom(request)
+        if len(blocks_for_bbox(bbox, zoom)) > MAX_CLUSTER_BLOCKS:
+            raise ValidationError({'bbox': 'Viewport is too large for this zoom level'})
+
+        # Clusters are cached per grid block rather than per viewport, so the
+        # viewport itself (bbox is also a CrimeFilter alias of in_bbox) must
+        # not narrow the query. Every other parameter goes to the filters.
+        params = request.query_params.copy()
+        for name in ('bbox', 'zoom'):
+            params.pop(name, None)
+        queryset = self._aggregate_queryset(params)
+
+        return Response({
+            'zoom': zoom,
+            'clusters': viewport_clusters(queryset, zoom, bbox, self.cache_scope(params))
+        })
+
+    def _rollup_queryset(self, request):
+        """Daily rollup rows matching the request's filters"""
+        filterset = CrimeRollupFilter(
+            request.query_params, queryset=CrimeDailyRollup.objects.all(), request=request
+        )
+        if not filterset.is_valid():
+            raise ValidationError(filterset.errors)
+        return filterset.qs.order_by()
+
+    @action(detail=False, methods=['get'])
+    @conditional_get(CRIMES_SCOPE)
+    def statistics(self, request):
+        """
+        Incident totals broken down by crime type, category, agency, city and
+        verification status. Reads the daily rollup instead of the crime table.
+        """
+        rollups = self._rollup_queryset(request)
+
+        def breakdown(*fields):
+            return list(
+                rollups.values(*fields).annotate(count=Sum('count')).order_by('-count')
+            )
+
+        # Names come from the dimension cache, and categories are summed from
+        # the crime type breakdown, so no dimension table is joined
+        by_crime_type = breakdown('crime_type')
+        by_category = {}
+        for row in by_crime_type:
+            crime_type = dimensions.crime_type(row['crime_type'])
+            row['name'] = crime_type.name if crime_type else None
+            category_id = crime_type.category_id if crime_type else None
+            if category_id not in by_category:
+                by_category[category_id] = {
+                    'crime_type__category': category_id,
+                    'name': crime_type.category_name if crime_type else None,
+                    'count': 0
+                }
+            by_category[category_id]['count'] += row['count']
+
+        by_agency = breakdown('agency')
+        for row in by_agency:
+            agency = dimensions.agency(row['agency'])
+            row['name'] = agency.name if agency else None
+
+        return Response({
+            'total': rollups.aggregate(total=Sum('count'))['total'] or 0,
+            'by_crime_type': by_crime_type,
+            'by_category': sorted(by_category.values(), key=lambda row: -row['count']),
+            'by_agency': by_agency,
+            'by_city': breakdown('city'),
+            'by_verification_status': breakdown('verification_status')
+        })
+
+    @action(detail=False, methods=['get'])
+    @conditional_get(CRIMES_SCOPE)
+    def trends(self, request):
+        """
+        Incident counts per day, week or month (``timeframe``), optionally
+        split by one dimension (``group_by``). Reads the daily rollup.
+        """
+        truncations = {'daily': TruncDay, 'weekly': TruncWeek, 'monthly': TruncMonth}
+        groupings = ['crime_type', 'agency', 'city', 'verification_status']
+
+        timeframe = request.query_params.get('timeframe', 'monthly')
+        if timeframe not in truncations:
+            raise ValidationError({'timeframe': f'Expected one of {", ".join(truncations)}'})
+        group_by = request.query_params.get('group_by')
+        if group_by and group_by not in groupings:
+            raise ValidationError({'group_by': f'Expected one of {", ".join(groupings)}'})
+
+        fields = ['period', group_by] if group_by else ['period']
+        series = self._rollup_queryset(request).annotate(
+            period=truncations[timeframe]('date')
+        ).values(*fields).annotate(count=Sum('count')).order_by(*fields)
+
+        return Response({
+            'timeframe': timeframe,
+            'group_by': group_by,
+            'series': list(series)
+        })
+
+    @action(detail=False, methods=['get'])
+    @conditional_get(CRIMES_SCOPE)
+    def export(self, request):
+        """
+        Stream every filtered incident as a GeoJSON FeatureCollection or as
+        newline-delimited JSON (``output=ndjson``). Rows are read through a
+        server-side cursor, so memory use doesn't grow with the result size.
+        """
+        output = request.query_params.get('output', 'geojson')
+        if output not in EXPORT_FORMATS:
+            raise ValidationError({'output': f'Expected one of {", ".join(EXPORT_FORMATS)}'})
+        stream, content_type = EXPORT_FORMATS[output]
+
+        queryset = self.filter_queryset(self.get_queryset()).select_related(None).prefetch_related(None)
+        response = StreamingHttpResponse(stream(queryset), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="crimes.{output}"'
+        return response
+
+    @action(detail=False, methods=['get', 'post'], pagination_class=CountModePagination)
+    @conditional_get(CRIMES_SCOPE)
+    def search(self, request):
+        """
+        Full-text search over incident descriptions and block addresses.
+        Every term of ``q`` is matched as a prefix; results are ranked
+        (unless ``ordering`` is given) and carry highlighted snippets of the
+        matching text. The list filters apply, and without ``q`` the search
+        is filters only. POST takes the parameters in the body, including
+        the search page's payload (see crimes.search.search_params). Keyset
+        pagination is off here, since it would replace the rank order.
+        """
+        params = request.query_params
+        if request.method == 'POST' and isinstance(request.data, dict):
+            params = search_params(request.data, request.query_params)
+
+        query = build_search_query(params.get('q'))
+        criteria = set(params) - {'q', 'ordering', 'page', 'page_size', 'count'}
+        if query is None and not criteria:
+            raise ValidationError({'q': 'A search query or a filter is required'})
+
+        queryset = self.filter_queryset(self.get_queryset(), params)
+        if query is not None:
+            queryset = queryset.filter(search_vector=query).annotate(
+                rank=SearchRank(F('search_vector'), query)
+            )
+            if 'ordering' not in params:
+                queryset = queryset.order_by('-rank', '-occurred_at')
+
+        page = self.paginate_queryset(queryset, params)
+        crimes = page if page is not None else list(queryset)
+
+        # Headlines are expensive, so only build them for the rows returned
+        highlights = {}
+        if query is not None:
+            highlights = {
+                row['pk']: row for row in Crime.objects.for_ids([crime.pk for crime in crimes]).values(
+                    'pk',
+                    description_highlight=headline('description', query),
+                    address_highlight=headline('block_address', query)
+                )
+            }
+
+        data = self.get_serializer(crimes, many=True).data
+        for item, crime in zip(data, crimes):
+            item['rank'] = getattr(crime, 'rank', None)
+            highlight = highlights.get(crime.pk)
+            item['highlight'] = highlight and {
+                'description': highlight['description_highlight'],
+                'block_address': highlight['address_highlight']
+            }
+
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        Ingest a batch of incidents in one request. Valid rows are written
+        with set-based inserts in a single transaction and invalid rows are
+        reported by their index in the batch.
+        """
+        rows = request.data
+        if isinstance(rows, dict):
+            rows = rows.get('incidents')
+
+        if not isinstance(rows, list):
+            return Response({
+                'error': 'Expected a list of incidents'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if len(rows) > BULK_MAX_ROWS:
+            return Response({
+                'error': f'A batch may contain at most {BULK_MAX_ROWS} incidents'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            created, errors = bulk_ingest_crimes(rows)
+        except IntegrityError as e:
+            # Another writer inserted one of the incidents concurrently
+            return self._conflict_response(e)
+
+        return Response({
+            'received': len(rows),
+            'created': len(created),
+            'failed': len(errors),
+            'errors': [
+                {
+                    'index': index,
+                    'incident_id': rows[index].get('incident_id') if isinstance(rows[index], dict) else None,
+                    'errors': row_errors
+                } for index, row_errors in sorted(errors.items())
+            ]
+        }, status=status.HTTP_201_CREATED if created or not errors else status.HTTP_400_BAD_REQUEST)
+
 class CrimeAttributeViewSet(viewsets.ModelViewSet):
     """
     ViewSet for handling CRUD operations on Crime Attributes
     """
     queryset = CrimeAttribute.objects.select_related('crime').all()
     serializer_class = CrimeAttributeSerializer
+    pagination_count_mode = 'estimate'
     filter_backends = [filters.SearchFilter, DjangoFilterBackend]
-    filterset_fields = ['crime', 'name']
+    filterset_class = CrimeAttributeFilter
     search_fields = ['name', 'value']
\ No newline at end of file
@@ -4,7 +4,7 @@ from .models import DataSource, ETLJob, DataValidationRule, ETLJobLog
 @admin.register(DataSource)
 class DataSourceAdmin(admin.ModelAdmin):
     """Admin configuration for DataSource model"""
-    list_display = ['name', 'agency', 'source_type', 'is_active', 'sync_frequency']
+    list_display = ['name', 'agency', 'source_type', 'is_active', 'sync_frequency', 'last_synced_at']
     list_filter = ['agency', 'source_type', 'is_active', 'sync_frequency']
     search_fields = ['name', 'description']
 
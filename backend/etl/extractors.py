@@ -0,0 +1,328 @@
+import base64
+import csv
+import io
+import json
+import operator
+import urllib.parse
+import urllib.request
+import zipfile
+from agencies.models import AgencyAPIConfig
+from .files import FileFormatError, ImportPathError, iter_tables, resolve_import_path
+
+# Seconds to wait on a remote source before giving up
+REQUEST_TIMEOUT = 60
+
+# Records requested per page from paginated APIs, unless configured
+API_PAGE_SIZE = 1000
+
+# Extractor classes by DataSource.source_type, filled by register_extractor
+EXTRACTORS = {}
+
+
+class ExtractorError(Exception):
+    """Raised when a source can't be read"""
+
+
+def register_extractor(*source_types):
+    """Class decorator registering an extractor for DataSource source types"""
+    def decorator(cls):
+        for source_type in source_types:
+            EXTRACTORS[source_type] = cls
+        return cls
+    return decorator
+
+
+def get_extractor(data_source, job, mapping=None):
+    """Extractor instance for a data source, or ExtractorError when its type can't be synced"""
+    try:
+        extractor_class = EXTRACTORS[data_source.source_type]
+    except KeyError:
+        raise ExtractorError(f"Sources of type '{data_source.source_type}' can't be synced")
+    return extractor_class(data_source, job, mapping)
+
+
+def record_path(record, path):
+    """Value at a dotted path of a nested record, or None"""
+    value = record
+    for key in path.split('.') if path else ():
+        if isinstance(value, dict):
+            value = value.get(key)
+        elif isinstance(value, list) and key.isdigit() and int(key) < len(value):
+            value = value[int(key)]
+        else:
+            return None
+    return value
+
+
+class Extractor:
+    """
+    Base extractor. Subclasses yield raw source records (dicts) from
+    records(), or override batches() when the source hands out batches
+    itself. Only one batch is held in memory at a time. The job's compiled
+    FieldMapping, when given, tells which source fields are needed.
+
+    ``watermark`` is the source's stored watermark, or None on a first or
+    full sync. Extractors that can ask the source for newer records only
+    do so; the pipeline drops older records from the others.
+    """
+
+    def __init__(self, data_source, job, mapping=None):
+        self.data_source = data_source
+        self.job = job
+        self.mapping = mapping
+        self.config = data_source.configuration or {}
+        full_resync = (job.parameters or {}).get('full_resync')
+        self.watermark = None if full_resync else data_source.watermark or None
+
+    def watermark_params(self):
+        """Query parameters asking the source for records at or after the watermark"""
+        param = self.config.get('watermark_param')
+        if param and self.watermark is not None:
+            return {param: self.watermark}
+        return {}
+
+    def records(self):
+        raise NotImplementedError
+
+    def batches(self, batch_size):
+        batch = []
+        for record in self.records():
+            batch.append(record)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+
+class HTTPExtractorMixin:
+    """Authenticated HTTP requests using the agency's API configuration"""
+
+    def _api_config(self):
+        if not hasattr(self, '_agency_api_config'):
+            self._agency_api_config = AgencyAPIConfig.objects.filter(
+                agency_id=self.data_source.agency_id
+            ).first()
+        return self._agency_api_config
+
+    def _headers(self):
+        headers = {'Accept': 'application/json', **self.config.get('headers', {})}
+        api_config = self._api_config()
+        if api_config is None:
+            return headers
+        if api_config.auth_type == 'basic':
+            credentials = f'{api_config.username}:{api_config.password}'.encode('utf-8')
+            headers['Authorization'] = 'Basic ' + base64.b64encode(credentials).decode('ascii')
+        elif api_config.auth_type in ('token', 'oauth') and api_config.api_key:
+            scheme = self.config.get('auth_scheme', 'Bearer')
+            headers['Authorization'] = f'{scheme} {api_config.api_key}'
+        elif api_config.api_key:
+            headers[self.config.get('api_key_header', 'X-API-Key')] = api_config.api_key
+        return headers
+
+    def _url(self):
+        api_config = self._api_config()
+        url = self.config.get('url') or (api_config.connection_url if api_config else '')
+        if not url:
+            raise ExtractorError("No url configured for this source")
+        return url
+
+    def _open(self, url, params=None):
+        if params:
+            separator = '&' if urllib.parse.urlsplit(url).query else '?'
+            url = f'{url}{separator}{urllib.parse.urlencode(params)}'
+        request = urllib.request.Request(url, headers=self._headers())
+        try:
+            return urllib.request.urlopen(request, timeout=self.config.get('timeout', REQUEST_TIMEOUT))
+        except OSError as exc:
+            raise ExtractorError(f"Request to {url} failed: {exc}")
+
+    def _get_json(self, url, params=None):
+        with self._open(url, params) as response:
+            try:
+                return json.load(response)
+            except ValueError as exc:
+                raise ExtractorError(f"Invalid JSON from {url}: {exc}")
+
+
+@register_extractor('api')
+class APIExtractor(HTTPExtractorMixin, Extractor):
+    """
+    Paginated JSON REST API. Configuration:
+
+    - ``url``: endpoint (defaults to the agency API config's connection_url)
+    - ``params``: extra query parameters
+    - ``records_path``: dotted path of the record list in each response
+    - ``pagination``: ``page`` (default), ``offset``, ``next`` or ``none``
+    - ``page_param`` / ``offset_param`` / ``page_size_param`` / ``page_size``
+    - ``next_path``: dotted path of the next page URL (``next`` pagination)
+    - ``watermark_param``: query parameter taking the watermark
+    """
+
+    def _page_records(self, payload):
+        records = record_path(payload, self.config.get('records_path', ''))
+        if records is None:
+            return []
+        if not isinstance(records, list):
+            raise ExtractorError("records_path doesn't point to a list")
+        return records
+
+    def records(self):
+        url = self._url()
+        params = {**self.config.get('params', {}), **self.watermark_params()}
+        pagination = self.config.get('pagination', 'page')
+        page_size = int(self.config.get('page_size', API_PAGE_SIZE))
+        if pagination in ('page', 'offset'):
+            params[self.config.get('page_size_param', 'page_size')] = page_size
+
+        page = 1
+        offset = 0
+        while url:
+            if pagination == 'page':
+                params[self.config.get('page_param', 'page')] = page
+            elif pagination == 'offset':
+                params[self.config.get('offset_param', 'offset')] = offset
+
+            payload = self._get_json(url, params)
+            records = self._page_records(payload)
+            yield from records
+
+            if pagination == 'next':
+                url, params = record_path(payload, self.config.get('next_path', 'next')), None
+            elif pagination in ('page', 'offset') and len(records) >= page_size:
+                page += 1
+                offset += len(records)
+            else:
+                url = None
+
+
+@register_extractor('feed')
+class FeedExtractor(HTTPExtractorMixin, Extractor):
+    """
+    Single-document feed at ``url``: JSON (``records_path`` as for APIs,
+    GeoJSON features are flattened to their properties plus longitude and
+    latitude) or CSV (``format: csv``), read as a stream. The watermark is
+    passed as ``watermark_param`` when configured.
+    """
+
+    def records(self):
+        response = self._open(self._url(), self.watermark_params())
+        with response:
+            if self.config.get('format') == 'csv':
+                yield from csv.DictReader(io.TextIOWrapper(response, encoding=self.config.get('encoding', 'utf-8')))
+                return
+            try:
+                payload = json.load(response)
+            except ValueError as exc:
+                raise ExtractorError(f"Invalid JSON feed: {exc}")
+
+        if isinstance(payload, dict) and payload.get('type') == 'FeatureCollection':
+            for feature in payload.get('features', []):
+                coordinates = (feature.get('geometry') or {}).get('coordinates') or [None, None]
+                yield {
+                    **(feature.get('properties') or {}),
+                    'longitude': coordinates[0],
+                    'latitude': coordinates[1]
+                }
+            return
+
+        records = record_path(payload, self.config.get('records_path', ''))
+        if not isinstance(records, list):
+            raise ExtractorError("records_path doesn't point to a list")
+        yield from records
+
+
+@register_extractor('database')
+class DatabaseExtractor(Extractor):
+    """
+    Rows of ``query`` on a PostgreSQL database at ``dsn``, read through a
+    server-side cursor so they arrive one batch at a time. The query can
+    refer to named ``params`` and to ``%(watermark)s``, which holds the
+    watermark or, on a first or full sync, ``initial_watermark``.
+    """
+
+    def batches(self, batch_size):
+        import psycopg2
+
+        dsn = self.config.get('dsn')
+        query = self.config.get('query')
+        if not dsn or not query:
+            raise ExtractorError("Database sources need a dsn and a query")
+
+        try:
+            connection = psycopg2.connect(dsn)
+        except psycopg2.Error as exc:
+            raise ExtractorError(f"Can't connect to the source database: {exc}")
+        try:
+            with connection.cursor(name=f'etl_job_{self.job.pk}') as cursor:
+                cursor.itersize = batch_size
+                params = dict(self.config.get('params') or {})
+                if '%(watermark)s' in query:
+                    params['watermark'] = self.watermark or self.config.get('initial_watermark', '-infinity')
+                cursor.execute(query, params or None)
+                columns = None
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if columns is None:
+                        columns = [column.name for column in cursor.description]
+                    if not rows:
+                        break
+                    yield [dict(zip(columns, row)) for row in rows]
+        except psycopg2.Error as exc:
+            raise ExtractorError(f"Source query failed: {exc}")
+        finally:
+            connection.close()
+
+
+@register_extractor('file')
+class FileExtractor(Extractor):
+    """
+    CSV/TSV files and Excel workbooks, plain, gzipped or zipped, at
+    ``path`` under settings.ETL_IMPORT_ROOT (or the job's ``path`` parameter).
+    Rows are streamed and only the columns the field mapping reads are
+    kept; see etl.files.iter_tables for the other options.
+    """
+
+    def _projection(self, header):
+        """(keys, itemgetter) picking the needed columns of a row, compiled once per table"""
+        wanted = None
+        if self.mapping is not None:
+            wanted = self.mapping.source_columns()
+            if self.data_source.watermark_field:
+                wanted.add(self.data_source.watermark_field.split('.', 1)[0])
+        columns = [
+            (name, index) for index, name in enumerate(header)
+            if name and (wanted is None or name in wanted)
+        ]
+        keys = [name for name, _ in columns]
+        indices = [index for _, index in columns]
+        if len(indices) == 1:
+            index = indices[0]
+            return keys, lambda row: (row[index],)
+        return keys, operator.itemgetter(*indices) if indices else (lambda row: ())
+
+    def batches(self, batch_size):
+        path = (self.job.parameters or {}).get('path') or self.config.get('path')
+        if not path:
+            raise ExtractorError("File sources need a path")
+        try:
+            resolved = resolve_import_path(path)
+        except ImportPathError as exc:
+            raise ExtractorError(str(exc))
+
+        try:
+            for name, header, rows in iter_tables(resolved, self.config):
+                keys, pick = self._projection(header)
+                width = len(header)
+                batch = []
+                for row in rows:
+                    if len(row) < width:
+                        row = (*row, *([None] * (width - len(row))))
+                    batch.append(dict(zip(keys, pick(row))))
+                    if len(batch) >= batch_size:
+                        yield batch
+                        batch = []
+                if batch:
+                    yield batch
+        except (OSError, csv.Error, zipfile.BadZipFile, FileFormatError) as exc:
+            raise ExtractorError(f"Can't read {path}: {exc}")
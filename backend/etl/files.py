@@ -0,0 +1,180 @@
+import csv
+import gzip
+import io
+import os
+import shutil
+import tempfile
+import zipfile
+from django.conf import settings
+
+# Leading bytes of the supported archive formats
+GZIP_MAGIC = b'\x1f\x8b'
+ZIP_MAGIC = b'PK\x03\x04'
+
+# Bytes copied at a time when an archived workbook is spooled to disk
+COPY_CHUNK_SIZE = 1024 * 1024
+
+# File formats read as delimited text, and their default delimiters
+DELIMITED_FORMATS = {'csv': ',', 'tsv': '\t', 'txt': ','}
+
+WORKBOOK_FORMATS = ('xlsx', 'xlsm')
+
+
+class FileFormatError(ValueError):
+    """Raised when a source file can't be read as a table"""
+
+
+class ImportPathError(ValueError):
+    """Raised when a source path points outside settings.ETL_IMPORT_ROOT"""
+
+
+def resolve_import_path(path):
+    """
+    Absolute path of a file source, given relative to settings.ETL_IMPORT_ROOT.
+    Absolute paths, '..' components and symlinks leading out of the import
+    root raise ImportPathError.
+    """
+    if not isinstance(path, str) or not path:
+        raise ImportPathError("The path must be a non-empty string")
+    if os.path.isabs(path) or os.path.splitdrive(path)[0]:
+        raise ImportPathError(f"{path}: paths are relative to the import directory")
+    if '..' in path.replace('\\', '/').split('/'):
+        raise ImportPathError(f"{path}: paths can't leave the import directory")
+
+    root = os.path.realpath(settings.ETL_IMPORT_ROOT)
+    resolved = os.path.realpath(os.path.join(root, path))
+    if os.path.commonpath([root, resolved]) != root:
+        raise ImportPathError(f"{path}: paths can't leave the import directory")
+    return resolved
+
+
+def _compression(path):
+    with open(path, 'rb') as handle:
+        head = handle.read(4)
+    if head.startswith(GZIP_MAGIC):
+        return 'gzip'
+    if head.startswith(ZIP_MAGIC) and _format(path) not in WORKBOOK_FORMATS:
+        # Workbooks are zip files themselves
+        return 'zip'
+    return None
+
+
+def _format(name, configured=None):
+    if configured:
+        return configured.lower()
+    if name.lower().endswith('.gz'):
+        name = name[:-3]
+    return os.path.splitext(name)[1].lower().lstrip('.')
+
+
+def _header(values):
+    return [str(value).strip() if value is not None else '' for value in values]
+
+
+def _delimited_table(handle, file_format, config):
+    reader = csv.reader(handle, delimiter=config.get('delimiter', DELIMITED_FORMATS[file_format]))
+    if config.get('columns'):
+        return list(config['columns']), reader
+    try:
+        return _header(next(reader)), reader
+    except StopIteration:
+        return [], iter(())
+
+
+def _workbook_tables(handle_or_path, config):
+    try:
+        import openpyxl
+    except ImportError:
+        raise FileFormatError("Reading Excel workbooks needs the openpyxl package")
+
+    workbook = openpyxl.load_workbook(handle_or_path, read_only=True, data_only=True)
+    try:
+        sheet_name = config.get('sheet')
+        if sheet_name and sheet_name not in workbook.sheetnames:
+            raise FileFormatError(f"Workbook has no sheet '{sheet_name}'")
+        sheet = workbook[sheet_name] if sheet_name else workbook.worksheets[0]
+        rows = sheet.iter_rows(values_only=True)
+        if config.get('columns'):
+            yield list(config['columns']), rows
+        else:
+            header = next(rows, None)
+            yield (_header(header), rows) if header is not None else ([], iter(()))
+    finally:
+        workbook.close()
+
+
+def _spooled(handle):
+    """Copy a non-seekable stream (archive member) to a temporary file, chunk by chunk"""
+    spool = tempfile.TemporaryFile()
+    shutil.copyfileobj(handle, spool, COPY_CHUNK_SIZE)
+    spool.seek(0)
+    return spool
+
+
+def _text_stream(raw, name, config):
+    """Text stream over a binary stream, gunzipping it when the name ends in .gz"""
+    if name.lower().endswith('.gz'):
+        raw = gzip.GzipFile(fileobj=raw)
+    return io.TextIOWrapper(raw, encoding=config.get('encoding', 'utf-8-sig'), newline='')
+
+
+def _member_tables(archive, config):
+    members = sorted(
+        (member for member in archive.infolist()
+         if not member.is_dir() and not member.filename.startswith('__MACOSX/')),
+        key=lambda member: member.filename
+    )
+    pattern = config.get('member')
+    for member in members:
+        if pattern and not member.filename.endswith(pattern):
+            continue
+        file_format = _format(member.filename, config.get('format'))
+        if file_format in DELIMITED_FORMATS:
+            with archive.open(member) as raw:
+                with _text_stream(raw, member.filename, config) as handle:
+                    yield (member.filename, *_delimited_table(handle, file_format, config))
+        elif file_format in WORKBOOK_FORMATS:
+            with archive.open(member) as raw, _spooled(raw) as spool:
+                for header, rows in _workbook_tables(spool, config):
+                    yield member.filename, header, rows
+
+
+def iter_tables(path, config=None):
+    """
+    Stream the tables of a source file as (name, header, rows) tuples. rows
+    is an iterator of row sequences, valid until the next table is
+    requested. Plain, gzipped and zipped CSV/TSV files and Excel workbooks
+    are supported. Archives are detected from their content, and a zip may
+    hold several tables. Nothing is read into memory as a whole.
+
+    Configuration: ``format`` (instead of the file extension), ``encoding``,
+    ``delimiter``, ``columns`` (for files without a header row), ``sheet``
+    and ``member`` (suffix of the archive members to read).
+    """
+    config = config or {}
+    name = os.path.basename(path)
+    compression = _compression(path)
+
+    if compression == 'zip':
+        with zipfile.ZipFile(path) as archive:
+            yield from _member_tables(archive, config)
+        return
+
+    file_format = _format(name, config.get('format'))
+    if file_format in DELIMITED_FORMATS:
+        if compression == 'gzip':
+            handle = gzip.open(path, 'rt', encoding=config.get('encoding', 'utf-8-sig'), newline='')
+        else:
+            handle = open(path, encoding=config.get('encoding', 'utf-8-sig'), newline='')
+        with handle:
+            yield (name, *_delimited_table(handle, file_format, config))
+    elif file_format in WORKBOOK_FORMATS:
+        if compression == 'gzip':
+            with gzip.open(path, 'rb') as raw, _spooled(raw) as spool:
+                for header, rows in _workbook_tables(spool, config):
+                    yield name, header, rows
+        else:
+            for header, rows in _workbook_tables(path, config):
+                yield name, header, rows
+    else:
+        raise FileFormatError(f"Unsupported file format '{file_format}'")
@@ -0,0 +1,242 @@
+import hashlib
+import json
+from collections import Counter, namedtuple
+from django.db import connection, transaction
+from django.utils import timezone
+from crime_analysis.conditional import CRIMES_SCOPE, bump_data_version
+from crimes.cells import GRID_RESOLUTIONS, grid_field
+from crimes.gridcache import invalidate_all_grids
+from crimes.models import Crime, CrimeAttribute, CrimeIncidentKey
+from crimes.rollups import TRACKED_FIELDS, apply_rollup_deltas, rollup_key
+
+# Rows per INSERT ... ON CONFLICT statement
+UPSERT_BATCH_SIZE = 1000
+
+# Columns written by the upsert; ids of new incidents are claimed with their key
+UPSERT_COLUMNS = (
+    'id', 'incident_id', 'crime_type_id', 'description', 'occurred_at', 'reported_at', 'agency_id',
+    'data_source', 'location', 'block_address', 'zip_code', 'city', 'state', 'country',
+    'verification_status', *(grid_field(resolution) for resolution in GRID_RESOLUTIONS),
+    'content_hash', 'created_at', 'updated_at', 'is_active',
+)
+
+# Columns an update leaves alone: the key, and the review status and soft
+# delete flag, which are decided here rather than by the source
+KEEP_ON_UPDATE = ('id', 'incident_id', 'occurred_at', 'created_at', 'verification_status', 'is_active')
+
+UPDATE_COLUMNS = tuple(column for column in UPSERT_COLUMNS if column not in KEEP_ON_UPDATE)
+
+# Incident ids are claimed in the (unpartitioned) incident key table, whose
+# primary key is incident_id, before any crime row is written. A concurrent
+# claim of the same id waits for the other transaction and then finds it taken.
+CLAIM_SQL = """
+    INSERT INTO {keys} (incident_id, crime_id, occurred_at)
+    SELECT claimed.incident_id, nextval(pg_get_serial_sequence(%s, 'id')), claimed.occurred_at
+    FROM (VALUES {values}) AS claimed (incident_id, occurred_at)
+    ON CONFLICT (incident_id) DO NOTHING
+    RETURNING incident_id, crime_id
+"""
+
+UPSERT_SQL = """
+    INSERT INTO {table} ({columns}) VALUES {values}
+    ON CONFLICT (id, occurred_at) DO UPDATE SET {updates}
+    WHERE {table}.content_hash IS DISTINCT FROM EXCLUDED.content_hash
+    RETURNING id, incident_id, (xmax = 0)
+"""
+
+LoadResult = namedtuple('LoadResult', ['created', 'updated', 'skipped'])
+
+
+def content_hash(row):
+    """Digest of a transformed row (attributes included)"""
+    document = json.dumps(row, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.md5(document.encode('utf-8')).hexdigest()
+
+
+def _build(row, digest, now):
+    data = dict(row)
+    data.pop('attributes', None)
+    longitude = data.pop('longitude')
+    latitude = data.pop('latitude')
+    crime = Crime(**data, content_hash=digest, created_at=now, updated_at=now)
+    crime.set_location(longitude, latitude)
+    return crime
+
+
+def _claim(rows):
+    """
+    Claim the incident ids of rows ({incident_id: row}) that have no key
+    yet. Returns {incident_id: crime id reserved for the new incident}.
+    """
+    table = Crime._meta.db_table
+    claimed = {}
+    incident_ids = sorted(rows)
+    with connection.cursor() as cursor:
+        for start in range(0, len(incident_ids), UPSERT_BATCH_SIZE):
+            batch = incident_ids[start:start + UPSERT_BATCH_SIZE]
+            cursor.execute(
+                CLAIM_SQL.format(
+                    keys=CrimeIncidentKey._meta.db_table,
+                    values=', '.join(['(%s, %s)'] * len(batch))
+                ),
+                [table, *(value for incident_id in batch for value in (incident_id, rows[incident_id]['occurred_at']))]
+            )
+            claimed.update(cursor.fetchall())
+    return claimed
+
+
+def _lock_keys(rows):
+    """
+    Claim new incident ids and lock the keys of the existing ones, in
+    incident_id order. Returns ({incident_id: reserved crime id},
+    {incident_id: locked CrimeIncidentKey}).
+    """
+    claimed = {}
+    keys = {}
+    pending = dict(rows)
+    while pending:
+        claimed.update(_claim(pending))
+        existing = sorted(set(pending) - set(claimed))
+        keys.update(
+            (key.incident_id, key)
+            for key in CrimeIncidentKey.objects.select_for_update().filter(
+                incident_id__in=existing
+            ).order_by('incident_id')
+        )
+        # Keys deleted between the claim and the lock are claimed again
+        pending = {incident_id: rows[incident_id] for incident_id in existing if incident_id not in keys}
+    return claimed, keys
+
+
+def _upsert(crimes):
+    """Upsert crimes on their key; returns {incident_id: (id, inserted)} for the rows written"""
+    table = Crime._meta.db_table
+    placeholder = '(' + ', '.join(
+        'ST_GeogFromText(%s)' if column == 'location' else '%s' for column in UPSERT_COLUMNS
+    ) + ')'
+    written = {}
+    with connection.cursor() as cursor:
+        for start in range(0, len(crimes), UPSERT_BATCH_SIZE):
+            batch = crimes[start:start + UPSERT_BATCH_SIZE]
+            cursor.execute(
+                UPSERT_SQL.format(
+                    table=table,
+                    columns=', '.join(UPSERT_COLUMNS),
+                    values=', '.join([placeholder] * len(batch)),
+                    updates=', '.join(f'{column} = EXCLUDED.{column}' for column in UPDATE_COLUMNS)
+                ),
+                [
+                    crime.location.ewkt if column == 'location' else getattr(crime, column)
+                    for crime in batch
+                    for column in UPSERT_COLUMNS
+                ]
+            )
+            for pk, incident_id, inserted in cursor.fetchall():
+                written[incident_id] = (pk, inserted)
+    return written
+
+
+def load_rows(rows, batch_size=UPSERT_BATCH_SIZE):
+    """
+    Idempotently load a batch of transformed rows (see etl.transforms),
+    keyed on incident_id, in one transaction:
+
+    - incident ids are claimed with INSERT ... ON CONFLICT (incident_id)
+      on the incident key table, and the keys of known incidents are
+      locked, so concurrent loads of the same incident (new or not, at any
+      occurred_at) take turns instead of both inserting it
+    - rows whose content hash matches the stored incident are skipped
+      without a write, as are earlier copies of a row repeated in the batch
+    - the rest go through INSERT ... ON CONFLICT (id, occurred_at) DO
+      UPDATE, which also only rewrites rows whose hash changed
+    - incidents whose occurred_at changed at the source are updated in
+      place, which moves them to the right partition
+
+    Attributes of written incidents are replaced, and the rollups, cached
+    map grids and data version are kept in step. Re-running a load is safe
+    and costs one claim and two SELECTs per batch. Returns exact
+    LoadResult counts.
+    """
+    latest = {}
+    for row in rows:
+        latest[row['incident_id']] = row
+    skipped = len(rows) - len(latest)
+
+    now = timezone.now()
+    with transaction.atomic():
+        claimed, keys = _lock_keys(latest)
+        crime_ids = {**{incident_id: key.crime_id for incident_id, key in keys.items()}, **claimed}
+        existing = {
+            stored['incident_id']: stored
+            for stored in Crime.all_objects.select_for_update().filter(
+                pk__in=[key.crime_id for key in keys.values()],
+                occurred_at__in=list({key.occurred_at for key in keys.values()})
+            ).order_by('pk').values('id', 'incident_id', 'content_hash', 'location', *TRACKED_FIELDS)
+        }
+
+        upserts = []
+        moved = []
+        attributes = {}
+        for incident_id, row in latest.items():
+            digest = content_hash(row)
+            stored = existing.get(incident_id)
+            if stored is not None and stored['content_hash'] == digest:
+                skipped += 1
+                continue
+            crime = _build(row, digest, now)
+            crime.id = crime_ids[incident_id]
+            attributes[incident_id] = row.get('attributes', [])
+            if stored is not None and stored['occurred_at'] != crime.occurred_at:
+                moved.append((stored, crime))
+            else:
+                upserts.append(crime)
+
+        written = _upsert(upserts)
+        for stored, crime in moved:
+            Crime.all_objects.filter(pk=stored['id'], occurred_at=stored['occurred_at']).update(
+                occurred_at=crime.occurred_at,
+                **{column: getattr(crime, column) for column in UPDATE_COLUMNS if column != 'updated_at'},
+                updated_at=now
+            )
+            written[crime.incident_id] = (stored['id'], False)
+
+        created = [incident_id for incident_id, (_, inserted) in written.items() if inserted]
+        updated = [incident_id for incident_id, (_, inserted) in written.items() if not inserted]
+        # Rows the conflict clause left alone had an unchanged hash after all
+        skipped += len(upserts) + len(moved) - len(written)
+
+        ids = {incident_id: pk for incident_id, (pk, _) in written.items()}
+        CrimeAttribute.objects.filter(crime_id__in=[ids[incident_id] for incident_id in updated]).delete()
+        CrimeAttribute.objects.bulk_create(
+            [
+                CrimeAttribute(crime_id=ids[incident_id], **attribute_data)
+                for incident_id in written
+                for attribute_data in attributes[incident_id]
+            ],
+            batch_size=batch_size
+        )
+
+        # Upserts don't send signals, so derived data is maintained here
+        crimes = {crime.incident_id: crime for crime in upserts}
+        crimes.update((crime.incident_id, crime) for _, crime in moved)
+        deltas = Counter()
+        points = []
+        for incident_id in written:
+            crime = crimes[incident_id]
+            stored = existing.get(incident_id)
+            values = {field: getattr(crime, field) for field in TRACKED_FIELDS}
+            if stored is not None:
+                values['is_active'] = stored['is_active']
+                values['verification_status'] = stored['verification_status']
+                if stored['is_active']:
+                    deltas[rollup_key(stored)] -= 1
+                points.append(stored['location'])
+            if values['is_active']:
+                deltas[rollup_key(values)] += 1
+            points.append(crime.location)
+        if written:
+            apply_rollup_deltas(deltas)
+            transaction.on_commit(lambda: invalidate_all_grids(points))
+            bump_data_version(CRIMES_SCOPE)
+
+    return LoadResult(created=len(created), updated=len(updated), skipped=skipped)
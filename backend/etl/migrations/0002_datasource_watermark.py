@@ -0,0 +1,28 @@
+# Generated by Django 5.1.6 on 2026-10-18 16:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('etl', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='datasource',
+            name='last_synced_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='datasource',
+            name='watermark',
+            field=models.CharField(blank=True, help_text='Highest watermark_field value of the last successful sync', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='datasource',
+            name='watermark_field',
+            field=models.CharField(blank=True, help_text="Source field holding each record's modification time or cursor", max_length=100),
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from agencies.models import Agency
+from crimes.dimensions import dimensions
 
 class DataSource(models.Model):
     """Model for tracking external data sources from agencies"""
@@ -43,12 +44,20 @@ class DataSource(models.Model):
     cron_expression = models.CharField(max_length=100, blank=True,
                                      help_text="Cron expression for custom scheduling")
     
+    # Incremental sync: the highest watermark_field value loaded so far
+    watermark_field = models.CharField(max_length=100, blank=True,
+                                       help_text="Source field holding each record's modification time or cursor")
+    watermark = models.CharField(max_length=255, blank=True,
+                                 help_text="Highest watermark_field value of the last successful sync")
+    last_synced_at = models.DateTimeField(null=True, blank=True)
+    
     # Metadata
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
-        return f"{self.name} - {self.agency.name}"
+        agency = dimensions.agency(self.agency_id)
+        return f"{self.name} - {agency.name if agency else self.agency.name}"
 
 class ETLJob(models.Model):
     """Model for tracking individual ETL jobs"""
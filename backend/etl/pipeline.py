@@ -0,0 +1,152 @@
+import logging
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from agencies.models import AgencyAPIConfig
+from .extractors import ExtractorError, get_extractor
+from .loader import load_rows
+from .models import DataSource, ETLJob, ETLJobLog
+from .transforms import FieldMapping, TransformError
+from .validation import RuleSet, ValidationRuleError
+from .watermarks import WatermarkTracker
+
+logger = logging.getLogger(__name__)
+
+# Source records extracted, transformed and loaded per step
+PIPELINE_BATCH_SIZE = 5000
+
+# Rejected or warned-about records logged individually per job; the rest are only counted
+MAX_LOGGED_FAILURES = 1000
+
+
+def _log(job, level, message, context=None, source_record_id=''):
+    ETLJobLog.objects.create(
+        job=job, level=level, message=message, context=context, source_record_id=source_record_id
+    )
+
+
+def _finish(job, status, message='', details=None):
+    ETLJob.objects.filter(pk=job.pk).update(
+        status=status,
+        end_time=timezone.now(),
+        error_message=message,
+        error_details=details,
+        updated_at=timezone.now()
+    )
+
+
+def _is_canceled(job):
+    return ETLJob.objects.filter(pk=job.pk, status='canceled').exists()
+
+
+def run_job(job_pk, batch_size=PIPELINE_BATCH_SIZE):
+    """
+    Run a scheduled ETL job end to end: stream batches of records from the
+    source's extractor, transform them with the compiled field_mapping,
+    check them against the source's validation rules and load them, updating the job's records_* counters after every batch.
+    Memory use is bounded by the batch size, whatever the source size.
+
+    Returns the final job status. A job that isn't scheduled any more
+    (already picked up or canceled) is left alone.
+    """
+    claimed = ETLJob.objects.filter(pk=job_pk, status='scheduled').update(
+        status='running', start_time=timezone.now(), updated_at=timezone.now()
+    )
+    job = ETLJob.objects.select_related('data_source').get(pk=job_pk)
+    if not claimed:
+        return job.status
+
+    data_source = job.data_source
+    _log(job, 'info', f"Sync of {data_source.name} started")
+    logged_failures = 0
+    try:
+        mapping = FieldMapping(data_source)
+        rules = RuleSet.for_source(data_source)
+        watermark = WatermarkTracker(data_source, full_resync=(job.parameters or {}).get('full_resync', False))
+        extractor = get_extractor(data_source, job, mapping)
+        for records in extractor.batches(batch_size):
+            if _is_canceled(job):
+                _log(job, 'warning', "Sync canceled")
+                ETLJob.objects.filter(pk=job.pk).update(end_time=timezone.now())
+                return 'canceled'
+
+            records, below_watermark = watermark.filter(records)
+            rows, failures = mapping.transform_batch(records)
+            validated = rules.apply(rows)
+            result = load_rows(validated.rows)
+
+            # Only loaded records move the watermark; failed ones hold it
+            # back so that they're read again by the next sync. Rows come
+            # out of transform_batch in the order of their records.
+            failed = {id(record) for record, _ in failures}
+            sources = dict(zip(map(id, rows), (record for record in records if id(record) not in failed)))
+            watermark.hold([record for record, _ in failures])
+            watermark.hold([sources[id(row)] for row, _ in validated.rejected])
+            watermark.advance([sources[id(row)] for row in validated.rows])
+
+            # Rejected and warned-about records, in the log budget's limit
+            entries = [
+                ('error', f"Record rejected: {error}", {'field': error.field}, mapping.record_id(record))
+                for record, error in failures
+            ] + [
+                ('error', f"Record rejected: {message}", None, row['incident_id'])
+                for row, message in validated.rejected
+            ] + [
+                ('warning', message, None, row['incident_id'])
+                for row, message in validated.warnings
+            ]
+            logs = [
+                ETLJobLog(
+                    job=job, level=level, message=message, context=context,
+                    source_record_id=str(record_id)[:255]
+                )
+                for level, message, context, record_id in entries[:max(MAX_LOGGED_FAILURES - logged_failures, 0)]
+            ]
+            ETLJobLog.objects.bulk_create(logs)
+            logged_failures += len(logs)
+
+            ETLJob.objects.filter(pk=job.pk).update(
+                records_processed=F('records_processed') + len(records) + below_watermark,
+                records_created=F('records_created') + result.created,
+                records_updated=F('records_updated') + result.updated,
+                records_skipped=F('records_skipped') + result.skipped + below_watermark,
+                records_failed=F('records_failed') + len(failures) + len(validated.rejected),
+                updated_at=timezone.now()
+            )
+    except (ExtractorError, TransformError, ValidationRuleError) as exc:
+        _log(job, 'error', f"Sync failed: {exc}")
+        _finish(job, 'failed', str(exc))
+        return 'failed'
+    except Exception as exc:
+        logger.exception("ETL job %s failed", job.job_id)
+        _log(job, 'critical', f"Sync failed: {exc}")
+        _finish(job, 'failed', str(exc), {'type': type(exc).__name__})
+        return 'failed'
+
+    return _complete(job, data_source, watermark)
+
+
+def _complete(job, data_source, watermark):
+    """
+    Mark the job completed and advance the source's watermark in the same
+    transaction, so a watermark only ever covers records of a finished load.
+    A job canceled during its last batch doesn't advance it.
+    """
+    now = timezone.now()
+    new_watermark = watermark.new_watermark()
+    with transaction.atomic():
+        completed = ETLJob.objects.filter(pk=job.pk, status='running').update(
+            status='completed', end_time=now, updated_at=now,
+            parameters={**(job.parameters or {}), 'watermark_from': data_source.watermark,
+                        'watermark_to': new_watermark or data_source.watermark}
+        )
+        if not completed:
+            return ETLJob.objects.values_list('status', flat=True).get(pk=job.pk)
+
+        updates = {'last_synced_at': now, 'updated_at': now}
+        if new_watermark is not None:
+            updates['watermark'] = new_watermark[:255]
+        DataSource.objects.filter(pk=data_source.pk).update(**updates)
+        AgencyAPIConfig.objects.filter(agency_id=data_source.agency_id).update(last_sync=now)
+        _log(job, 'info', f"Sync of {data_source.name} completed")
+    return 'completed'
@@ -1,12 +1,28 @@
 from rest_framework import serializers
 from .models import DataSource, ETLJob, DataValidationRule, ETLJobLog
+from .files import ImportPathError, resolve_import_path
+from .validation import CompiledRule, ValidationRuleError
+
+
+def validate_import_path(value):
+    """Reject a 'path' entry of a configuration or parameters object outside the import directory"""
+    if isinstance(value, dict) and 'path' in value:
+        try:
+            resolve_import_path(value['path'])
+        except ImportPathError as exc:
+            raise serializers.ValidationError(str(exc))
+    return value
 
 class DataSourceSerializer(serializers.ModelSerializer):
     """Serializer for DataSource model"""
     class Meta:
         model = DataSource
         fields = '__all__'
-        read_only_fields = ['created_at', 'updated_at']
+        # The watermark only moves with successful syncs (reset it with a full resync)
+        read_only_fields = ['watermark', 'last_synced_at', 'created_at', 'updated_at']
+
+    def validate_configuration(self, value):
+        return validate_import_path(value)
 
 class ETLJobSerializer(serializers.ModelSerializer):
     """Serializer for ETLJob model"""
@@ -15,6 +31,9 @@ class ETLJobSerializer(serializers.ModelSerializer):
         fields = '__all__'
         read_only_fields = ['created_at', 'updated_at']
 
+    def validate_parameters(self, value):
+        return validate_import_path(value)
+
 class DataValidationRuleSerializer(serializers.ModelSerializer):
     """Serializer for DataValidationRule model"""
     class Meta:
@@ -22,6 +41,18 @@ class DataValidationRuleSerializer(serializers.ModelSerializer):
         fields = '__all__'
         read_only_fields = ['created_at', 'updated_at']
 
+    def validate(self, attrs):
+        """Compile the rule so configuration mistakes surface here rather than in a sync"""
+        rule = DataValidationRule(**{
+            field: attrs.get(field, getattr(self.instance, field, None))
+            for field in ('name', 'rule_type', 'field_name', 'configuration', 'error_action')
+        })
+        try:
+            CompiledRule(rule)
+        except ValidationRuleError as exc:
+            raise serializers.ValidationError({'configuration': str(exc)})
+        return attrs
+
 class ETLJobLogSerializer(serializers.ModelSerializer):
     """Serializer for ETLJobLog model"""
     class Meta:
@@ -0,0 +1,8 @@
+from celery import shared_task
+from .pipeline import run_job
+
+
+@shared_task(name='etl.run_etl_job')
+def run_etl_job(job_pk):
+    """Run an ETL job on a worker"""
+    return run_job(job_pk)
@@ -1,3 +1,269 @@
-from django.test import TestCase
+import os
+import random
+import re
+import tempfile
+import time
+import numpy as np
+from unittest import skipUnless
+from django.test import SimpleTestCase, TestCase, override_settings, tag
+from crimes.models import CrimeCategory, CrimeType
+from crimes.tests import make_agency
+from .files import ImportPathError, resolve_import_path
+from .models import DataSource, DataValidationRule
+from .pipeline import PIPELINE_BATCH_SIZE
+from .serializers import DataSourceSerializer, DataValidationRuleSerializer, ETLJobSerializer
+from .validation import FIELD_ALIASES, CompiledRule, RuleSet, ValidationRuleError, reference_keys
 
-# Create your tests here.
+CITIES = ['Nairobi', 'Mombasa', 'Kisumu', 'Nakuru']
+
+
+def make_rule(rule_type, field_name, **configuration):
+    return DataValidationRule(
+        name=f'{rule_type} {field_name}',
+        rule_type=rule_type,
+        field_name=field_name,
+        configuration=configuration,
+        error_action='reject'
+    )
+
+
+def make_rows(count, crime_type_ids=(1,), seed=1):
+    """Transformed rows with a few percent of blank, malformed, out of range and repeated values"""
+    rng = random.Random(seed)
+    zip_codes = [f'{rng.randint(0, 99999):05d}' for _ in range(300)]
+    streets = [f'{rng.randint(1, 999)} Block of {rng.choice("ABCDEFGH")} Street' for _ in range(2000)]
+    rows = []
+    for index in range(count):
+        rows.append({
+            'incident_id': f'INC-{rng.randint(0, count * 50):08d}',
+            'crime_type_id': rng.choice(crime_type_ids),
+            'block_address': '' if rng.random() < 0.01 else rng.choice(streets),
+            'zip_code': 'n/a' if rng.random() < 0.01 else rng.choice(zip_codes),
+            'city': rng.choice(CITIES) if rng.random() > 0.01 else 'Atlantis',
+            'latitude': rng.uniform(-4.7, 4.7) if rng.random() > 0.01 else 45.0,
+            'longitude': rng.uniform(33.9, 41.9),
+        })
+    return rows
+
+
+def is_upper(values):
+    """A registered custom validation function"""
+    return np.fromiter((str(value).isupper() for value in values), dtype=bool, count=len(values))
+
+
+def validate_per_row(rules, rows, seen):
+    """
+    The straightforward engine the vectorized one replaces: a Python loop
+    per record per rule. Patterns, allowed values and reference key sets
+    are prepared once per batch, as a tuned per-row engine would.
+    """
+    prepared = {}
+    for rule in rules:
+        config = rule.configuration
+        if rule.rule_type == 'format':
+            prepared[rule.name] = re.compile(config['pattern'])
+        elif rule.rule_type == 'enum':
+            prepared[rule.name] = {allowed.lower() for allowed in config['values']}
+        elif rule.rule_type == 'reference':
+            prepared[rule.name] = reference_keys(config['model'], config.get('field', 'pk'))
+
+    kept = []
+    for row in rows:
+        for rule in rules:
+            value = row.get(FIELD_ALIASES.get(rule.field_name, rule.field_name))
+            config = rule.configuration
+            if rule.rule_type == 'required':
+                invalid = value is None or not str(value).strip()
+            elif value is None:
+                invalid = False
+            elif rule.rule_type == 'format':
+                invalid = prepared[rule.name].fullmatch(str(value)) is None
+            elif rule.rule_type == 'range':
+                try:
+                    invalid = not config['min'] <= float(value) <= config['max']
+                except (TypeError, ValueError):
+                    invalid = True
+            elif rule.rule_type == 'enum':
+                invalid = str(value).lower() not in prepared[rule.name]
+            elif rule.rule_type == 'reference':
+                invalid = str(value) not in prepared[rule.name]
+            elif rule.rule_type == 'unique':
+                invalid = value in seen.setdefault(rule.field_name, set())
+            if invalid:
+                break
+        else:
+            for rule in rules:
+                if rule.rule_type == 'unique':
+                    seen[rule.field_name].add(row.get(FIELD_ALIASES.get(rule.field_name, rule.field_name)))
+            kept.append(row)
+    return kept
+
+
+def benchmark(cls):
+    """
+    Wall-clock comparisons are noisy on shared machines, so benchmarks only
+    run on request: RUN_BENCHMARKS=1 python manage.py test --tag benchmark
+    """
+    return tag('benchmark')(skipUnless(os.environ.get('RUN_BENCHMARKS'), 'Set RUN_BENCHMARKS=1 to run')(cls))
+
+
+def in_memory_rules():
+    return [
+        make_rule('required', 'block_address'),
+        make_rule('required', 'city'),
+        make_rule('format', 'zip_code', pattern=r'\d{5}'),
+        make_rule('range', 'latitude', min=-4.7, max=4.7),
+        make_rule('range', 'longitude', min=33.9, max=41.9),
+        make_rule('enum', 'city', values=CITIES),
+        make_rule('unique', 'incident_id'),
+    ]
+
+
+def batched(rows):
+    return [rows[start:start + PIPELINE_BATCH_SIZE] for start in range(0, len(rows), PIPELINE_BATCH_SIZE)]
+
+
+class ValidationBenchmarkMixin:
+    """Best-of-three timings of both engines over the same batches"""
+
+    def compare(self, rules, batches):
+        per_row_seconds = vectorized_seconds = float('inf')
+        for _ in range(3):
+            seen = {}
+            started = time.perf_counter()
+            expected = [row for batch in batches for row in validate_per_row(rules, batch, seen)]
+            per_row_seconds = min(per_row_seconds, time.perf_counter() - started)
+
+            rule_set = RuleSet(rules)
+            started = time.perf_counter()
+            kept = [row for batch in batches for row in rule_set.apply(batch).rows]
+            vectorized_seconds = min(vectorized_seconds, time.perf_counter() - started)
+
+            self.assertEqual(kept, expected)
+        return per_row_seconds / vectorized_seconds
+
+
+class RuleSetTests(SimpleTestCase):
+
+    def test_unique_values_of_rejected_rows_stay_available(self):
+        rule_set = RuleSet([
+            make_rule('unique', 'incident_id'),
+            make_rule('required', 'block_address'),
+        ])
+        result = rule_set.apply([
+            {'incident_id': 'A', 'block_address': ''},
+            {'incident_id': 'A', 'block_address': '1 Main Street'},
+            {'incident_id': None, 'block_address': '2 Main Street'},
+        ])
+        self.assertEqual([row['block_address'] for row in result.rows], ['1 Main Street', '2 Main Street'])
+        self.assertEqual(len(result.rejected), 1)
+
+        result = rule_set.apply([
+            {'incident_id': 'A', 'block_address': '3 Main Street'},
+            {'incident_id': 'B', 'block_address': '4 Main Street'},
+        ])
+        self.assertEqual([row['incident_id'] for row in result.rows], ['B'])
+
+    def test_matches_per_row_checks(self):
+        rules = in_memory_rules()
+        rule_set = RuleSet(rules)
+        seen = {}
+        for batch in batched(make_rows(PIPELINE_BATCH_SIZE * 2)):
+            self.assertEqual(rule_set.apply(batch).rows, validate_per_row(rules, batch, seen))
+
+    @override_settings(ETL_CUSTOM_VALIDATORS={'is_upper': 'etl.tests.is_upper'})
+    def test_custom_rules_only_name_registered_functions(self):
+        rule_set = RuleSet([make_rule('custom', 'city', function='is_upper')])
+        self.assertEqual(len(rule_set.apply([{'city': 'NAIROBI'}, {'city': 'Nairobi'}]).rows), 1)
+
+        for function in ('os.system', 'etl.tests.is_upper', None):
+            with self.assertRaises(ValidationRuleError):
+                CompiledRule(make_rule('custom', 'city', function=function))
+
+
+class ImportPathTests(SimpleTestCase):
+
+    def setUp(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        self.root = os.path.realpath(root.name)
+        os.mkdir(os.path.join(self.root, 'incidents'))
+        os.symlink('/etc', os.path.join(self.root, 'etc'))
+        settings = self.settings(ETL_IMPORT_ROOT=root.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_paths_resolve_under_the_import_root(self):
+        self.assertEqual(
+            resolve_import_path('incidents/2024.csv'),
+            os.path.join(self.root, 'incidents', '2024.csv')
+        )
+
+    def test_paths_outside_the_import_root_are_rejected(self):
+        for path in ('/etc/passwd', '../settings.py', 'incidents/../../settings.py', 'etc/passwd', '', None):
+            with self.subTest(path=path), self.assertRaises(ImportPathError):
+                resolve_import_path(path)
+
+
+class SerializerTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data_source = DataSource.objects.create(agency=make_agency(), name='Incidents', source_type='file')
+
+    def test_rejects_unregistered_custom_functions(self):
+        serializer = DataValidationRuleSerializer(data={
+            'data_source': self.data_source.pk,
+            'name': 'Shell out',
+            'rule_type': 'custom',
+            'field_name': 'city',
+            'configuration': {'function': 'os.system'},
+            'error_action': 'reject',
+        })
+        self.assertFalse(serializer.is_valid())
+        self.assertIn('configuration', serializer.errors)
+
+    def test_rejects_file_paths_outside_the_import_root(self):
+        serializer = DataSourceSerializer(self.data_source, data={'configuration': {'path': '/etc/passwd'}}, partial=True)
+        self.assertFalse(serializer.is_valid())
+        self.assertIn('configuration', serializer.errors)
+
+        serializer = ETLJobSerializer(data={
+            'data_source': self.data_source.pk,
+            'job_id': 'import',
+            'parameters': {'path': '../crime_analysis/settings.py'},
+        })
+        self.assertFalse(serializer.is_valid())
+        self.assertIn('parameters', serializer.errors)
+
+
+@benchmark
+class InMemoryRuleBenchmark(ValidationBenchmarkMixin, SimpleTestCase):
+
+    def test_faster_than_per_row_checks(self):
+        # Building columns out of row dicts bounds the gain over a tuned loop
+        self.assertGreaterEqual(self.compare(in_memory_rules(), batched(make_rows(PIPELINE_BATCH_SIZE * 10))), 2)
+
+
+@benchmark
+class ReferenceRuleBenchmark(ValidationBenchmarkMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        category = CrimeCategory.objects.create(name='Property')
+        cls.crime_type_ids = [
+            CrimeType.objects.create(category=category, name=f'Type {index}', severity_level=1).pk
+            for index in range(40)
+        ]
+
+    def test_faster_than_per_row_checks(self):
+        rules = [
+            make_rule('required', 'block_address'),
+            make_rule('format', 'zip_code', pattern=r'\d{5}'),
+            make_rule('range', 'latitude', min=-4.7, max=4.7),
+            make_rule('enum', 'city', values=CITIES),
+            make_rule('reference', 'crime_type', model='crimes.CrimeType'),
+            make_rule('unique', 'incident_id'),
+        ]
+        rows = make_rows(PIPELINE_BATCH_SIZE * 10, crime_type_ids=[*self.crime_type_ids, 0])
+        self.assertGreaterEqual(self.compare(rules, batched(rows)), 2)
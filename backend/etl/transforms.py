@@ -0,0 +1,233 @@
+from datetime import datetime
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from crimes.dimensions import dimensions
+from crimes.models import Crime
+from .extractors import record_path
+
+# Crime fields a field_mapping can fill, and the converter each value goes through
+CRIME_FIELDS = {
+    'incident_id': 'string',
+    'crime_type': 'crime_type',
+    'description': 'text',
+    'occurred_at': 'datetime',
+    'reported_at': 'datetime',
+    'longitude': 'float',
+    'latitude': 'float',
+    'block_address': 'string',
+    'zip_code': 'string',
+    'city': 'string',
+    'state': 'string',
+    'country': 'string',
+    'verification_status': 'string',
+}
+
+# Fields a transformed record can't do without
+REQUIRED_FIELDS = ('incident_id', 'crime_type', 'occurred_at', 'longitude', 'latitude', 'block_address', 'city', 'state')
+
+VERIFICATION_STATUSES = {value for value, _ in Crime.VERIFICATION_STATUS}
+
+# Maximum lengths of the string columns, from the Crime model
+MAX_LENGTHS = {
+    name: Crime._meta.get_field(name).max_length
+    for name, kind in CRIME_FIELDS.items()
+    if kind == 'string'
+}
+
+
+class TransformError(ValueError):
+    """Raised when a source record can't be turned into an incident"""
+
+    def __init__(self, field, message):
+        super().__init__(f"{field}: {message}")
+        self.field = field
+
+
+def _is_blank(value):
+    return value is None or (isinstance(value, str) and not value.strip())
+
+
+def _json_value(value):
+    """Attribute values as JSON types (database sources return dates, decimals...)"""
+    if value is None or isinstance(value, (str, int, float, bool, list, dict)):
+        return value
+    return str(value)
+
+
+class FieldMapping:
+    """
+    DataSource.field_mapping compiled once per job.
+
+    The mapping has a key per Crime field (see CRIME_FIELDS). A value is
+    either the (dotted) path of the source field or a spec dict with:
+
+    - ``source``: path of the source field
+    - ``value``: a constant instead of a source field
+    - ``default``: used when the source value is blank
+    - ``map``: dictionary translating source values (e.g. offense codes to
+      crime type names or ids)
+    - ``format``: strptime format for datetimes (ISO 8601 otherwise)
+
+    An ``attributes`` key lists source paths (or maps attribute names to
+    source paths) stored as CrimeAttributes. Crime types can be given as
+    ids, names or "Category/Name".
+    """
+
+    def __init__(self, data_source):
+        self.data_source = data_source
+        self.agency_id = data_source.agency_id
+        self.source_name = data_source.name[:Crime._meta.get_field('data_source').max_length]
+        mapping = data_source.field_mapping or {}
+
+        unknown = set(mapping) - set(CRIME_FIELDS) - {'attributes'}
+        if unknown:
+            raise TransformError('field_mapping', f"unknown fields {', '.join(sorted(unknown))}")
+        missing = [name for name in REQUIRED_FIELDS if name not in mapping]
+        if missing:
+            raise TransformError('field_mapping', f"no mapping for {', '.join(missing)}")
+
+        self.source_paths = {
+            spec.get('source') if isinstance(spec, dict) else spec
+            for name, spec in mapping.items() if name != 'attributes'
+        }
+        self.fields = [self._compile(name, spec) for name, spec in mapping.items() if name != 'attributes']
+        attributes = mapping.get('attributes') or {}
+        if isinstance(attributes, list):
+            attributes = {path.rsplit('.', 1)[-1]: path for path in attributes}
+        self.attributes = [(name, path) for name, path in attributes.items()]
+        self.source_paths.update(path for _, path in self.attributes)
+        self.source_paths.discard(None)
+        self.crime_types = self._crime_type_index()
+        self.incident_id = dict(self.fields)['incident_id']
+
+    @staticmethod
+    def _crime_type_index():
+        """{lowercased name or "category/name": crime type id} from the dimension cache"""
+        index = {}
+        for entry in dimensions.snapshot()['crime_type'].values():
+            index.setdefault(entry.name.lower(), entry.id)
+            if entry.category_name:
+                index[f'{entry.category_name}/{entry.name}'.lower()] = entry.id
+        return index
+
+    def _compile(self, name, spec):
+        if not isinstance(spec, dict):
+            spec = {'source': spec}
+        path = spec.get('source')
+        constant = spec.get('value')
+        default = spec.get('default')
+        value_map = spec.get('map')
+        converter = getattr(self, f"_to_{CRIME_FIELDS[name]}")
+        date_format = spec.get('format')
+        if path is None and constant is None:
+            raise TransformError('field_mapping', f"{name} needs a source or a value")
+
+        if '.' in (path or ''):
+            def get(record):
+                return record_path(record, path)
+        else:
+            def get(record):
+                return record.get(path)
+
+        def transform(record):
+            value = constant if path is None else get(record)
+            if value_map is not None and not _is_blank(value):
+                value = value_map.get(str(value), value)
+            if _is_blank(value):
+                value = default
+            if _is_blank(value):
+                return None
+            return converter(name, value, date_format)
+        return name, transform
+
+    def _to_string(self, name, value, date_format):
+        value = str(value).strip()
+        max_length = MAX_LENGTHS[name]
+        if len(value) > max_length:
+            raise TransformError(name, f"longer than {max_length} characters")
+        return value
+
+    def _to_text(self, name, value, date_format):
+        return str(value).strip()
+
+    def _to_float(self, name, value, date_format):
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            raise TransformError(name, f"'{value}' is not a number")
+
+    def _to_datetime(self, name, value, date_format):
+        if isinstance(value, datetime):
+            parsed = value
+        else:
+            try:
+                if date_format:
+                    parsed = datetime.strptime(str(value).strip(), date_format)
+                else:
+                    parsed = parse_datetime(str(value).strip())
+            except ValueError:
+                parsed = None
+            if parsed is None:
+                raise TransformError(name, f"'{value}' is not a valid date and time")
+        if timezone.is_naive(parsed):
+            parsed = timezone.make_aware(parsed)
+        return parsed
+
+    def _to_crime_type(self, name, value, date_format):
+        if isinstance(value, int) or (isinstance(value, str) and value.strip().isdigit()):
+            pk = int(value)
+            if dimensions.crime_type(pk) is not None:
+                return pk
+        pk = self.crime_types.get(str(value).strip().lower())
+        if pk is None:
+            raise TransformError(name, f"unknown crime type '{value}'")
+        return pk
+
+    def transform(self, record):
+        """Crime field values (plus attributes) for one source record; raises TransformError"""
+        values = {name: transform(record) for name, transform in self.fields}
+        for name in REQUIRED_FIELDS:
+            if values.get(name) is None:
+                raise TransformError(name, "is required")
+        if not (-180 <= values['longitude'] <= 180 and -90 <= values['latitude'] <= 90):
+            raise TransformError('location', "coordinates out of range")
+
+        values['crime_type_id'] = values.pop('crime_type')
+        values['agency_id'] = self.agency_id
+        values['data_source'] = self.source_name
+        if values.get('reported_at') is None:
+            values['reported_at'] = values['occurred_at']
+        if values.get('verification_status') not in (None, *VERIFICATION_STATUSES):
+            raise TransformError('verification_status', f"unknown status '{values['verification_status']}'")
+        for name in ('description', 'zip_code', 'country', 'verification_status'):
+            if values.get(name) is None:
+                values.pop(name, None)
+        values['attributes'] = [
+            {'name': attribute, 'value': _json_value(value)}
+            for attribute, path in self.attributes
+            for value in (record_path(record, path),)
+            if value is not None
+        ]
+        return values
+
+    def source_columns(self):
+        """Top-level source fields the mapping reads, so readers can skip the rest"""
+        return {path.split('.', 1)[0] for path in self.source_paths}
+
+    def record_id(self, record):
+        """Incident id of a source record for log messages, or '' when it has none"""
+        try:
+            return self.incident_id(record) or ''
+        except TransformError:
+            return ''
+
+    def transform_batch(self, records):
+        """Return (transformed rows, [(record, TransformError), ...]) for a batch"""
+        rows = []
+        failures = []
+        for record in records:
+            try:
+                rows.append(self.transform(record))
+            except TransformError as exc:
+                failures.append((record, exc))
+        return rows, failures
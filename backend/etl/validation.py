@@ -0,0 +1,399 @@
+import re
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+from itertools import compress, repeat
+import numpy as np
+from django.apps import apps
+from django.conf import settings
+from django.utils.dateparse import parse_datetime
+from django.utils.module_loading import import_string
+
+# Seconds a process reuses the key set of a reference rule before reloading it
+REFERENCE_CACHE_TTL = 300
+
+# Distinct values whose check results a rule remembers between batches
+DISTINCT_CACHE_SIZE = 100000
+
+# Rule fields that name a foreign key of the transformed rows
+FIELD_ALIASES = {'crime_type': 'crime_type_id', 'agency': 'agency_id'}
+
+ValidationResult = namedtuple('ValidationResult', ['rows', 'rejected', 'warnings'])
+
+
+class ValidationRuleError(ValueError):
+    """Raised when a DataValidationRule can't be compiled"""
+
+
+_reference_lock = threading.Lock()
+_reference_keys = {}
+
+
+def reference_keys(model_label, field, case_sensitive=True):
+    """Cached set of the values of field in a model's table (as strings), for reference rules"""
+    cache_key = (model_label, field, case_sensitive)
+    now = time.monotonic()
+    cached = _reference_keys.get(cache_key)
+    if cached is not None and now - cached[0] < REFERENCE_CACHE_TTL:
+        return cached[1]
+
+    with _reference_lock:
+        cached = _reference_keys.get(cache_key)
+        if cached is not None and now - cached[0] < REFERENCE_CACHE_TTL:
+            return cached[1]
+        try:
+            model = apps.get_model(model_label)
+        except (LookupError, ValueError):
+            raise ValidationRuleError(f"Unknown model '{model_label}'")
+        values = model._default_manager.order_by().values_list(field, flat=True).distinct()
+        keys = frozenset(
+            str(value) if case_sensitive else str(value).lower() for value in values if value is not None
+        )
+        _reference_keys[cache_key] = (now, keys)
+        return keys
+
+
+def _is_null(values):
+    return np.equal(values, None)
+
+
+def _is_blank(value):
+    return value is None or (isinstance(value, str) and not value.strip())
+
+
+def _distinct_map(values, predicate, memo):
+    """
+    Evaluate predicate once per distinct value of a column and broadcast the
+    results back through memo, a dict kept across the batches of a job
+    """
+    items = values.tolist()
+    try:
+        if len(memo) > DISTINCT_CACHE_SIZE:
+            memo.clear()
+        for value in set(items).difference(memo):
+            memo[value] = predicate(value)
+    except TypeError:
+        # Unhashable values (lists, dicts) are checked one by one
+        return np.fromiter(map(predicate, items), dtype=bool, count=len(items))
+    return np.fromiter(map(memo.__getitem__, items), dtype=bool, count=len(items))
+
+
+def _numbers(values):
+    """Column as floats (datetimes as POSIX timestamps), NaN where not a number"""
+    # Numbers and numeric strings convert in one cast
+    try:
+        return values.astype(float)
+    except (TypeError, ValueError):
+        pass
+    try:
+        return np.where(_is_null(values), np.nan, values).astype(float)
+    except (TypeError, ValueError):
+        pass
+
+    numbers = np.full(len(values), np.nan)
+    for index, value in enumerate(values):
+        if isinstance(value, datetime):
+            numbers[index] = value.timestamp()
+        elif value is not None:
+            try:
+                numbers[index] = float(value)
+            except (TypeError, ValueError):
+                pass
+    return numbers
+
+
+def _bound(value):
+    if value is None:
+        return None
+    if isinstance(value, str):
+        parsed = parse_datetime(value)
+        if parsed is not None:
+            return parsed.timestamp()
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise ValidationRuleError(f"Range bound '{value}' is not a number or a date")
+
+
+class CompiledRule:
+    """
+    A DataValidationRule turned into a check over a whole column. check()
+    returns the mask of invalid values among the candidate rows; correct()
+    returns the corrected column and the mask of values it couldn't
+    correct; record() is told which rows were kept in the end. Nulls only
+    fail ``required`` rules.
+    """
+
+    def __init__(self, rule):
+        self.rule = rule
+        self.field = FIELD_ALIASES.get(rule.field_name, rule.field_name)
+        self.action = rule.error_action
+        self.config = rule.configuration or {}
+        self.default = self.config.get('default')
+        compile_rule = getattr(self, f'_compile_{rule.rule_type}', None)
+        if compile_rule is None:
+            raise ValidationRuleError(f"Unknown rule type '{rule.rule_type}'")
+        compile_rule()
+
+    @property
+    def message(self):
+        return f"{self.rule.name}: invalid {self.rule.field_name}"
+
+    def _compile_required(self):
+        memo = {}
+
+        def check(values, candidates):
+            return _distinct_map(values, _is_blank, memo)
+        self._check = check
+
+    def _compile_format(self):
+        try:
+            pattern = re.compile(self.config['pattern'])
+        except (KeyError, re.error) as exc:
+            raise ValidationRuleError(f"{self.rule.name}: format rules need a valid pattern ({exc})")
+
+        memo = {}
+
+        def check(values, candidates):
+            return _distinct_map(values, lambda value: value is not None and pattern.fullmatch(str(value)) is None, memo)
+        self._check = check
+
+    def _compile_range(self):
+        minimum = _bound(self.config.get('min'))
+        maximum = _bound(self.config.get('max'))
+        if minimum is None and maximum is None:
+            raise ValidationRuleError(f"{self.rule.name}: range rules need a min or a max")
+
+        def check(values, candidates):
+            numbers = _numbers(values)
+            with np.errstate(invalid='ignore'):
+                valid = ~np.isnan(numbers)
+                if minimum is not None:
+                    valid &= numbers >= minimum
+                if maximum is not None:
+                    valid &= numbers <= maximum
+            invalid = ~valid
+            if invalid.any():
+                invalid &= ~_is_null(values)
+            return invalid
+        self._check = check
+
+        def correct(values, invalid):
+            # Clamp numbers into the range, and fall back to the default for the rest
+            numbers = _numbers(values)
+            corrected = values.copy()
+            fixable = invalid & ~np.isnan(numbers)
+            clamped = np.clip(
+                numbers,
+                minimum if minimum is not None else -np.inf,
+                maximum if maximum is not None else np.inf
+            )
+            for index in np.flatnonzero(fixable):
+                if isinstance(values[index], datetime):
+                    fixable[index] = False
+                else:
+                    corrected[index] = clamped[index].item()
+            return self._with_default(corrected, invalid & ~fixable)
+        self._correct = correct
+
+    def _compile_enum(self):
+        case_sensitive = self.config.get('case_sensitive', False)
+        allowed = [str(value) for value in self.config.get('values', [])]
+        if not allowed:
+            raise ValidationRuleError(f"{self.rule.name}: enum rules need values")
+        allowed_set = frozenset(value if case_sensitive else value.lower() for value in allowed)
+
+        def invalid(value):
+            if value is None:
+                return False
+            value = str(value)
+            return (value if case_sensitive else value.lower()) not in allowed_set
+
+        memo = {}
+
+        def check(values, candidates):
+            return _distinct_map(values, invalid, memo)
+        self._check = check
+
+        def correct(values, invalid):
+            # Fix the case of values that only differ from an allowed one by case
+            lowered = {value.lower(): value for value in allowed}
+            corrected = values.copy()
+            unfixed = invalid.copy()
+            for index in np.flatnonzero(invalid):
+                match = lowered.get(str(values[index]).strip().lower())
+                if match is not None:
+                    corrected[index] = match
+                    unfixed[index] = False
+            return self._with_default(corrected, unfixed)
+        self._correct = correct
+
+    def _compile_unique(self):
+        # Uniqueness holds across the whole job, so the values of kept rows
+        # outlive batches. Rows rejected by other rules neither count as
+        # first occurrences nor take their value.
+        seen = set()
+        checked = {}
+
+        def check(values, candidates):
+            invalid = np.zeros(len(values), dtype=bool)
+            rows = np.flatnonzero(candidates & ~_is_null(values))
+            keys = values[rows].tolist()
+            distinct = set(keys)
+            checked.update(rows=rows, keys=keys, distinct=distinct)
+            if len(distinct) == len(keys) and seen.isdisjoint(distinct):
+                return invalid
+            repeated = np.ones(len(keys), dtype=bool)
+            repeated[list(dict(zip(reversed(keys), range(len(keys) - 1, -1, -1))).values())] = False
+            repeated |= np.fromiter(map(seen.__contains__, keys), dtype=bool, count=len(keys))
+            invalid[rows] = repeated
+            return invalid
+        self._check = check
+
+        def record(values, kept):
+            rows, keys, distinct = checked.pop('rows'), checked.pop('keys'), checked.pop('distinct')
+            kept = kept[rows]
+            seen.update(distinct if kept.all() else compress(keys, kept))
+        self._record = record
+
+    def _compile_reference(self):
+        model_label = self.config.get('model')
+        field = self.config.get('field', 'pk')
+        case_sensitive = self.config.get('case_sensitive', True)
+        if not model_label:
+            raise ValidationRuleError(f"{self.rule.name}: reference rules need a model")
+        reference_keys(model_label, field, case_sensitive)
+
+        # Results are remembered until the key set is reloaded
+        memo = {}
+        loaded = [None]
+
+        def check(values, candidates):
+            keys = reference_keys(model_label, field, case_sensitive)
+            if keys is not loaded[0]:
+                memo.clear()
+                loaded[0] = keys
+
+            def invalid(value):
+                if value is None:
+                    return False
+                value = str(value)
+                return (value if case_sensitive else value.lower()) not in keys
+            return _distinct_map(values, invalid, memo)
+        self._check = check
+
+    def _compile_custom(self):
+        # A vectorized callable: column (object ndarray) -> mask of valid values.
+        # Rules name a function of settings.ETL_CUSTOM_VALIDATORS, never a module path
+        name = self.config.get('function')
+        validators = settings.ETL_CUSTOM_VALIDATORS
+        if not isinstance(name, str) or name not in validators:
+            raise ValidationRuleError(
+                f"{self.rule.name}: custom rules need one of the functions {sorted(validators)}, not {name!r}"
+            )
+        try:
+            function = import_string(validators[name])
+        except ImportError as exc:
+            raise ValidationRuleError(f"{self.rule.name}: custom function {name!r} can't be imported ({exc})")
+
+        def check(values, candidates):
+            valid = np.asarray(function(values), dtype=bool)
+            if valid.shape != (len(values),):
+                raise ValidationRuleError(f"{self.rule.name}: custom function returned a mask of the wrong shape")
+            return ~valid
+        self._check = check
+
+    def _with_default(self, values, unfixed):
+        if self.default is None:
+            return values, unfixed
+        values[unfixed] = self.default
+        return values, np.zeros(len(values), dtype=bool)
+
+    @property
+    def runs_last(self):
+        """Uniqueness is judged over the rows every other rule kept"""
+        return self.rule.rule_type == 'unique'
+
+    def check(self, values, candidates=None):
+        if candidates is None:
+            candidates = np.ones(len(values), dtype=bool)
+        return self._check(values, candidates)
+
+    def record(self, values, kept):
+        record = getattr(self, '_record', None)
+        if record is not None:
+            record(values, kept)
+
+    def correct(self, values, invalid):
+        correct = getattr(self, '_correct', None)
+        if correct is None:
+            corrected = values.copy()
+            return self._with_default(corrected, invalid.copy())
+        return correct(values, invalid)
+
+
+class RuleSet:
+    """
+    The active validation rules of a data source, compiled once per job and
+    applied in priority order (uniqueness rules last) to whole batches of
+    transformed rows:
+
+    - ``reject``: rows failing the rule are dropped
+    - ``warn``: rows are kept and reported
+    - ``correct``: values are fixed (clamped into a range, matched to an
+      enum value ignoring case, or replaced by the rule's ``default``);
+      rows that can't be fixed are dropped
+    - ``ignore``: the rule isn't evaluated
+    """
+
+    def __init__(self, rules):
+        compiled = [CompiledRule(rule) for rule in rules if rule.error_action != 'ignore']
+        self.rules = sorted(compiled, key=lambda rule: rule.runs_last)
+
+    @classmethod
+    def for_source(cls, data_source):
+        return cls(data_source.validation_rules.filter(is_active=True).order_by('priority', 'pk'))
+
+    def apply(self, rows):
+        """Return a ValidationResult of kept rows and the (row, message) pairs rejected or warned about"""
+        if not self.rules or not rows:
+            return ValidationResult(rows, [], [])
+
+        count = len(rows)
+        columns = {}
+        rejected = np.zeros(count, dtype=bool)
+        reasons = {}
+        warnings = []
+
+        for rule in self.rules:
+            if rule.field not in columns:
+                columns[rule.field] = np.fromiter(
+                    map(dict.get, rows, repeat(rule.field)), dtype=object, count=count
+                )
+            values = columns[rule.field]
+            invalid = rule.check(values, ~rejected) & ~rejected
+            if not invalid.any():
+                continue
+
+            if rule.action == 'correct':
+                corrected, unfixed = rule.correct(values, invalid)
+                for index in np.flatnonzero(invalid & ~unfixed):
+                    rows[index][rule.field] = corrected[index]
+                columns[rule.field] = corrected
+                invalid = unfixed
+            if rule.action == 'warn':
+                warnings.extend((rows[index], rule.message) for index in np.flatnonzero(invalid))
+                continue
+            for index in np.flatnonzero(invalid):
+                reasons.setdefault(index, rule.message)
+            rejected |= invalid
+
+        for rule in self.rules:
+            rule.record(columns[rule.field], ~rejected)
+
+        return ValidationResult(
+            list(compress(rows, ~rejected)),
+            [(rows[index], message) for index, message in sorted(reasons.items())],
+            warnings
+        )
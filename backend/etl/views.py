@@ -1,6 +1,9 @@
+import uuid
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from django.db import transaction
+from .extractors import EXTRACTORS
 from .models import DataSource, ETLJob, DataValidationRule, ETLJobLog
 from .serializers import (
     DataSourceSerializer, 
@@ -8,6 +11,7 @@ from .serializers import (
     DataValidationRuleSerializer, 
     ETLJobLogSerializer
 )
+from .tasks import run_etl_job
 
 class DataSourceViewSet(viewsets.ModelViewSet):
     """ViewSet for DataSource model"""
@@ -17,26 +21,57 @@ class DataSourceViewSet(viewsets.ModelViewSet):
 
     @action(detail=True, methods=['post'])
     def trigger_sync(self, request, pk=None):
-        """Manually trigger sync for a specific data source"""
+        """
+        Queue an ETL job that syncs a specific data source. Syncs are
+        incremental from the source's watermark; ``full_resync: true``
+        re-reads the whole source.
+        """
         data_source = self.get_object()
-        # Implement your sync logic here
-        # This is a placeholder - you'll need to add actual sync implementation
-        try:
-            # Example: Create an ETL job
-            etl_job = ETLJob.objects.create(
-                data_source=data_source,
-                job_id=f"manual_sync_{data_source.id}",
-                status='running'
-            )
+        if not data_source.is_active:
+            return Response({
+                'status': 'Sync failed',
+                'error': 'Data source is not active'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if data_source.source_type not in EXTRACTORS:
             return Response({
-                'status': 'Sync initiated',
-                'job_id': etl_job.job_id
-            }, status=status.HTTP_200_OK)
-        except Exception as e:
+                'status': 'Sync failed',
+                'error': f"Sources of type '{data_source.source_type}' can't be synced"
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        full_resync = request.data.get('full_resync', False)
+        if full_resync not in (True, False, 'true', 'false'):
             return Response({
                 'status': 'Sync failed',
-                'error': str(e)
+                'error': 'full_resync must be a boolean'
             }, status=status.HTTP_400_BAD_REQUEST)
+        full_resync = full_resync in (True, 'true')
+
+        with transaction.atomic():
+            # One job at a time per source
+            DataSource.objects.select_for_update().filter(pk=data_source.pk).first()
+            active = data_source.etl_jobs.filter(status__in=['scheduled', 'running']).first()
+            if active is not None:
+                return Response({
+                    'status': 'Sync already in progress',
+                    'job_id': active.job_id
+                }, status=status.HTTP_409_CONFLICT)
+
+            etl_job = ETLJob.objects.create(
+                data_source=data_source,
+                job_id=f"manual_sync_{data_source.id}_{uuid.uuid4().hex[:12]}",
+                status='scheduled',
+                parameters={
+                    'trigger': 'manual',
+                    'user': request.user.pk,
+                    'full_resync': full_resync
+                }
+            )
+            transaction.on_commit(lambda: run_etl_job.delay(etl_job.pk))
+
+        return Response({
+            'status': 'Sync initiated',
+            'job_id': etl_job.job_id
+        }, status=status.HTTP_202_ACCEPTED)
 
 class ETLJobViewSet(viewsets.ModelViewSet):
     """ViewSet for ETLJob model"""
@@ -52,6 +87,19 @@ class ETLJobViewSet(viewsets.ModelViewSet):
         serializer = ETLJobLogSerializer(logs, many=True)
         return Response(serializer.data)
 
+    @action(detail=True, methods=['post'])
+    def cancel(self, request, pk=None):
+        """Cancel a scheduled or running job; a running job stops after its current batch"""
+        etl_job = self.get_object()
+        canceled = ETLJob.objects.filter(
+            pk=etl_job.pk, status__in=['scheduled', 'running']
+        ).update(status='canceled')
+        if not canceled:
+            return Response({
+                'error': f'Job is already {etl_job.status}'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'status': 'Job canceled', 'job_id': etl_job.job_id})
+
 class DataValidationRuleViewSet(viewsets.ModelViewSet):
     """ViewSet for DataValidationRule model"""
     queryset = DataValidationRule.objects.all()
@@ -63,3 +111,5 @@ class ETLJobLogViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = ETLJobLog.objects.all()
     serializer_class = ETLJobLogSerializer
     permission_classes = [permissions.IsAuthenticated]
+    # Log volume grows fastest, so totals stop being counted past the cap
+    pagination_count_mode = 'capped'
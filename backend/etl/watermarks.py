@@ -0,0 +1,102 @@
+from datetime import datetime
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from .extractors import record_path
+
+
+def _comparable(value):
+    """(kind, value) a watermark compares by: timestamps, then numbers, then text"""
+    if isinstance(value, datetime):
+        return 0, value if timezone.is_aware(value) else timezone.make_aware(value)
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return 1, float(value)
+    text = str(value).strip()
+    try:
+        parsed = parse_datetime(text)
+    except ValueError:
+        parsed = None
+    if parsed is not None:
+        return 0, parsed if timezone.is_aware(parsed) else timezone.make_aware(parsed)
+    try:
+        return 1, float(text)
+    except ValueError:
+        return 2, text
+
+
+def _serialize(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value).strip()
+
+
+class WatermarkTracker:
+    """
+    Follows the watermark of a sync. Incremental jobs drop records below
+    the stored watermark (for sources that can't filter themselves). The
+    highest value among the records actually loaded becomes the new
+    watermark once the job completes, held back to the lowest value of a
+    record that failed, so that the next sync (which reads from the
+    watermark on, inclusive) picks the failed records up again.
+    """
+
+    def __init__(self, data_source, full_resync=False):
+        self.field = data_source.watermark_field
+        self.current = None if full_resync or not data_source.watermark else _comparable(data_source.watermark)
+        self.highest = None
+        self.highest_value = None
+        self.lowest_failed = None
+        self.lowest_failed_value = None
+
+    @property
+    def enabled(self):
+        return bool(self.field)
+
+    def _values(self, records):
+        """(comparable key, value) of the records that have a watermark value"""
+        for record in records:
+            value = record_path(record, self.field)
+            if value is not None and value != '':
+                yield _comparable(value), value
+
+    def filter(self, records):
+        """Return (records at or above the watermark, number dropped)"""
+        if not self.enabled or self.current is None:
+            return records, 0
+        kept = []
+        for record in records:
+            value = record_path(record, self.field)
+            if value is not None and value != '':
+                key = _comparable(value)
+                if key[0] == self.current[0] and key < self.current:
+                    continue
+            kept.append(record)
+        return kept, len(records) - len(kept)
+
+    def advance(self, records):
+        """Move the candidate watermark over source records that were loaded"""
+        if not self.enabled:
+            return
+        for key, value in self._values(records):
+            if self.highest is None or (key[0] == self.highest[0] and key > self.highest):
+                self.highest = key
+                self.highest_value = value
+
+    def hold(self, records):
+        """Keep the watermark at or below source records that failed to transform, validate or load"""
+        if not self.enabled:
+            return
+        for key, value in self._values(records):
+            if self.lowest_failed is None or (key[0] == self.lowest_failed[0] and key < self.lowest_failed):
+                self.lowest_failed = key
+                self.lowest_failed_value = value
+
+    def new_watermark(self):
+        """Serialized watermark to store after a successful sync, or None to keep the current one"""
+        if self.highest is None:
+            return None
+        key, value = self.highest, self.highest_value
+        if self.lowest_failed is not None and self.lowest_failed[0] == key[0] and self.lowest_failed < key:
+            key, value = self.lowest_failed, self.lowest_failed_value
+        if self.current is not None and key[0] == self.current[0] and key <= self.current:
+            return None
+        return _serialize(value)
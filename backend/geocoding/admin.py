@@ -0,0 +1,14 @@
+from django.contrib import admin
+from django.contrib.gis.admin import GISModelAdmin
+from .models import GazetteerEntry
+
+@admin.register(GazetteerEntry)
+class GazetteerEntryAdmin(GISModelAdmin):
+    """
+    Admin configuration for GazetteerEntry model
+    """
+    list_display = ('name', 'place_type', 'city', 'county', 'rank', 'source')
+    list_filter = ('place_type', 'county', 'source')
+    search_fields = ('name', 'city', 'county')
+    readonly_fields = ('normalized_name',)
+
@@ -0,0 +1,270 @@
+import re
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from django.apps import apps
+from django.contrib.gis.db.models.functions import Distance
+from django.contrib.gis.geos import Point
+from django.contrib.gis.measure import D
+from django.contrib.postgres.search import TrigramSimilarity
+from django.core.cache import cache
+
+GeocodeResult = namedtuple(
+    'GeocodeResult', ['name', 'place_type', 'city', 'county', 'longitude', 'latitude', 'score']
+)
+ReverseGeocodeResult = namedtuple(
+    'ReverseGeocodeResult', ['name', 'place_type', 'city', 'county', 'longitude', 'latitude', 'distance']
+)
+
+# Shared cache key holding the current version of the gazetteer
+GAZETTEER_VERSION_KEY = 'geocoding:gazetteer:version'
+
+# Seconds a process trusts its memoized results before checking the shared version again
+VERSION_CHECK_INTERVAL = 5
+
+# Most results memoized per process, for forward and reverse lookups each
+MEMO_SIZE = 50000
+
+# Lowest trigram similarity accepted for a fuzzy match
+MIN_SIMILARITY = 0.3
+
+# Fuzzy candidates compared against the locality part of an address
+FUZZY_CANDIDATES = 10
+
+# Reverse lookups only return places this close to the point
+REVERSE_MAX_DISTANCE = 2000
+
+# Decimal places coordinates are rounded to before reverse lookups (about 1 m)
+REVERSE_PRECISION = 5
+
+# Common street abbreviations, expanded so both spellings share a key
+ABBREVIATIONS = {
+    'rd': 'road',
+    'st': 'street',
+    'str': 'street',
+    'ave': 'avenue',
+    'av': 'avenue',
+    'hwy': 'highway',
+    'ln': 'lane',
+    'dr': 'drive',
+    'cres': 'crescent',
+    'cl': 'close',
+    'est': 'estate',
+    'mt': 'mount',
+}
+
+# House numbers and "block of" prefixes of generalized block addresses
+BLOCK_PREFIX = re.compile(r'^\s*(?:\d+[a-z]?(?:\s*-\s*\d+[a-z]?)?\s+)?(?:block\s+(?:of\s+)?)?', re.IGNORECASE)
+NON_WORD = re.compile(r'[^\w]+')
+
+_MISSING = object()
+
+
+def normalize_place_name(text):
+    """Lookup key of a place name: lowercase words with abbreviations expanded"""
+    words = NON_WORD.sub(' ', BLOCK_PREFIX.sub('', text or '').lower()).split()
+    return ' '.join(ABBREVIATIONS.get(word, word) for word in words)
+
+
+def split_address(address):
+    """
+    Return (place key, locality keys) of an address such as
+    "100 Block of Moi Ave, Nairobi": the first comma-separated part is the
+    place, the rest narrow it down to a city or county.
+    """
+    parts = [normalize_place_name(part) for part in (address or '').split(',')]
+    parts = [part for part in parts if part]
+    if not parts:
+        return '', ()
+    return parts[0], tuple(parts[1:])
+
+
+class LRUCache:
+    """Small thread-safe least recently used mapping"""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                return default
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class Geocoder:
+    """
+    Forward and reverse geocoding against the local gazetteer.
+
+    Results (including misses) are memoized per process in LRU caches keyed
+    by the normalized address or the rounded coordinates, and dropped when
+    the shared gazetteer version changes (see geocoding.signals and
+    geocoding.loader). Batches resolve all their exact matches with one
+    query, so repeated and well-formed addresses never reach the fuzzy
+    trigram search.
+    """
+
+    def __init__(self, memo_size=MEMO_SIZE):
+        self._forward = LRUCache(memo_size)
+        self._reverse = LRUCache(memo_size)
+        self._lock = threading.Lock()
+        self._version = None
+        self._checked_at = 0.0
+
+    def _shared_version(self):
+        version = cache.get(GAZETTEER_VERSION_KEY)
+        if version is None:
+            cache.add(GAZETTEER_VERSION_KEY, time.time_ns(), None)
+            version = cache.get(GAZETTEER_VERSION_KEY)
+        return version
+
+    def _check_version(self):
+        now = time.monotonic()
+        if now - self._checked_at < VERSION_CHECK_INTERVAL:
+            return
+        with self._lock:
+            if now - self._checked_at < VERSION_CHECK_INTERVAL:
+                return
+            version = self._shared_version()
+            if version != self._version:
+                self._forward.clear()
+                self._reverse.clear()
+                self._version = version
+            self._checked_at = now
+
+    def _entries(self):
+        return apps.get_model('geocoding', 'GazetteerEntry').objects.order_by()
+
+    @staticmethod
+    def _pick(candidates, localities):
+        """Best of the (entry row, score) candidates, preferring ones in the address's locality"""
+        def key(candidate):
+            row, score = candidate
+            in_locality = bool(localities) and (
+                normalize_place_name(row['city']) in localities or
+                normalize_place_name(row['county']) in localities
+            )
+            return (in_locality, score, row['rank'])
+        return max(candidates, key=key, default=None)
+
+    @staticmethod
+    def _result(candidate):
+        if candidate is None:
+            return None
+        row, score = candidate
+        return GeocodeResult(
+            name=row['name'],
+            place_type=row['place_type'],
+            city=row['city'],
+            county=row['county'],
+            longitude=row['location'].x,
+            latitude=row['location'].y,
+            score=round(score, 3)
+        )
+
+    def _exact(self, keys):
+        """Return {place key: [(row, 1.0), ...]} for the keys that name a gazetteer entry"""
+        matches = {}
+        rows = self._entries().filter(normalized_name__in=set(keys)).values(
+            'normalized_name', 'name', 'place_type', 'city', 'county', 'location', 'rank'
+        )
+        for row in rows:
+            matches.setdefault(row['normalized_name'], []).append((row, 1.0))
+        return matches
+
+    def _fuzzy(self, place):
+        """Closest entries by trigram similarity, answered from the GIN trigram index"""
+        rows = self._entries().filter(normalized_name__trigram_similar=place).annotate(
+            similarity=TrigramSimilarity('normalized_name', place)
+        ).filter(similarity__gte=MIN_SIMILARITY).order_by('-similarity', '-rank').values(
+            'name', 'place_type', 'city', 'county', 'location', 'rank', 'similarity'
+        )[:FUZZY_CANDIDATES]
+        return [(row, row['similarity']) for row in rows]
+
+    def geocode(self, address):
+        """Best GeocodeResult for an address, or None"""
+        return self.geocode_many([address])[0]
+
+    def geocode_many(self, addresses):
+        """GeocodeResults (or None) for a batch of addresses, in order"""
+        self._check_version()
+        keys = [split_address(address) for address in addresses]
+
+        results = {}
+        pending = set()
+        for key in keys:
+            if not key[0] or key in results:
+                continue
+            found = self._forward.get(key, _MISSING)
+            if found is _MISSING:
+                pending.add(key)
+            else:
+                results[key] = found
+
+        if pending:
+            exact = self._exact(place for place, _ in pending)
+            for key in pending:
+                place, localities = key
+                candidates = exact.get(place) or self._fuzzy(place)
+                results[key] = self._result(self._pick(candidates, localities))
+                self._forward.put(key, results[key])
+
+        return [results.get(key) for key in keys]
+
+    def reverse_geocode(self, longitude, latitude):
+        """Nearest gazetteer entry to a point as a ReverseGeocodeResult, or None"""
+        self._check_version()
+        key = (round(longitude, REVERSE_PRECISION), round(latitude, REVERSE_PRECISION))
+        found = self._reverse.get(key, _MISSING)
+        if found is not _MISSING:
+            return found
+
+        point = Point(key[0], key[1], srid=4326)
+        row = self._entries().filter(
+            location__dwithin=(point, D(m=REVERSE_MAX_DISTANCE))
+        ).annotate(distance=Distance('location', point)).order_by('distance', '-rank').values(
+            'name', 'place_type', 'city', 'county', 'location', 'distance'
+        ).first()
+
+        result = None
+        if row is not None:
+            result = ReverseGeocodeResult(
+                name=row['name'],
+                place_type=row['place_type'],
+                city=row['city'],
+                county=row['county'],
+                longitude=row['location'].x,
+                latitude=row['location'].y,
+                distance=round(row['distance'].m, 1)
+            )
+        self._reverse.put(key, result)
+        return result
+
+    def invalidate(self):
+        """Drop the memoized results and bump the shared version so other processes drop theirs too"""
+        cache.set(GAZETTEER_VERSION_KEY, time.time_ns(), None)
+        with self._lock:
+            self._forward.clear()
+            self._reverse.clear()
+            self._version = None
+            self._checked_at = 0.0
+
+
+geocoder = Geocoder()
@@ -0,0 +1,114 @@
+import csv
+import gzip
+import io
+import json
+import os
+from django.contrib.gis.geos import Point
+from django.db import connection, transaction
+from .geocoder import geocoder, normalize_place_name
+from .models import GazetteerEntry
+
+# Entries inserted per INSERT
+LOAD_BATCH_SIZE = 5000
+
+PLACE_TYPES = {value for value, _ in GazetteerEntry.PLACE_TYPES}
+
+
+class GazetteerFileError(ValueError):
+    """Raised when a gazetteer file can't be read"""
+
+
+def _open(path):
+    if path.endswith('.gz'):
+        return io.TextIOWrapper(gzip.open(path, 'rb'), encoding='utf-8', newline='')
+    return open(path, encoding='utf-8', newline='')
+
+
+def _base_format(path):
+    name = path[:-3] if path.endswith('.gz') else path
+    return os.path.splitext(name)[1].lower().lstrip('.')
+
+
+def _csv_records(handle):
+    """Rows of a CSV with name, place_type, longitude, latitude and optional city, county, country, rank columns"""
+    for row in csv.DictReader(handle):
+        yield row
+
+
+def _geojson_records(handle):
+    """Point features of a GeoJSON FeatureCollection, their properties carrying the CSV columns"""
+    try:
+        data = json.load(handle)
+    except json.JSONDecodeError as exc:
+        raise GazetteerFileError(f"Invalid GeoJSON: {exc}")
+    for feature in data.get('features', []):
+        geometry = feature.get('geometry') or {}
+        if geometry.get('type') != 'Point':
+            continue
+        longitude, latitude = geometry['coordinates'][:2]
+        yield {**(feature.get('properties') or {}), 'longitude': longitude, 'latitude': latitude}
+
+
+def _entry(record, line, source):
+    name = (record.get('name') or '').strip()
+    place_type = (record.get('place_type') or '').strip().lower()
+    if not name or not normalize_place_name(name):
+        raise GazetteerFileError(f"Entry {line}: name is required")
+    if place_type not in PLACE_TYPES:
+        raise GazetteerFileError(f"Entry {line}: unknown place_type '{place_type}'")
+    try:
+        longitude = float(record['longitude'])
+        latitude = float(record['latitude'])
+        rank = int(record.get('rank') or 0)
+    except (KeyError, TypeError, ValueError):
+        raise GazetteerFileError(f"Entry {line}: longitude, latitude and rank must be numbers")
+    if not (-180 <= longitude <= 180 and -90 <= latitude <= 90):
+        raise GazetteerFileError(f"Entry {line}: coordinates out of range")
+
+    return GazetteerEntry(
+        name=name[:255],
+        normalized_name=normalize_place_name(name)[:255],
+        place_type=place_type,
+        city=(record.get('city') or '').strip()[:100],
+        county=(record.get('county') or '').strip()[:100],
+        country=(record.get('country') or '').strip()[:50] or 'Kenya',
+        location=Point(longitude, latitude, srid=4326),
+        rank=rank,
+        source=source
+    )
+
+
+def load_gazetteer(path, replace=False, batch_size=LOAD_BATCH_SIZE):
+    """
+    Load gazetteer entries from a CSV or GeoJSON file (optionally gzipped).
+    With replace, entries previously loaded from a file of the same name
+    are removed first. The load is all or nothing. Returns the number of
+    entries loaded.
+    """
+    file_format = _base_format(path)
+    if file_format == 'csv':
+        read_records = _csv_records
+    elif file_format in ('json', 'geojson'):
+        read_records = _geojson_records
+    else:
+        raise GazetteerFileError("Gazetteer files must be .csv, .json or .geojson (optionally .gz)")
+
+    source = os.path.basename(path)
+    loaded = 0
+    with _open(path) as handle, transaction.atomic():
+        if replace:
+            # A plain DELETE: a queryset delete would load every entry to send signals
+            with connection.cursor() as cursor:
+                cursor.execute(f'DELETE FROM {GazetteerEntry._meta.db_table} WHERE source = %s', [source])
+        batch = []
+        for line, record in enumerate(read_records(handle), start=1):
+            batch.append(_entry(record, line, source))
+            if len(batch) >= batch_size:
+                GazetteerEntry.objects.bulk_create(batch)
+                loaded += len(batch)
+                batch = []
+        GazetteerEntry.objects.bulk_create(batch)
+        loaded += len(batch)
+        # bulk_create doesn't send signals
+        transaction.on_commit(geocoder.invalidate)
+    return loaded
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+from geocoding.loader import LOAD_BATCH_SIZE, GazetteerFileError, load_gazetteer
+
+
+class Command(BaseCommand):
+    help = (
+        "Load places and streets into the geocoding gazetteer from a CSV "
+        "(name, place_type, longitude, latitude[, city, county, country, rank]) "
+        "or GeoJSON file, optionally gzipped"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Gazetteer file to load")
+        parser.add_argument('--replace', action='store_true',
+                            help="Remove the entries previously loaded from a file of the same name")
+        parser.add_argument('--batch-size', type=int, default=LOAD_BATCH_SIZE,
+                            help="Entries inserted per INSERT")
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be positive")
+        try:
+            loaded = load_gazetteer(options['path'], replace=options['replace'], batch_size=options['batch_size'])
+        except OSError as exc:
+            raise CommandError(f"Can't read {options['path']}: {exc}")
+        except GazetteerFileError as exc:
+            raise CommandError(str(exc))
+        self.stdout.write(self.style.SUCCESS(f"Loaded {loaded} gazetteer entries"))
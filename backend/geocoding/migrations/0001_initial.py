@@ -0,0 +1,37 @@
+# Generated by Django 5.1.6 on 2026-10-18 15:45
+
+import django.contrib.gis.db.models.fields
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.CreateModel(
+            name='GazetteerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('normalized_name', models.CharField(editable=False, max_length=255)),
+                ('place_type', models.CharField(choices=[('street', 'Street'), ('landmark', 'Landmark'), ('neighbourhood', 'Neighbourhood'), ('town', 'Town'), ('county', 'County')], max_length=20)),
+                ('city', models.CharField(blank=True, max_length=100)),
+                ('county', models.CharField(blank=True, max_length=100)),
+                ('country', models.CharField(default='Kenya', max_length=50)),
+                ('location', django.contrib.gis.db.models.fields.PointField(geography=True, srid=4326)),
+                ('rank', models.IntegerField(default=0)),
+                ('source', models.CharField(blank=True, help_text='File the entry was loaded from', max_length=255)),
+            ],
+            options={
+                'verbose_name_plural': 'Gazetteer Entries',
+                'indexes': [models.Index(fields=['normalized_name', '-rank'], name='geocoding_entry_name_idx'), django.contrib.postgres.indexes.GinIndex(fields=['normalized_name'], name='geocoding_entry_name_trgm', opclasses=['gin_trgm_ops'])],
+            },
+        ),
+    ]
@@ -0,0 +1,42 @@
+from django.db import models
+from django.contrib.gis.db import models as gis_models
+from django.contrib.postgres.indexes import GinIndex
+from .geocoder import normalize_place_name
+
+class GazetteerEntry(models.Model):
+    """A named place or street of the offline gazetteer used for geocoding"""
+    PLACE_TYPES = (
+        ('street', 'Street'),
+        ('landmark', 'Landmark'),
+        ('neighbourhood', 'Neighbourhood'),
+        ('town', 'Town'),
+        ('county', 'County'),
+    )
+    
+    name = models.CharField(max_length=255)
+    # Lookup key produced by geocoding.geocoder.normalize_place_name
+    normalized_name = models.CharField(max_length=255, editable=False)
+    place_type = models.CharField(max_length=20, choices=PLACE_TYPES)
+    city = models.CharField(max_length=100, blank=True)
+    county = models.CharField(max_length=100, blank=True)
+    country = models.CharField(max_length=50, default="Kenya")
+    location = gis_models.PointField(geography=True, spatial_index=True)
+    # Higher ranked entries win between equally good matches (e.g. population)
+    rank = models.IntegerField(default=0)
+    source = models.CharField(max_length=255, blank=True, help_text="File the entry was loaded from")
+    
+    def save(self, *args, **kwargs):
+        self.normalized_name = normalize_place_name(self.name)
+        super().save(*args, **kwargs)
+    
+    def __str__(self):
+        if self.city:
+            return f"{self.name}, {self.city}"
+        return self.name
+    
+    class Meta:
+        verbose_name_plural = "Gazetteer Entries"
+        indexes = [
+            models.Index(fields=['normalized_name', '-rank'], name='geocoding_entry_name_idx'),
+            GinIndex(fields=['normalized_name'], opclasses=['gin_trgm_ops'], name='geocoding_entry_name_trgm'),
+        ]
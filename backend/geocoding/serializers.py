@@ -0,0 +1,22 @@
+from rest_framework import serializers # type: ignore
+
+# Most addresses geocoded by one request
+MAX_BATCH_ADDRESSES = 1000
+
+class GeocodeRequestSerializer(serializers.Serializer):
+    """Either a single address or a batch of addresses"""
+    address = serializers.CharField(max_length=500, required=False)
+    addresses = serializers.ListField(
+        child=serializers.CharField(max_length=500, allow_blank=True),
+        required=False,
+        max_length=MAX_BATCH_ADDRESSES
+    )
+
+    def validate(self, attrs):
+        if ('address' in attrs) == ('addresses' in attrs):
+            raise serializers.ValidationError("Provide either address or addresses")
+        return attrs
+
+class ReverseGeocodeRequestSerializer(serializers.Serializer):
+    lat = serializers.FloatField(min_value=-90, max_value=90)
+    lng = serializers.FloatField(min_value=-180, max_value=180)
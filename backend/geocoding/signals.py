@@ -0,0 +1,12 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .geocoder import geocoder
+from .models import GazetteerEntry
+
+
+@receiver(post_save, sender=GazetteerEntry)
+@receiver(post_delete, sender=GazetteerEntry)
+def invalidate_geocoder(sender, **kwargs):
+    """Drop memoized geocoding results once gazetteer edits are committed"""
+    transaction.on_commit(geocoder.invalidate)
@@ -0,0 +1,143 @@
+from unittest import mock
+from django.contrib.gis.geos import Point
+from django.test import SimpleTestCase, TestCase
+from .geocoder import MIN_SIMILARITY, Geocoder, LRUCache, normalize_place_name, split_address
+from .models import GazetteerEntry
+from .serializers import MAX_BATCH_ADDRESSES, GeocodeRequestSerializer, ReverseGeocodeRequestSerializer
+
+
+class AddressTests(SimpleTestCase):
+
+    def test_normalize_place_name(self):
+        self.assertEqual(normalize_place_name('100 Block of Moi Ave'), 'moi avenue')
+        self.assertEqual(normalize_place_name('12-14 Kenyatta Rd.'), 'kenyatta road')
+        self.assertEqual(normalize_place_name('Block Ngong  RD'), 'ngong road')
+        self.assertEqual(normalize_place_name("St. Paul's Est"), 'street paul s estate')
+        self.assertEqual(normalize_place_name(None), '')
+
+    def test_split_address(self):
+        self.assertEqual(
+            split_address('100 Block of Moi Ave, Nairobi, Nairobi County'),
+            ('moi avenue', ('nairobi', 'nairobi county'))
+        )
+        self.assertEqual(split_address('Moi Ave'), ('moi avenue', ()))
+        self.assertEqual(split_address(' , Nairobi'), ('nairobi', ()))
+        self.assertEqual(split_address(''), ('', ()))
+
+
+class LRUCacheTests(SimpleTestCase):
+
+    def test_evicts_the_least_recently_used_entry(self):
+        memo = LRUCache(2)
+        memo.put('a', 1)
+        memo.put('b', 2)
+        self.assertEqual(memo.get('a'), 1)
+        memo.put('c', 3)
+
+        self.assertEqual(len(memo), 2)
+        self.assertIsNone(memo.get('b'))
+        self.assertEqual(memo.get('a'), 1)
+        self.assertEqual(memo.get('c'), 3)
+
+    def test_remembers_misses(self):
+        memo = LRUCache(2)
+        memo.put('a', None)
+        self.assertIsNone(memo.get('a', 'missing'))
+        self.assertEqual(memo.get('b', 'missing'), 'missing')
+
+
+class RequestSerializerTests(SimpleTestCase):
+
+    def test_address_or_addresses(self):
+        self.assertTrue(GeocodeRequestSerializer(data={'address': 'Moi Ave'}).is_valid())
+        self.assertTrue(GeocodeRequestSerializer(data={'addresses': ['Moi Ave', '']}).is_valid())
+        self.assertFalse(GeocodeRequestSerializer(data={}).is_valid())
+        self.assertFalse(GeocodeRequestSerializer(data={'address': 'Moi Ave', 'addresses': ['Moi Ave']}).is_valid())
+
+    def test_batch_limit(self):
+        addresses = ['Moi Ave'] * MAX_BATCH_ADDRESSES
+        self.assertTrue(GeocodeRequestSerializer(data={'addresses': addresses}).is_valid())
+
+        serializer = GeocodeRequestSerializer(data={'addresses': addresses + ['Moi Ave']})
+        self.assertFalse(serializer.is_valid())
+        self.assertIn('addresses', serializer.errors)
+
+    def test_reverse_coordinates_in_range(self):
+        self.assertTrue(ReverseGeocodeRequestSerializer(data={'lat': -1.28, 'lng': 36.82}).is_valid())
+        self.assertFalse(ReverseGeocodeRequestSerializer(data={'lat': 91, 'lng': 36.82}).is_valid())
+        self.assertFalse(ReverseGeocodeRequestSerializer(data={'lat': -1.28, 'lng': -181}).is_valid())
+
+
+class GeocoderTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        for name, city, longitude, latitude in (
+            ('Moi Avenue', 'Nairobi', 36.8236, -1.2841),
+            ('Moi Avenue', 'Mombasa', 39.6640, -4.0610),
+            ('Kenyatta Avenue', 'Nairobi', 36.8172, -1.2864),
+        ):
+            GazetteerEntry.objects.create(
+                name=name,
+                place_type='street',
+                city=city,
+                location=Point(longitude, latitude, srid=4326),
+                rank=1 if city == 'Nairobi' else 0
+            )
+
+    def setUp(self):
+        # A fresh memo per test, sharing the gazetteer version like another process would
+        self.geocoder = Geocoder()
+
+    def test_exact_match(self):
+        result = self.geocoder.geocode('100 Block of Moi Ave')
+        self.assertEqual((result.name, result.city, result.score), ('Moi Avenue', 'Nairobi', 1.0))
+
+    def test_locality_picks_between_exact_matches(self):
+        result = self.geocoder.geocode('Moi Ave, Mombasa')
+        self.assertEqual((result.city, result.latitude), ('Mombasa', -4.0610))
+
+    def test_fuzzy_match(self):
+        result = self.geocoder.geocode('Kenyata Avenu')
+        self.assertEqual(result.name, 'Kenyatta Avenue')
+        self.assertGreaterEqual(result.score, MIN_SIMILARITY)
+        self.assertLess(result.score, 1.0)
+
+        self.assertIsNone(self.geocoder.geocode('Lake Turkana Ferry Terminal'))
+
+    def test_batch_resolves_exact_matches_with_one_query(self):
+        addresses = ['Moi Ave, Nairobi', 'Kenyatta Ave', 'moi avenue, nairobi', '', 'Kenyatta Ave']
+        with self.assertNumQueries(1):
+            results = self.geocoder.geocode_many(addresses)
+        self.assertEqual(
+            [result and result.name for result in results],
+            ['Moi Avenue', 'Kenyatta Avenue', 'Moi Avenue', None, 'Kenyatta Avenue']
+        )
+
+        # Memoized, including the order of the batch
+        with self.assertNumQueries(0):
+            self.assertEqual(self.geocoder.geocode_many(list(reversed(addresses))), list(reversed(results)))
+
+    def test_reverse_geocode_within_bounds(self):
+        result = self.geocoder.reverse_geocode(36.8237, -1.2842)
+        self.assertEqual(result.name, 'Moi Avenue')
+        self.assertLess(result.distance, 50)
+
+        # About 4 km from the nearest entry, beyond REVERSE_MAX_DISTANCE
+        self.assertIsNone(self.geocoder.reverse_geocode(36.8236, -1.2481))
+
+    def test_gazetteer_edits_bump_the_shared_version(self):
+        self.assertIsNone(self.geocoder.geocode('Tom Mboya Street'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            GazetteerEntry.objects.create(
+                name='Tom Mboya Street',
+                place_type='street',
+                city='Nairobi',
+                location=Point(36.8260, -1.2833, srid=4326)
+            )
+
+        # The miss stays memoized until the process checks the shared version
+        self.assertIsNone(self.geocoder.geocode('Tom Mboya Street'))
+        with mock.patch('geocoding.geocoder.VERSION_CHECK_INTERVAL', 0):
+            self.assertEqual(self.geocoder.geocode('Tom Mboya Street').name, 'Tom Mboya Street')
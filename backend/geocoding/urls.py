@@ -0,0 +1,7 @@
+from django.urls import path
+from .views import GeocodingViewSet
+
+urlpatterns = [
+    path('geocode/', GeocodingViewSet.as_view({'post': 'geocode'}), name='geocode'),
+    path('reverse-geocode/', GeocodingViewSet.as_view({'get': 'reverse_geocode'}), name='reverse-geocode'),
+]
@@ -0,0 +1,39 @@
+from rest_framework import status, viewsets
+from rest_framework.response import Response
+from .geocoder import geocoder
+from .serializers import GeocodeRequestSerializer, ReverseGeocodeRequestSerializer
+
+class GeocodingViewSet(viewsets.ViewSet):
+    """
+    Forward and reverse geocoding against the local gazetteer, without any
+    external service
+    """
+
+    def geocode(self, request):
+        """
+        Geocode ``address``, or a list of ``addresses`` (results in the same
+        order, null where nothing matched)
+        """
+        serializer = GeocodeRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        if 'addresses' in serializer.validated_data:
+            results = geocoder.geocode_many(serializer.validated_data['addresses'])
+            return Response({
+                'results': [result._asdict() if result else None for result in results]
+            })
+
+        result = geocoder.geocode(serializer.validated_data['address'])
+        if result is None:
+            return Response({'error': 'Address not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(result._asdict())
+
+    def reverse_geocode(self, request):
+        """Nearest named place or street to ``lat``/``lng``"""
+        serializer = ReverseGeocodeRequestSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+
+        result = geocoder.reverse_geocode(serializer.validated_data['lng'], serializer.validated_data['lat'])
+        if result is None:
+            return Response({'error': 'No place found near this point'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(result._asdict())
@@ -15,7 +15,8 @@ const CrimeService = {
   getCrimesByLocation: (lat, lng, radius) => 
     api.get(`/crimes/by-location/?lat=${lat}&lng=${lng}&radius=${radius}`),
   getHeatmapData: (params) => api.get('/crimes/heatmap/', { params }),
-  getClusters: (bounds) => api.post('/crimes/clusters/', bounds),
+  // params: bbox ('min_lon,min_lat,max_lon,max_lat'), zoom and any list filters
+  getClusters: (params) => api.get('/crimes/clusters/', { params }),
   
   // Admin functions (if applicable)
   createCrime: (crimeData) => api.post('/crimes/', crimeData),